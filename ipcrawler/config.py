@@ -21,6 +21,8 @@ configurable_keys = [
 	'heartbeat',
 	'timeout',
 	'target_timeout',
+	'plugin_timeout',
+	'adaptive_timeouts',
 	'nmap',
 	'nmap_append',
 	'proxychains',
@@ -41,6 +43,7 @@ configurable_boolean_keys = [
 	'proxychains',
 	'disable_sanity_checks',
 	'ignore_plugin_checks',
+	'adaptive_timeouts',
 	'accessible'
 ]
 
@@ -49,6 +52,7 @@ config = {
 	'service_exceptions': ['infocrypt', 'mc-nmf', 'ncacn_http', 'smux', 'status', 'tcpwrapped', 'unknown'],
 	'config_dir': config_dir,
 	'data_dir': data_dir,
+	'stderr_tail': 100,
 	'global_file': None,
 	'ports': None,
 	'max_scans': 50,
@@ -67,6 +71,10 @@ config = {
 	'heartbeat': 60,
 	'timeout': None,
 	'target_timeout': None,
+	'plugin_timeout': None,
+	'adaptive_timeouts': False,
+	# Plugin timeouts in seconds from the [timeouts] section of config.toml, keyed by plugin slug or tag.
+	'timeouts': {},
 	'nmap': '-vv --reason -Pn -T4',
 	'nmap_append': '',
 	'proxychains': False,
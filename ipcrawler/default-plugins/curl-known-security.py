@@ -1,5 +1,7 @@
 from ipcrawler.plugins import ServiceScan
 from ipcrawler.io import fformat
+from ipcrawler.http_client import raw_response
+import requests
 
 class CurlKnownSecurity(ServiceScan):
 
@@ -14,13 +16,15 @@ class CurlKnownSecurity(ServiceScan):
 
 	async def run(self, service):
 		if service.protocol == 'tcp':
-			process, stdout, _ = await service.execute('curl -sSikf {http_scheme}://{addressv6}:{port}/.well-known/security.txt', future_outfile='{protocol}_{port}_{http_scheme}_known-security.txt')
+			try:
+				response = await service.http_fetch('/.well-known/security.txt', future_outfile='{protocol}_{port}_{http_scheme}_known-security.txt')
+			except requests.exceptions.RequestException:
+				response = None
 
-			lines = await stdout.readlines()
-
-			if process.returncode == 0 and lines:
+			# Like curl -f, treat HTTP errors as the file not being there.
+			if response is not None and response.status_code < 400:
 				filename = fformat('{scandir}/{protocol}_{port}_{http_scheme}_known-security.txt')
 				with open(filename, mode='wt', encoding='utf8') as robots:
-					robots.write('\n'.join(lines))
+					robots.write(raw_response(response))
 			else:
 				service.info('{bblue}[' + fformat('{tag}') + ']{rst} There did not appear to be a .well-known/security.txt file in the webroot (/).')
@@ -11,6 +11,7 @@ class DirBuster(ServiceScan):
 		self.slug = 'dirbuster'
 		self.priority = 0
 		self.tags = ['default', 'safe', 'long', 'http']
+		self.capture_output = False
 
 	def configure(self):
 		self.add_choice_option('tool', default='feroxbuster', choices=['feroxbuster', 'gobuster', 'dirsearch', 'ffuf', 'dirb'], help='The tool to use for directory busting. Default: %(default)s')
@@ -7,6 +7,7 @@ class Enum4Linux(ServiceScan):
 		super().__init__()
 		self.name = "Enum4Linux"
 		self.tags = ['default', 'safe', 'active-directory']
+		self.capture_output = False
 
 	def configure(self):
 		self.add_choice_option('tool', default=('enum4linux-ng' if which('enum4linux-ng') else 'enum4linux'), choices=['enum4linux-ng', 'enum4linux'], help='The tool to use for doing Windows and Samba enumeration. Default: %(default)s')
@@ -1,9 +1,5 @@
 from ipcrawler.plugins import ServiceScan
-import requests
 from urllib.parse import urlparse
-import urllib3
-
-urllib3.disable_warnings()
 
 class RedirectHostnameDiscovery(ServiceScan):
 
@@ -20,7 +16,7 @@ class RedirectHostnameDiscovery(ServiceScan):
 	async def run(self, service):
 		try:
 			url = f"{'https' if service.secure else 'http'}://{service.target.address}:{service.port}/"
-			resp = requests.get(url, verify=False, allow_redirects=False)
+			resp = await service.http_fetch('/')
 
 			if 'Location' in resp.headers:
 				location = resp.headers['Location']
@@ -6,6 +6,7 @@ class Nikto(ServiceScan):
 		super().__init__()
 		self.name = 'nikto'
 		self.tags = ['default', 'safe', 'long', 'http']
+		self.capture_output = False
 
 	def configure(self):
 		self.match_service_name('^http')
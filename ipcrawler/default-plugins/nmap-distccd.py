@@ -11,4 +11,4 @@ class NmapDistccd(ServiceScan):
 		self.match_service_name('^distccd')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,distcc-cve2004-2687" --script-args="distcc-cve2004-2687.cmd=id" -oN "{scandir}/{protocol}_{port}_distcc_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_distcc_nmap.xml" {address}')
+		await service.nmap_scripts('banner,distcc-cve2004-2687', '{protocol}_{port}_distcc_nmap.txt', 'xml/{protocol}_{port}_distcc_nmap.xml', script_args='distcc-cve2004-2687.cmd=id')
@@ -11,4 +11,4 @@ class NmapFinger(ServiceScan):
 		self.match_service_name('^finger')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,finger" -oN "{scandir}/{protocol}_{port}_finger_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_finger_nmap.xml" {address}')
+		await service.nmap_scripts('banner,finger', '{protocol}_{port}_finger_nmap.txt', 'xml/{protocol}_{port}_finger_nmap.xml')
@@ -11,4 +11,4 @@ class NmapFTP(ServiceScan):
 		self.match_service_name(['^ftp', '^ftp\-data'])
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,(ftp* or ssl*) and not (brute or broadcast or dos or external or fuzzer)" -oN "{scandir}/{protocol}_{port}_ftp_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_ftp_nmap.xml" {address}')
+		await service.nmap_scripts('banner,(ftp* or ssl*) and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_ftp_nmap.txt', 'xml/{protocol}_{port}_ftp_nmap.xml')
@@ -11,4 +11,4 @@ class NmapIrc(ServiceScan):
 		self.match_service_name('^irc')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV --script irc-botnet-channels,irc-info,irc-unrealircd-backdoor -oN "{scandir}/{protocol}_{port}_irc_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_irc_nmap.xml" -p {port} {address}')
+		await service.nmap_scripts('irc-botnet-channels,irc-info,irc-unrealircd-backdoor', '{protocol}_{port}_irc_nmap.txt', 'xml/{protocol}_{port}_irc_nmap.xml')
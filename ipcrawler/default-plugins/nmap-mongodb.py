@@ -11,4 +11,4 @@ class NmapMongoDB(ServiceScan):
 		self.match_service_name('^mongod')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,(mongodb* or ssl*) and not (brute or broadcast or dos or external or fuzzer)" -oN "{scandir}/{protocol}_{port}_mongodb_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_mongodb_nmap.xml" {address}')
+		await service.nmap_scripts('banner,(mongodb* or ssl*) and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_mongodb_nmap.txt', 'xml/{protocol}_{port}_mongodb_nmap.xml')
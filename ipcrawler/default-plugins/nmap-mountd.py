@@ -11,4 +11,4 @@ class NmapMountd(ServiceScan):
 		self.match_service_name('^mountd')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,nfs* and not (brute or broadcast or dos or external or fuzzer)" -oN "{scandir}/{protocol}_{port}_mountd_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_mountd_nmap.xml" {address}')
+		await service.nmap_scripts('banner,nfs* and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_mountd_nmap.txt', 'xml/{protocol}_{port}_mountd_nmap.xml')
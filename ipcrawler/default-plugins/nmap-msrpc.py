@@ -11,4 +11,4 @@ class NmapRPC(ServiceScan):
 		self.match_service_name(['^msrpc', '^rpcbind', '^erpc'])
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,msrpc-enum,rpc-grind,rpcinfo" -oN "{scandir}/{protocol}_{port}_rpc_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_rpc_nmap.xml" {address}')
+		await service.nmap_scripts('banner,msrpc-enum,rpc-grind,rpcinfo', '{protocol}_{port}_rpc_nmap.txt', 'xml/{protocol}_{port}_rpc_nmap.xml')
@@ -15,4 +15,4 @@ class NmapMSSQL(ServiceScan):
 			service.add_manual_command('(sqsh) interactive database shell:', 'sqsh -U <username> -P <password> -S {address}:{port}')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,(ms-sql* or ssl*) and not (brute or broadcast or dos or external or fuzzer)" --script-args="mssql.instance-port={port},mssql.username=sa,mssql.password=sa" -oN "{scandir}/{protocol}_{port}_mssql_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_mssql_nmap.xml" {address}')
+		await service.nmap_scripts('banner,(ms-sql* or ssl*) and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_mssql_nmap.txt', 'xml/{protocol}_{port}_mssql_nmap.xml', script_args='mssql.instance-port={port},mssql.username=sa,mssql.password=sa')
@@ -15,4 +15,4 @@ class NmapMYSQL(ServiceScan):
 			service.add_manual_command('(sqsh) interactive database shell:', 'sqsh -U <username> -P <password> -S {address}:{port}')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,(mysql* or ssl*) and not (brute or broadcast or dos or external or fuzzer)" -oN "{scandir}/{protocol}_{port}_mysql_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_mysql_nmap.xml" {address}')
+		await service.nmap_scripts('banner,(mysql* or ssl*) and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_mysql_nmap.txt', 'xml/{protocol}_{port}_mysql_nmap.xml')
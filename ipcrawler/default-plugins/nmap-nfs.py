@@ -11,4 +11,4 @@ class NmapNFS(ServiceScan):
 		self.match_service_name(['^nfs', '^rpcbind'])
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,(rpcinfo or nfs*) and not (brute or broadcast or dos or external or fuzzer)" -oN "{scandir}/{protocol}_{port}_nfs_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_nfs_nmap.xml" {address}')
+		await service.nmap_scripts('banner,(rpcinfo or nfs*) and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_nfs_nmap.txt', 'xml/{protocol}_{port}_nfs_nmap.xml')
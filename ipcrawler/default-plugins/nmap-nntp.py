@@ -11,4 +11,4 @@ class NmapNNTP(ServiceScan):
 		self.match_service_name('^nntp')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,nntp-ntlm-info" -oN "{scandir}/{protocol}_{port}_nntp_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_nntp_nmap.xml" {address}')
+		await service.nmap_scripts('banner,nntp-ntlm-info', '{protocol}_{port}_nntp_nmap.txt', 'xml/{protocol}_{port}_nntp_nmap.xml')
@@ -14,4 +14,4 @@ class NmapOracle(ServiceScan):
 		service.add_manual_command('Brute-force SIDs using Nmap:', 'nmap {nmap_extra} -sV -p {port} --script="banner,oracle-sid-brute" -oN "{scandir}/{protocol}_{port}_oracle_sid-brute_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_oracle_sid-brute_nmap.xml" {address}')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,(oracle* or ssl*) and not (brute or broadcast or dos or external or fuzzer)" -oN "{scandir}/{protocol}_{port}_oracle_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_oracle_nmap.xml" {address}')
+		await service.nmap_scripts('banner,(oracle* or ssl*) and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_oracle_nmap.txt', 'xml/{protocol}_{port}_oracle_nmap.xml')
@@ -11,4 +11,4 @@ class NmapPOP3(ServiceScan):
 		self.match_service_name('^pop3')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,(pop3* or ssl*) and not (brute or broadcast or dos or external or fuzzer)" -oN "{scandir}/{protocol}_{port}_pop3_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_pop3_nmap.xml" {address}')
+		await service.nmap_scripts('banner,(pop3* or ssl*) and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_pop3_nmap.txt', 'xml/{protocol}_{port}_pop3_nmap.xml')
@@ -11,4 +11,4 @@ class NmapRDP(ServiceScan):
 		self.match_service_name(['^rdp', '^ms\-wbt\-server', '^ms\-term\-serv'])
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,(rdp* or ssl*) and not (brute or broadcast or dos or external or fuzzer)" -oN "{scandir}/{protocol}_{port}_rdp_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_rdp_nmap.xml" {address}')
+		await service.nmap_scripts('banner,(rdp* or ssl*) and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_rdp_nmap.txt', 'xml/{protocol}_{port}_rdp_nmap.xml')
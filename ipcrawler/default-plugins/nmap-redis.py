@@ -11,4 +11,4 @@ class NmapRedis(ServiceScan):
 		self.match_service_name('^redis$')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,redis-info" -oN "{scandir}/{protocol}_{port}_redis_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_redis_nmap.xml" {address}')
+		await service.nmap_scripts('banner,redis-info', '{protocol}_{port}_redis_nmap.txt', 'xml/{protocol}_{port}_redis_nmap.xml')
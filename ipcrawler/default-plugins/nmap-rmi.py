@@ -11,4 +11,4 @@ class NmapRMI(ServiceScan):
 		self.match_service_name(['^java\-rmi', '^rmiregistry'])
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,rmi-vuln-classloader,rmi-dumpregistry" -oN "{scandir}/{protocol}_{port}_rmi_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_rmi_nmap.xml" {address}')
+		await service.nmap_scripts('banner,rmi-vuln-classloader,rmi-dumpregistry', '{protocol}_{port}_rmi_nmap.txt', 'xml/{protocol}_{port}_rmi_nmap.xml')
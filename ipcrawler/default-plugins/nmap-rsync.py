@@ -11,4 +11,4 @@ class NmapRsync(ServiceScan):
 		self.match_service_name('^rsync')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,(rsync* or ssl*) and not (brute or broadcast or dos or external or fuzzer)" -oN "{scandir}/{protocol}_{port}_rsync_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_rsync_nmap.xml" {address}')
+		await service.nmap_scripts('banner,(rsync* or ssl*) and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_rsync_nmap.txt', 'xml/{protocol}_{port}_rsync_nmap.xml')
@@ -11,4 +11,4 @@ class NmapSIP(ServiceScan):
 		self.match_service_name(['^asterisk', '^sip'])
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,sip-enum-users,sip-methods" -oN "{scandir}/{protocol}_{port}_sip_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_sip_nmap.xml" {address}')
+		await service.nmap_scripts('banner,sip-enum-users,sip-methods', '{protocol}_{port}_sip_nmap.txt', 'xml/{protocol}_{port}_sip_nmap.xml')
@@ -9,6 +9,7 @@ class NmapSMB(ServiceScan):
 
 	def configure(self):
 		self.match_service_name(['^smb', '^microsoft\-ds', '^netbios'])
+		self.multi_host(True)
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,(nbstat or smb* or ssl*) and not (brute or broadcast or dos or external or fuzzer)" -oN "{scandir}/{protocol}_{port}_smb_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_smb_nmap.xml" {address}')
+		await service.nmap_scripts('banner,(nbstat or smb* or ssl*) and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_smb_nmap.txt', 'xml/{protocol}_{port}_smb_nmap.xml')
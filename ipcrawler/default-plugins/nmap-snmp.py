@@ -11,4 +11,4 @@ class NmapSNMP(ServiceScan):
 		self.match_service_name('^snmp')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,(snmp* or ssl*) and not (brute or broadcast or dos or external or fuzzer)" -oN "{scandir}/{protocol}_{port}_snmp-nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_snmp_nmap.xml" {address}')
+		await service.nmap_scripts('banner,(snmp* or ssl*) and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_snmp-nmap.txt', 'xml/{protocol}_{port}_snmp_nmap.xml')
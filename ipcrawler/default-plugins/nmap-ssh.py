@@ -9,6 +9,7 @@ class NmapSSH(ServiceScan):
 
 	def configure(self):
 		self.match_service_name('^ssh')
+		self.multi_host(True)
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,ssh2-enum-algos,ssh-hostkey,ssh-auth-methods" -oN "{scandir}/{protocol}_{port}_ssh_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_ssh_nmap.xml" {address}')
+		await service.nmap_scripts('banner,ssh2-enum-algos,ssh-hostkey,ssh-auth-methods', '{protocol}_{port}_ssh_nmap.txt', 'xml/{protocol}_{port}_ssh_nmap.xml')
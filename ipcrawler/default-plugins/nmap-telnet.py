@@ -11,4 +11,4 @@ class NmapTelnet(ServiceScan):
 		self.match_service_name('^telnet')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,telnet-encryption,telnet-ntlm-info" -oN "{scandir}/{protocol}_{port}_telnet-nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_telnet_nmap.xml" {address}')
+		await service.nmap_scripts('banner,telnet-encryption,telnet-ntlm-info', '{protocol}_{port}_telnet-nmap.txt', 'xml/{protocol}_{port}_telnet_nmap.xml')
@@ -11,4 +11,4 @@ class NmapTFTP(ServiceScan):
 		self.match_service_name('^tftp')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,tftp-enum" -oN "{scandir}/{protocol}_{port}_tftp-nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_tftp_nmap.xml" {address}')
+		await service.nmap_scripts('banner,tftp-enum', '{protocol}_{port}_tftp-nmap.txt', 'xml/{protocol}_{port}_tftp_nmap.xml')
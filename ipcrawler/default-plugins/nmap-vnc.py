@@ -11,4 +11,4 @@ class NmapVNC(ServiceScan):
 		self.match_service_name('^vnc')
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="banner,(vnc* or realvnc* or ssl*) and not (brute or broadcast or dos or external or fuzzer)" --script-args="unsafe=1" -oN "{scandir}/{protocol}_{port}_vnc_nmap.txt" -oX "{scandir}/xml/{protocol}_{port}_vnc_nmap.xml" {address}')
+		await service.nmap_scripts('banner,(vnc* or realvnc* or ssl*) and not (brute or broadcast or dos or external or fuzzer)', '{protocol}_{port}_vnc_nmap.txt', 'xml/{protocol}_{port}_vnc_nmap.xml', script_args='unsafe=1')
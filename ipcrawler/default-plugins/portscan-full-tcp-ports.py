@@ -0,0 +1,67 @@
+from ipcrawler.plugins import PortScan
+from ipcrawler.nmap_xml import identify_wsman
+from ipcrawler.config import config
+import asyncio, os, re
+
+class FullTCPPortScan(PortScan):
+
+	def __init__(self):
+		super().__init__()
+		self.name = 'Full TCP Ports'
+		self.description = 'Performs a fast Nmap sweep of all TCP ports, then runs version detection and default scripts against only the open ports.'
+		self.type = 'tcp'
+		self.specific_ports = True
+		self.tags = ['full-port-scan', 'safe', 'long']
+		self.priority = 0
+
+	def configure(self):
+		self.add_option('min-rate', default=1000, help='The minimum number of packets per second to send during the sweep of all ports. Default: %(default)s')
+		self.add_option('chunk-size', default=10, help='The number of open ports given to each version detection scan. Hosts with more open ports are scanned in parallel chunks. Default: %(default)s')
+
+	async def run(self, target):
+		if target.ports:
+			if target.ports['tcp']:
+				ports = target.ports['tcp']
+			else:
+				return []
+		else:
+			ports = '-'
+
+		# Phase 1: find the open ports without version detection or scripts.
+		process, stdout, stderr = await target.execute('nmap {nmap_extra} --min-rate ' + str(self.get_option('min-rate')) + ' -p' + ports + ' -oN "{scandir}/_full_tcp_sweep_nmap.txt" -oX "{scandir}/xml/_full_tcp_sweep_nmap.xml" {address}', blocking=False)
+
+		while True:
+			line = await stdout.readline()
+			if line is not None:
+				match = re.match('^Discovered open port ([0-9]+)/tcp', line)
+				if match:
+					await target.add_port('tcp', match.group(1))
+			else:
+				break
+
+		open_ports = sorted(set(service.port for service in await target.extract_nmap_services(os.path.join(target.scandir, 'xml', '_full_tcp_sweep_nmap.xml'), process)))
+		if not open_ports:
+			return []
+
+		# Phase 2: identify the services on the open ports, in parallel chunks if there are many.
+		chunk_size = max(1, int(self.get_option('chunk-size')))
+		chunks = [open_ports[i:i + chunk_size] for i in range(0, len(open_ports), chunk_size)]
+
+		results = await asyncio.gather(*[self.version_scan(target, chunk, (i + 1) if len(chunks) > 1 else None) for i, chunk in enumerate(chunks)])
+		services = [service for result in results for service in result]
+
+		# Check if HTTP services appear to be WinRM. If so, override the service name as wsman.
+		await identify_wsman(target, services)
+
+		return services
+
+	async def version_scan(self, target, ports, number):
+		name = '_full_tcp_nmap' + ('_' + str(number) if number else '')
+
+		# OS detection and traceroute don't depend on the ports, so only the first chunk does them.
+		extra = ''
+		if not config['proxychains'] and (number is None or number == 1):
+			extra = ' -A --osscan-guess'
+
+		process, stdout, stderr = await target.execute('nmap {nmap_extra} -sV -sC --version-all' + extra + ' -p ' + ','.join(str(port) for port in ports) + ' -oN "{scandir}/' + name + '.txt" -oX "{scandir}/xml/' + name + '.xml" {address}', blocking=False, capture=False)
+		return await target.extract_nmap_services(os.path.join(target.scandir, 'xml', name + '.xml'), process)
@@ -1,6 +1,5 @@
 from ipcrawler.plugins import PortScan
-from ipcrawler.targets import Service
-import re
+import os, re
 
 class GuessPortScan(PortScan):
 
@@ -15,10 +14,12 @@ class GuessPortScan(PortScan):
 	async def run(self, target):
 		if target.ports:
 			if target.ports['tcp']:
+				xmlfile = '_custom_ports_tcp_nmap.xml'
 				process, stdout, stderr = await target.execute('nmap {nmap_extra} -A --osscan-guess --version-all -p ' + target.ports['tcp'] + ' -oN "{scandir}/_custom_ports_tcp_nmap.txt" -oX "{scandir}/xml/_custom_ports_tcp_nmap.xml" {address}', blocking=False)
 			else:
 				return []
 		else:
+			xmlfile = '_quick_tcp_nmap.xml'
 			process, stdout, stderr = await target.execute('nmap {nmap_extra} -A --osscan-guess --version-all -p- -oN "{scandir}/_quick_tcp_nmap.txt" -oX "{scandir}/xml/_quick_tcp_nmap.xml" {address}', blocking=False)
 
 		insecure_ports = {
@@ -28,21 +29,18 @@ class GuessPortScan(PortScan):
 			'443':'https', '465':'smtp', '563':'nntp', '585':'imaps', '593':'msrpc', '636':'ldap', '989':'ftp', '990':'ftp', '992':'telnet', '993':'imaps', '995':'pop3s', '2484':'oracle', '5061':'asterisk', '5986':'wsman'
 		}
 
-		services = []
 		while True:
 			line = await stdout.readline()
 			if line is not None:
 				match = re.match('^Discovered open port ([0-9]+)/tcp', line)
 				if match:
 					if match.group(1) in insecure_ports.keys():
-						await target.add_service(Service('tcp', match.group(1), insecure_ports[match.group(1)]))
+						await target.add_port('tcp', match.group(1), insecure_ports[match.group(1)])
 					elif match.group(1) in secure_ports.keys():
-						await target.add_service(Service('tcp', match.group(1), secure_ports[match.group(1)], True))
-				service = target.extract_service(line)
-				if service is not None:
-					services.append(service)
+						await target.add_port('tcp', match.group(1), secure_ports[match.group(1)], True)
+					else:
+						await target.add_port('tcp', match.group(1))
 			else:
 				break
 
-		await process.wait()
-		return services
+		return await target.extract_nmap_services(os.path.join(target.scandir, 'xml', xmlfile), process)
@@ -17,24 +17,21 @@ class Top100UDPPortScan(PortScan):
 		if os.getuid() == 0 or config['disable_sanity_checks']:
 			if target.ports:
 				if target.ports['udp']:
+					xmlfile = '_custom_ports_udp_nmap.xml'
 					process, stdout, stderr = await target.execute('nmap {nmap_extra} -sU -A --osscan-guess -p ' + target.ports['udp'] + ' -oN "{scandir}/_custom_ports_udp_nmap.txt" -oX "{scandir}/xml/_custom_ports_udp_nmap.xml" {address}', blocking=False)
 				else:
 					return []
 			else:
+				xmlfile = '_top_100_udp_nmap.xml'
 				process, stdout, stderr = await target.execute('nmap {nmap_extra} -sU -A --top-ports 100 -oN "{scandir}/_top_100_udp_nmap.txt" -oX "{scandir}/xml/_top_100_udp_nmap.xml" {address}', blocking=False)
-			services = []
 			while True:
 				line = await stdout.readline()
 				if line is not None:
 					match = re.search('^Discovered open port ([0-9]+)/udp', line)
 					if match:
-						target.info('Discovered open port {bmagenta}udp/' + match.group(1) + '{rst} on {byellow}' + target.address + '{rst}', verbosity=1)
-					service = target.extract_service(line)
-					if service:
-						services.append(service)
+						await target.add_port('udp', match.group(1))
 				else:
 					break
-			await process.wait()
-			return services
+			return await target.extract_nmap_services(os.path.join(target.scandir, 'xml', xmlfile), process)
 		else:
 			target.error('UDP scan requires ipcrawler be run with root privileges.')
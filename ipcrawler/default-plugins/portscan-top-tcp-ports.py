@@ -1,6 +1,7 @@
 from ipcrawler.plugins import PortScan
+from ipcrawler.nmap_xml import identify_wsman
 from ipcrawler.config import config
-import requests
+import os, re
 
 class QuickTCPPortScan(PortScan):
 
@@ -22,18 +23,21 @@ class QuickTCPPortScan(PortScan):
 			traceroute_os = ' -A --osscan-guess'
 
 		process, stdout, stderr = await target.execute('nmap {nmap_extra} -sV -sC --version-all' + traceroute_os + ' -oN "{scandir}/_quick_tcp_nmap.txt" -oX "{scandir}/xml/_quick_tcp_nmap.xml" {address}', blocking=False)
-		services = await target.extract_services(stdout)
-
-		for service in services:
-			# Check if HTTP service appears to be WinRM. If so, override service name as wsman.
-			if service.name == 'http' and service.port in [5985, 5986]:
-				wsman = requests.get(('https' if service.secure else 'http') + '://' + target.address + ':' + str(service.port) + '/wsman', verify=False)
-				if wsman.status_code == 405:
-					service.name = 'wsman'
-					wsman = requests.post(('https' if service.secure else 'http') + '://' + target.address + ':' + str(service.port) + '/wsman', verify=False)
-				else:
-					if wsman.status_code == 401:
-						service.name = 'wsman'
+
+		# Open ports are reported long before version detection and scripts finish, so start on them straight away.
+		while True:
+			line = await stdout.readline()
+			if line is not None:
+				match = re.match('^Discovered open port ([0-9]+)/tcp', line)
+				if match:
+					await target.add_port('tcp', match.group(1))
+			else:
+				break
+
+		services = await target.extract_nmap_services(os.path.join(target.scandir, 'xml', '_quick_tcp_nmap.xml'), process)
+
+		# Check if HTTP services appear to be WinRM. If so, override the service name as wsman.
+		await identify_wsman(target, services)
 
 		await process.wait()
 		return services
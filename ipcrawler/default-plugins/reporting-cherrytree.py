@@ -1,7 +1,8 @@
 from ipcrawler.plugins import Report
 from ipcrawler.config import config
+from ipcrawler.io import FileIndex
 from xml.sax.saxutils import escape
-import os, glob
+import os
 
 class CherryTree(Report):
 
@@ -9,6 +10,16 @@ class CherryTree(Report):
 		super().__init__()
 		self.name = 'CherryTree'
 		self.tags = ['default', 'report', 'safe', 'quick']
+		self.executor = 'thread'
+
+	# Copy a file into the report a block at a time, escaping it for XML.
+	def copy_escaped(self, filename, output):
+		with open(filename, 'r') as file:
+			while True:
+				block = file.read(65536)
+				if not block:
+					break
+				output.write(escape(block))
 
 	async def run(self, targets):
 		if len(targets) > 1:
@@ -23,7 +34,7 @@ class CherryTree(Report):
 			for target in targets:
 				output.writelines('<node name="' + escape(target.address) + '" is_bold="1" custom_icon_id="1">\n')
 
-				files = [os.path.abspath(filename) for filename in glob.iglob(os.path.join(target.scandir, '**/*'), recursive=True) if os.path.isfile(filename) and filename.endswith(('.txt', '.html'))]
+				files = FileIndex(target.scandir, ('.txt', '.html'))
 
 				if target.scans['ports']:
 					output.writelines('<node name="Port Scans" custom_icon_id="2">\n')
@@ -32,11 +43,10 @@ class CherryTree(Report):
 							output.writelines('<node name="PortScan: ' + escape(target.scans['ports'][scan]['plugin'].name) + '" custom_icon_id="21">\n')
 							for command in target.scans['ports'][scan]['commands']:
 								output.writelines('<rich_text>' + escape(command[0]))
-								for filename in files:
-									if filename in command[0] or (command[1] is not None and filename == command[1]) or (command[2] is not None and filename == command[2]):
-										output.writelines('\n\n' + escape(filename) + ':\n\n')
-										with open(filename, 'r') as file:
-											output.writelines(escape(file.read()) + '\n')
+								for filename in files.match(command):
+									output.writelines('\n\n' + escape(filename) + ':\n\n')
+									self.copy_escaped(filename, output)
+									output.writelines('\n')
 								output.writelines('</rich_text>\n')
 							output.writelines('</node>\n')
 					output.writelines('</node>\n')
@@ -49,11 +59,10 @@ class CherryTree(Report):
 								output.writelines('<node name="' + escape(target.scans['services'][service][plugin]['plugin'].name) + '" custom_icon_id="21">\n')
 								for command in target.scans['services'][service][plugin]['commands']:
 									output.writelines('<rich_text>' + escape(command[0]))
-									for filename in files:
-										if filename in command[0] or (command[1] is not None and filename == command[1]) or (command[2] is not None and filename == command[2]):
-											output.writelines('\n\n' + escape(filename) + ':\n\n')
-											with open(filename, 'r') as file:
-												output.writelines(escape(file.read()) + '\n')
+									for filename in files.match(command):
+										output.writelines('\n\n' + escape(filename) + ':\n\n')
+										self.copy_escaped(filename, output)
+										output.writelines('\n')
 									output.writelines('</rich_text>\n')
 								output.writelines('</node>\n')
 						output.writelines('</node>\n')
@@ -62,29 +71,33 @@ class CherryTree(Report):
 				manual_commands = os.path.join(target.scandir, '_manual_commands.txt')
 				if os.path.isfile(manual_commands):
 					output.writelines('<node name="Manual Commands" custom_icon_id="22">\n')
-					with open(manual_commands, 'r') as file:
-						output.writelines('<rich_text>' + escape(file.read()) + '</rich_text>\n')
+					output.writelines('<rich_text>')
+					self.copy_escaped(manual_commands, output)
+					output.writelines('</rich_text>\n')
 					output.writelines('</node>\n')
 
 				patterns = os.path.join(target.scandir, '_patterns.log')
 				if os.path.isfile(patterns):
 					output.writelines('<node name="Patterns" custom_icon_id="10">\n')
-					with open(patterns, 'r') as file:
-						output.writelines('<rich_text>' + escape(file.read()) + '</rich_text>\n')
+					output.writelines('<rich_text>')
+					self.copy_escaped(patterns, output)
+					output.writelines('</rich_text>\n')
 					output.writelines('</node>\n')
 
 				commands = os.path.join(target.scandir, '_commands.log')
 				if os.path.isfile(commands):
 					output.writelines('<node name="Commands" custom_icon_id="21">\n')
-					with open(commands, 'r') as file:
-						output.writelines('<rich_text>' + escape(file.read()) + '</rich_text>\n')
+					output.writelines('<rich_text>')
+					self.copy_escaped(commands, output)
+					output.writelines('</rich_text>\n')
 					output.writelines('</node>\n')
 
 				errors = os.path.join(target.scandir, '_errors.log')
 				if os.path.isfile(errors):
 					output.writelines('<node name="Errors" custom_icon_id="57">\n')
-					with open(errors, 'r') as file:
-						output.writelines('<rich_text>' + escape(file.read()) + '</rich_text>\n')
+					output.writelines('<rich_text>')
+					self.copy_escaped(errors, output)
+					output.writelines('</rich_text>\n')
 					output.writelines('</node>\n')
 				output.writelines('</node>\n')
 
@@ -1,6 +1,7 @@
 from ipcrawler.plugins import Report
 from ipcrawler.config import config
-import os, glob
+from ipcrawler.io import FileIndex
+import os, shutil
 
 class Markdown(Report):
 
@@ -8,6 +9,7 @@ class Markdown(Report):
 		super().__init__()
 		self.name = 'Markdown'
 		self.tags = ['default', 'report', 'safe', 'quick']
+		self.executor = 'thread'
 
 	async def run(self, targets):
 		if len(targets) > 1:
@@ -22,7 +24,7 @@ class Markdown(Report):
 		for target in targets:
 			os.makedirs(os.path.join(report, target.address), exist_ok=True)
 
-			files = [os.path.abspath(filename) for filename in glob.iglob(os.path.join(target.scandir, '**/*'), recursive=True) if os.path.isfile(filename) and filename.endswith(('.txt', '.html'))]
+			files = FileIndex(target.scandir, ('.txt', '.html'))
 
 			if target.scans['ports']:
 				os.makedirs(os.path.join(report, target.address, 'Port Scans'), exist_ok=True)
@@ -31,11 +33,11 @@ class Markdown(Report):
 						with open(os.path.join(report, target.address, 'Port Scans', 'PortScan - ' + target.scans['ports'][scan]['plugin'].name + '.md'), 'w') as output:
 							for command in target.scans['ports'][scan]['commands']:
 								output.writelines('```bash\n' + command[0] + '\n```')
-								for filename in files:
-									if filename in command[0] or (command[1] is not None and filename == command[1]) or (command[2] is not None and filename == command[2]):
-										output.writelines('\n\n[' + filename + '](file://' + filename + '):\n\n')
-										with open(filename, 'r') as file:
-											output.writelines('```\n' + file.read() + '\n```\n')
+								for filename in files.match(command):
+									output.writelines('\n\n[' + filename + '](file://' + filename + '):\n\n```\n')
+									with open(filename, 'r') as file:
+										shutil.copyfileobj(file, output)
+									output.writelines('\n```\n')
 			if target.scans['services']:
 				os.makedirs(os.path.join(report, target.address, 'Services'), exist_ok=True)
 				for service in target.scans['services'].keys():
@@ -45,32 +47,38 @@ class Markdown(Report):
 							with open(os.path.join(report, target.address, 'Services', 'Service - ' + service.tag().replace('/', '-'), target.scans['services'][service][plugin]['plugin'].name + '.md'), 'w') as output:
 								for command in target.scans['services'][service][plugin]['commands']:
 									output.writelines('```bash\n' + command[0] + '\n```')
-									for filename in files:
-										if filename in command[0] or (command[1] is not None and filename == command[1]) or (command[2] is not None and filename == command[2]):
-											output.writelines('\n\n[' + filename + '](file://' + filename + '):\n\n')
-											with open(filename, 'r') as file:
-												output.writelines('```\n' + file.read() + '\n```\n')
+									for filename in files.match(command):
+										output.writelines('\n\n[' + filename + '](file://' + filename + '):\n\n```\n')
+										with open(filename, 'r') as file:
+											shutil.copyfileobj(file, output)
+										output.writelines('\n```\n')
 
 			manual_commands = os.path.join(target.scandir, '_manual_commands.txt')
 			if os.path.isfile(manual_commands):
 				with open(os.path.join(report, target.address, 'Manual Commands' + '.md'), 'w') as output:
+					output.writelines('```bash\n')
 					with open(manual_commands, 'r') as file:
-						output.writelines('```bash\n' + file.read() + '\n```')
+						shutil.copyfileobj(file, output)
+					output.writelines('\n```')
 
 			patterns = os.path.join(target.scandir, '_patterns.log')
 			if os.path.isfile(patterns):
 				with open(os.path.join(report, target.address, 'Patterns' + '.md'), 'w') as output:
 					with open(patterns, 'r') as file:
-						output.writelines(file.read())
+						shutil.copyfileobj(file, output)
 
 			commands = os.path.join(target.scandir, '_commands.log')
 			if os.path.isfile(commands):
 				with open(os.path.join(report, target.address, 'Commands' + '.md'), 'w') as output:
+					output.writelines('```bash\n')
 					with open(commands, 'r') as file:
-						output.writelines('```bash\n' + file.read() + '\n```')
+						shutil.copyfileobj(file, output)
+					output.writelines('\n```')
 
 			errors = os.path.join(target.scandir, '_errors.log')
 			if os.path.isfile(errors):
 				with open(os.path.join(report, target.address, 'Errors' + '.md'), 'w') as output:
+					output.writelines('```\n')
 					with open(errors, 'r') as file:
-						output.writelines('```\n' + file.read() + '\n```')
+						shutil.copyfileobj(file, output)
+					output.writelines('\n```')
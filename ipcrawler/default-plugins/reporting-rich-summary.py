@@ -1,8 +1,89 @@
 from ipcrawler.plugins import Report
 from ipcrawler.config import config
-import os, glob, re, time, html
+import os, glob, re, time, html, json
 from datetime import datetime
 
+# Key finding patterns by category, as (pattern, group) where group is the part of the match that is kept.
+FINDING_PATTERNS = {
+	'urls': [
+		(r'https?://[^\s<>"]+', 0),
+	],
+	'domains': [
+		(r'(?<![a-zA-Z0-9\-])(?:[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)*[a-zA-Z0-9][a-zA-Z0-9\-]*\.(?:htb|local|thm)', 0),
+	],
+	'technologies': [
+		(r'Server:\s*([^\r\n]+)', 1),
+		(r'X-Powered-By:\s*([^\r\n]+)', 1),
+		(r'Apache/([0-9.]+)', 1),
+		(r'nginx/([0-9.]+)', 1),
+		(r'PHP/([0-9.]+)', 1),
+		(r'WordPress\s*([0-9.]+)', 1),
+		(r'Drupal\s*([0-9.]+)', 1),
+		(r'Joomla\s*([0-9.]+)', 1),
+	],
+	'vulnerabilities': [
+		(r'CVE-\d{4}-\d{4,7}', 0),
+		(r'VULNERABLE[^\r\n]*', 0),
+		(r'State:\s*VULNERABLE[^\r\n]*', 0),
+		(r'Exploit available[^\r\n]*', 0),
+	],
+	'credentials': [
+		(r'username[^\r\n]*:\s*([^\s\r\n]+)', 1),
+		(r'password[^\r\n]*:\s*([^\s\r\n]+)', 1),
+		(r'admin:([^\s\r\n]+)', 1),
+		(r'root:([^\s\r\n]+)', 1),
+	],
+	'interesting_files': [
+		(r'/[a-zA-Z0-9_\-./]*\.(?:txt|log|conf|config|xml|json|sql|db|backup|bak)(?:\s|$)', 0),
+		(r'/admin[^\s]*', 0),
+		(r'/backup[^\s]*', 0),
+		(r'/config[^\s]*', 0),
+		(r'/uploads[^\s]*', 0),
+	],
+}
+
+# How many findings of each category are shown, and whether they are the first ones sorted alphabetically
+# (True) or the first ones found (False). Nothing more than that is kept while the files are read.
+FINDING_LIMITS = {
+	'urls': (20, True),
+	'domains': (100, True),
+	'technologies': (100, True),
+	'vulnerabilities': (10, False),
+	'credentials': (10, False),
+	'interesting_files': (15, False),
+}
+
+FINDING_REGEXES = {category:[(re.compile(pattern, re.IGNORECASE | re.MULTILINE), group) for pattern, group in patterns] for category, patterns in FINDING_PATTERNS.items()}
+
+# Patterns for the most interesting lines of each file.
+INTERESTING_LINE = re.compile('|'.join([
+	r'http[s]?://[^\s]+',  # URLs
+	r'\d+/tcp[^\S\n]+open',     # Open ports
+	r'\d+/udp[^\S\n]+open',     # Open UDP ports
+	r'CVE-\d{4}-\d{4,7}',  # CVEs
+	r'VULNERABLE',         # Vulnerabilities
+	r'Server:[^\S\n]*[^\r\n]+', # Server headers
+	r'Location:[^\S\n]*[^\r\n]+', # Redirects
+	r'Title:[^\S\n]*[^\r\n]+',  # Page titles
+	r'/[a-zA-Z0-9_\-/]+\.(php|asp|aspx|jsp|cgi|pl)', # Interesting files
+	r'admin|login|password|config|backup', # Interesting keywords
+	r'Directory listing|Index of', # Directory listings
+	r'Error|Exception|Warning.*:', # Errors that might reveal info
+	r'SQL|MySQL|PostgreSQL|Oracle', # Database info
+	r'WordPress|Drupal|Joomla', # CMS detection
+]), re.IGNORECASE)
+
+INTERESTING_KEYWORD = re.compile('discovered|found|detected|identified|vulnerable|exploit|shell|flag', re.IGNORECASE)
+
+# Number of interesting lines shown per file.
+INTERESTING_LIMIT = 20
+
+# Files are read in blocks of whole lines of about this many characters.
+BLOCK_SIZE = 1024 * 1024
+
+# Raw outputs are written to chunk files of about this many characters, loaded by the report when needed.
+OUTPUT_CHUNK_SIZE = 1024 * 1024
+
 class RichSummary(Report):
 
 	def __init__(self):
@@ -11,6 +92,7 @@ class RichSummary(Report):
 		self.slug = 'rich-summary'
 		self.description = 'Comprehensive HTML summary report with all findings and results'
 		self.tags = ['default', 'report', 'summary', 'safe', 'quick']
+		self.executor = 'process'
 
 	async def run(self, targets):
 		for target in targets:
@@ -27,15 +109,14 @@ class RichSummary(Report):
 		# Create summary in the target's report directory
 		summary_file = os.path.join(target.reportdir, 'Full_Report.html')
 		
-		# Collect all scan results
-		scan_data = await self.collect_scan_data(target)
+		# Collect all scan results, copying raw outputs next to the report
+		outputs = self.open_outputs(summary_file)
+		scan_data = await self.collect_scan_data(target, outputs)
+		self.close_outputs(outputs)
 		
-		# Generate HTML content
-		html_content = self.generate_html_report(target, scan_data, single_target=True)
-		
-		# Write the report
+		# Write the report as it is generated
 		with open(summary_file, 'w', encoding='utf-8') as f:
-			f.write(html_content)
+			self.generate_html_report(f, target, scan_data, outputs, single_target=True)
 		
 		print(f"📋 Rich Summary Report generated: {summary_file}")
 
@@ -45,20 +126,19 @@ class RichSummary(Report):
 		summary_file = os.path.join(config['output'], 'Combined_Report.html')
 		
 		# Collect data for all targets
+		outputs = self.open_outputs(summary_file)
 		all_data = {}
 		for target in targets:
-			all_data[target.address] = await self.collect_scan_data(target)
-		
-		# Generate combined HTML
-		html_content = self.generate_combined_html_report(targets, all_data)
+			all_data[target.address] = await self.collect_scan_data(target, outputs)
+		self.close_outputs(outputs)
 		
-		# Write the report
+		# Write the combined report as it is generated
 		with open(summary_file, 'w', encoding='utf-8') as f:
-			f.write(html_content)
+			self.generate_combined_html_report(f, targets, all_data, outputs)
 		
 		print(f"📋 Combined Rich Summary Report generated: {summary_file}")
 
-	async def collect_scan_data(self, target):
+	async def collect_scan_data(self, target, outputs):
 		"""Collect all scan data for a target"""
 		
 		data = {
@@ -69,34 +149,30 @@ class RichSummary(Report):
 				'scan_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
 				'basedir': target.basedir
 			},
-			'discovered_services': target.services,
+			'discovered_services': [],
 			'port_scans': {},
 			'service_scans': {},
 			'special_files': {},
-			'file_results': {}
+			'file_results': {},
+			'key_lines': {},
+			'findings': {category: {} for category in FINDING_PATTERNS}
 		}
 		
-		# Collect port scan results
-		if target.scans.get('ports'):
-			for scan_slug, scan_info in target.scans['ports'].items():
-				if scan_info['commands']:
-					data['port_scans'][scan_slug] = {
-						'plugin_name': scan_info['plugin'].name,
-						'commands': scan_info['commands']
-					}
-		
-		# Collect service scan results
-		if target.scans.get('services'):
-			for service, service_scans in target.scans['services'].items():
-				service_tag = service.tag() if hasattr(service, 'tag') else str(service)
-				data['service_scans'][service_tag] = {}
-				
-				for plugin_slug, plugin_info in service_scans.items():
-					if plugin_info['commands']:
-						data['service_scans'][service_tag][plugin_slug] = {
-							'plugin_name': plugin_info['plugin'].name,
-							'commands': plugin_info['commands']
-						}
+		store = self.ipcrawler.store
+		
+		data['discovered_services'] = [row['full_tag'] for row in store.query('SELECT full_tag FROM services WHERE target = ? ORDER BY rowid', (target.address,))]
+		
+		# Collect port and service scan results from the commands recorded in the results store
+		for row in store.query('SELECT service, plugin_name, tag, command, outfile, errfile FROM runs WHERE target = ? ORDER BY id', (target.address,)):
+			if row['service'] is None:
+				scans = data['port_scans']
+			else:
+				scans = data['service_scans'].setdefault(row['service'].rsplit('/', 1)[0], {})
+			scans.setdefault(row['tag'], {'plugin_name': row['plugin_name'], 'commands': []})['commands'].append([row['command'], row['outfile'], row['errfile']])
+		
+		# VHosts found during the scan are domains too
+		for row in store.query('SELECT hostname FROM vhosts WHERE target = ?', (target.address,)):
+			data['findings']['domains'][row['hostname']] = None
 		
 		# Collect special files
 		special_files = {
@@ -109,8 +185,7 @@ class RichSummary(Report):
 		for filename, display_name in special_files.items():
 			file_path = os.path.join(target.scandir, filename)
 			if os.path.isfile(file_path):
-				with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-					data['special_files'][display_name] = f.read()
+				data['special_files'][display_name] = self.read_scan_file(file_path, data['findings'], outputs)
 		
 		# Collect scan result files
 		if os.path.exists(target.scandir):
@@ -125,106 +200,220 @@ class RichSummary(Report):
 							continue
 						
 						try:
-							with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-								content = f.read()
-								if content.strip():  # Only include non-empty files
-									data['file_results'][rel_path] = content
+							key_lines = {'patterns': {}, 'keywords': {}}
+							output = self.read_scan_file(file_path, data['findings'], outputs, key_lines)
+							if not output['empty']:  # Only include non-empty files
+								data['file_results'][rel_path] = output
+								data['key_lines'][rel_path] = list(dict.fromkeys(list(key_lines['patterns']) + list(key_lines['keywords'])))[:INTERESTING_LIMIT]
 						except Exception:
 							pass  # Skip files that can't be read
 		
 		return data
 
-	def generate_html_report(self, target, data, single_target=True):
-		"""Generate the main HTML report"""
+	def read_scan_file(self, file_path, findings, outputs, key_lines=None):
+		"""Read a file once, collecting findings (and its interesting lines) and copying it to the report's outputs"""
+		output = {'key': 'o' + str(outputs['count']), 'chunks': [], 'lines': 0, 'chars': 0, 'empty': True}
+		outputs['count'] += 1
+		
+		with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+			while True:
+				block = f.read(BLOCK_SIZE)
+				if not block:
+					break
+				if not block.endswith('\n'):
+					block += f.readline()
+				
+				self.add_findings(findings, block)
+				if key_lines is not None:
+					self.add_interesting_lines(key_lines, block)
+				
+				self.write_output(outputs, output, block)
+				output['lines'] += block.count('\n') + (0 if block.endswith('\n') else 1)
+				output['chars'] += len(block)
+				if output['empty'] and block.strip():
+					output['empty'] = False
 		
-		title = f"ipcrawler Report - {target.address}" if single_target else "ipcrawler Combined Report"
+		return output
+
+	def open_outputs(self, report_file):
+		"""Start copying raw outputs to script files next to the report, which it loads when they are shown"""
+		directory = os.path.splitext(report_file)[0] + '_files'
+		os.makedirs(directory, exist_ok=True)
+		for chunk in glob.glob(os.path.join(directory, 'chunk-*.js')):
+			os.remove(chunk)
+		
+		return {'directory': directory, 'name': os.path.basename(directory), 'count': 0, 'index': 0, 'file': None, 'size': 0, 'entries': 0, 'open': None}
+
+	def write_output(self, outputs, output, text):
+		"""Append text to an output, starting a new chunk file once the current one is full"""
+		if outputs['file'] is not None and outputs['size'] >= OUTPUT_CHUNK_SIZE:
+			self.close_chunk(outputs)
+		
+		if outputs['file'] is None:
+			outputs['index'] += 1
+			outputs['file'] = open(os.path.join(outputs['directory'], 'chunk-' + str(outputs['index']) + '.js'), 'w', encoding='utf-8')
+			outputs['file'].write('ipcrawlerOutputs(' + str(outputs['index']) + ', {')
+			outputs['size'] = 0
+			outputs['entries'] = 0
+		
+		# Outputs that don't fit in one chunk are continued under the same key in the next one.
+		if outputs['open'] is not output:
+			self.end_output(outputs)
+			outputs['file'].write((',' if outputs['entries'] else '') + '\n"' + output['key'] + '":"')
+			outputs['entries'] += 1
+			outputs['open'] = output
+			output['chunks'].append(outputs['index'])
+		
+		text = json.dumps(text)[1:-1]
+		outputs['file'].write(text)
+		outputs['size'] += len(text)
+
+	def end_output(self, outputs):
+		"""Close the string of the output being written to the current chunk"""
+		if outputs['open'] is not None:
+			outputs['file'].write('"')
+			outputs['open'] = None
+
+	def close_chunk(self, outputs):
+		"""Finish the current chunk file"""
+		self.end_output(outputs)
+		outputs['file'].write('\n});\n')
+		outputs['file'].close()
+		outputs['file'] = None
+
+	def close_outputs(self, outputs):
+		"""Finish copying raw outputs"""
+		if outputs['file'] is not None:
+			self.close_chunk(outputs)
+
+	def output_html(self, output):
+		"""Return a placeholder for a raw output, which is filled in when it is shown"""
+		return f'<pre class="file-text" data-chunks="{" ".join(str(chunk) for chunk in output["chunks"])}" data-key="{output["key"]}"></pre>'
+
+	def add_findings(self, findings, text):
+		"""Add the findings in a block of text, keeping at most what will be shown"""
+		for category, regexes in FINDING_REGEXES.items():
+			limit, keep_sorted = FINDING_LIMITS[category]
+			
+			for regex, group in regexes:
+				found = findings[category]
+				if not keep_sorted and len(found) >= limit:
+					break
+				
+				for match in regex.finditer(text):
+					found[match.group(group)] = None
+					if not keep_sorted and len(found) >= limit:
+						break
+				
+				# Only the first findings in sorted order are shown, so the rest can be dropped.
+				if keep_sorted and len(found) > limit:
+					findings[category] = dict.fromkeys(sorted(found)[:limit])
+
+	def add_interesting_lines(self, key_lines, text):
+		"""Add the lines in a block of text that match an interesting pattern or keyword"""
+		# Pattern matches are shown first, so only the first few are needed, along with enough keyword
+		# matches to fill up the rest even if some of them turn out to be duplicates.
+		for kind, regex, limit in [('patterns', INTERESTING_LINE, INTERESTING_LIMIT), ('keywords', INTERESTING_KEYWORD, INTERESTING_LIMIT * 2)]:
+			found = key_lines[kind]
+			position = 0
+			while len(found) < limit:
+				match = regex.search(text, position)
+				if not match:
+					break
+				
+				start = text.rfind('\n', 0, match.start()) + 1
+				end = text.find('\n', match.end())
+				if end == -1:
+					end = len(text)
+				
+				line = text[start:end].strip()
+				# Very short lines are only shown for keywords.
+				if kind == 'keywords' or len(line) >= 5:
+					found[line] = None
+				position = end + 1
+
+	def generate_html_report(self, out, target, data, outputs, single_target=True):
+		"""Write the main HTML report"""
 		
-		html_doc = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-        {self.get_css_styles()}
-    </style>
-</head>
-<body>
-    <div class="container">
-        {self.generate_header(target, data)}
-        {self.generate_key_findings_section(target, data)}
-        {self.generate_executive_summary(target, data)}
-        {self.generate_services_section(data)}
-        {self.generate_scan_results_section(data)}
-        {self.generate_commands_reference_section(data)}
-        {self.generate_special_files_section(data)}
-        {self.generate_footer()}
-    </div>
-    
-    <script>
-        {self.get_javascript()}
-    </script>
-</body>
-</html>"""
+		title = f"ipcrawler Report - {target.address}" if single_target else "ipcrawler Combined Report"
 		
-		return html_doc
+		self.generate_document_start(out, title, outputs)
+		self.generate_header(out, target, data)
+		self.generate_key_findings_section(out, target, data)
+		self.generate_executive_summary(out, target, data)
+		self.generate_services_section(out, data)
+		self.generate_scan_results_section(out, data)
+		self.generate_commands_reference_section(out, data)
+		self.generate_special_files_section(out, data)
+		self.generate_document_end(out)
 
-	def generate_combined_html_report(self, targets, all_data):
-		"""Generate combined report for multiple targets"""
+	def generate_combined_html_report(self, out, targets, all_data, outputs):
+		"""Write the combined report for multiple targets"""
 		
-		html_doc = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>ipcrawler Combined Report - {len(targets)} Targets</title>
-    <style>
-        {self.get_css_styles()}
-    </style>
-</head>
-<body>
-    <div class="container">
-        {self.generate_combined_header(targets)}
-        {self.generate_combined_overview(targets, all_data)}
-        
+		self.generate_document_start(out, f"ipcrawler Combined Report - {len(targets)} Targets", outputs)
+		self.generate_combined_header(out, targets)
+		self.generate_combined_overview(out, targets, all_data)
+		out.write("""
         <div class="targets-section">
             <h2>📋 Individual Target Reports</h2>
-"""
+""")
 		
 		# Add each target as a collapsible section
 		for target in targets:
 			data = all_data[target.address]
-			html_doc += f"""
+			out.write(f"""
             <div class="target-section">
                 <h3 onclick="toggleSection('target-{target.address.replace('.', '-')}')" class="collapsible">
                     🎯 {target.address} {data['target_info']['ip']}
                 </h3>
                 <div id="target-{target.address.replace('.', '-')}" class="collapsible-content">
-                    {self.generate_executive_summary(target, data)}
-                    {self.generate_services_section(data)}
-                    {self.generate_port_scans_section(data)}
-                    {self.generate_service_scans_section(data)}
-                    {self.generate_special_files_section(data)}
+""")
+			self.generate_executive_summary(out, target, data)
+			self.generate_services_section(out, data)
+			self.generate_scan_results_section(out, data)
+			self.generate_commands_reference_section(out, data)
+			self.generate_special_files_section(out, data)
+			out.write("""
                 </div>
             </div>
-"""
+""")
 		
-		html_doc += f"""
+		out.write("""
         </div>
-        {self.generate_footer()}
+""")
+		self.generate_document_end(out)
+
+	def generate_document_start(self, out, title, outputs):
+		"""Write the start of the HTML document, up to the report content"""
+		out.write(f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>
+        {self.get_css_styles()}
+    </style>
+</head>
+<body data-outputs="{html.escape(outputs['name'])}">
+    <div class="container">
+""")
+
+	def generate_document_end(self, out):
+		"""Write the end of the HTML document, after the report content"""
+		self.generate_footer(out)
+		out.write(f"""
     </div>
     
     <script>
         {self.get_javascript()}
     </script>
 </body>
-</html>"""
-		
-		return html_doc
+</html>""")
 
-	def generate_header(self, target, data):
-		"""Generate the report header"""
-		return f"""
+	def generate_header(self, out, target, data):
+		"""Write the report header"""
+		out.write(f"""
         <div class="header">
             <h1>🕷️ ipcrawler Rich Summary Report</h1>
             <div class="target-info">
@@ -237,17 +426,11 @@ class RichSummary(Report):
                 </div>
             </div>
         </div>
-        """
+        """)
 
 	def extract_key_findings(self, target, data):
 		"""Extract key findings from scan results"""
 		findings = {
-			'urls': set(),
-			'domains': set(),
-			'vulnerabilities': [],
-			'credentials': [],
-			'interesting_files': [],
-			'technologies': set(),
 			'cms_versions': [],
 			'open_ports': []
 		}
@@ -262,208 +445,117 @@ class RichSummary(Report):
 					service_name = parts[2] if len(parts) > 2 else 'unknown'
 					findings['open_ports'].append(f"{protocol}/{port} ({service_name})")
 		
-		# Process all file results to extract findings
-		all_content = ""
-		for content in data['file_results'].values():
-			all_content += content + "\n"
-		for content in data['special_files'].values():
-			all_content += content + "\n"
-		
-		# Extract URLs and domains
-		import re
-		
-		# URLs
-		url_patterns = [
-			r'https?://[^\s<>"]+',
-			r'http://[^\s<>"]+',
-			r'https://[^\s<>"]+',
-		]
-		for pattern in url_patterns:
-			urls = re.findall(pattern, all_content, re.IGNORECASE)
-			findings['urls'].update(urls)
-		
-		# Domain patterns
-		domain_patterns = [
-			r'([a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}\.htb',
-			r'([a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}\.local',
-			r'([a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}\.thm',
-			r'[a-zA-Z0-9][a-zA-Z0-9\-]*\.htb',
-			r'[a-zA-Z0-9][a-zA-Z0-9\-]*\.local',
-			r'[a-zA-Z0-9][a-zA-Z0-9\-]*\.thm',
-		]
-		for pattern in domain_patterns:
-			domains = re.findall(pattern, all_content, re.IGNORECASE)
-			findings['domains'].update([d[0] if isinstance(d, tuple) else d for d in domains])
-		
-		# Extract technologies and versions
-		tech_patterns = [
-			r'Server:\s*([^\r\n]+)',
-			r'X-Powered-By:\s*([^\r\n]+)',
-			r'Apache/([0-9.]+)',
-			r'nginx/([0-9.]+)',
-			r'PHP/([0-9.]+)',
-			r'WordPress\s*([0-9.]+)',
-			r'Drupal\s*([0-9.]+)',
-			r'Joomla\s*([0-9.]+)',
-		]
-		for pattern in tech_patterns:
-			matches = re.findall(pattern, all_content, re.IGNORECASE)
-			for match in matches:
-				if isinstance(match, tuple):
-					findings['technologies'].add(match[0])
-				else:
-					findings['technologies'].add(match)
-		
-		# Extract vulnerabilities
-		vuln_patterns = [
-			r'CVE-\d{4}-\d{4,7}',
-			r'VULNERABLE[^\r\n]*',
-			r'State:\s*VULNERABLE[^\r\n]*',
-			r'Exploit available[^\r\n]*',
-		]
-		for pattern in vuln_patterns:
-			vulns = re.findall(pattern, all_content, re.IGNORECASE)
-			findings['vulnerabilities'].extend(vulns)
-		
-		# Extract credentials
-		cred_patterns = [
-			r'username[^\r\n]*:\s*([^\s\r\n]+)',
-			r'password[^\r\n]*:\s*([^\s\r\n]+)',
-			r'admin:([^\s\r\n]+)',
-			r'root:([^\s\r\n]+)',
-		]
-		for pattern in cred_patterns:
-			creds = re.findall(pattern, all_content, re.IGNORECASE)
-			findings['credentials'].extend(creds)
-		
-		# Extract interesting files
-		file_patterns = [
-			r'/[a-zA-Z0-9_\-./]*\.(?:txt|log|conf|config|xml|json|sql|db|backup|bak)(?:\s|$)',
-			r'/admin[^\s]*',
-			r'/backup[^\s]*',
-			r'/config[^\s]*',
-			r'/uploads[^\s]*',
-		]
-		for pattern in file_patterns:
-			files = re.findall(pattern, all_content, re.IGNORECASE)
-			findings['interesting_files'].extend(files)
-		
-		# Clean up findings
-		findings['urls'] = sorted(list(findings['urls']))[:20]  # Limit to top 20
-		findings['domains'] = sorted(list(findings['domains']))
-		findings['technologies'] = sorted(list(findings['technologies']))
-		findings['vulnerabilities'] = list(set(findings['vulnerabilities']))[:10]
-		findings['credentials'] = list(set(findings['credentials']))[:10]
-		findings['interesting_files'] = list(set(findings['interesting_files']))[:15]
+		# Findings were collected while the files were read
+		for category, (limit, keep_sorted) in FINDING_LIMITS.items():
+			found = list(data['findings'][category])
+			findings[category] = sorted(found)[:limit] if keep_sorted else found[:limit]
 		
 		return findings
 
-	def generate_key_findings_section(self, target, data):
-		"""Generate key findings section at the top"""
+	def generate_key_findings_section(self, out, target, data):
+		"""Write key findings section at the top"""
 		findings = self.extract_key_findings(target, data)
 		
-		html_content = """
+		out.write("""
         <div class="section key-findings">
             <h2 onclick="toggleSection('key-findings')" class="collapsible">🎯 Key Findings</h2>
             <div id="key-findings" class="collapsible-content">
                 <div class="findings-grid">
-"""
+""")
 		
 		# URLs Section
 		if findings['urls']:
-			html_content += f"""
+			out.write(f"""
                     <div class="finding-card">
                         <h3>🌐 URLs Discovered</h3>
                         <div class="finding-list">
-"""
+""")
 			for url in findings['urls']:
-				html_content += f'<div class="finding-item url-item"><a href="{html.escape(url)}" target="_blank">{html.escape(url)}</a></div>'
-			html_content += """
+				out.write(f'<div class="finding-item url-item"><a href="{html.escape(url)}" target="_blank">{html.escape(url)}</a></div>')
+			out.write("""
                         </div>
                     </div>
-"""
+""")
 		
 		# Domains Section  
 		if findings['domains']:
-			html_content += f"""
+			out.write(f"""
                     <div class="finding-card">
                         <h3>🏷️ Domains & Subdomains</h3>
                         <div class="finding-list">
-"""
+""")
 			for domain in findings['domains']:
-				html_content += f'<div class="finding-item domain-item">{html.escape(domain)}</div>'
-			html_content += """
+				out.write(f'<div class="finding-item domain-item">{html.escape(domain)}</div>')
+			out.write("""
                         </div>
                     </div>
-"""
+""")
 		
 		# Vulnerabilities Section
 		if findings['vulnerabilities']:
-			html_content += f"""
+			out.write(f"""
                     <div class="finding-card vuln-card">
                         <h3>🚨 Vulnerabilities</h3>
                         <div class="finding-list">
-"""
+""")
 			for vuln in findings['vulnerabilities']:
-				html_content += f'<div class="finding-item vuln-item">{html.escape(vuln)}</div>'
-			html_content += """
+				out.write(f'<div class="finding-item vuln-item">{html.escape(vuln)}</div>')
+			out.write("""
                         </div>
                     </div>
-"""
+""")
 		
 		# Technologies Section
 		if findings['technologies']:
-			html_content += f"""
+			out.write(f"""
                     <div class="finding-card">
                         <h3>🔧 Technologies</h3>
                         <div class="finding-list">
-"""
+""")
 			for tech in findings['technologies']:
-				html_content += f'<div class="finding-item tech-item">{html.escape(tech)}</div>'
-			html_content += """
+				out.write(f'<div class="finding-item tech-item">{html.escape(tech)}</div>')
+			out.write("""
                         </div>
                     </div>
-"""
+""")
 		
 		# Interesting Files Section
 		if findings['interesting_files']:
-			html_content += f"""
+			out.write(f"""
                     <div class="finding-card">
                         <h3>📁 Interesting Files</h3>
                         <div class="finding-list">
-"""
+""")
 			for file in findings['interesting_files']:
-				html_content += f'<div class="finding-item file-item">{html.escape(file.strip())}</div>'
-			html_content += """
+				out.write(f'<div class="finding-item file-item">{html.escape(file.strip())}</div>')
+			out.write("""
                         </div>
                     </div>
-"""
+""")
 		
 		# Credentials Section
 		if findings['credentials']:
-			html_content += f"""
+			out.write(f"""
                     <div class="finding-card cred-card">
                         <h3>🔑 Potential Credentials</h3>
                         <div class="finding-list">
-"""
+""")
 			for cred in findings['credentials']:
-				html_content += f'<div class="finding-item cred-item">{html.escape(cred)}</div>'
-			html_content += """
+				out.write(f'<div class="finding-item cred-item">{html.escape(cred)}</div>')
+			out.write("""
                         </div>
                     </div>
-"""
+""")
 		
-		html_content += """
+		out.write("""
                 </div>
             </div>
         </div>
-        """
-		
-		return html_content
+        """)
 
-	def generate_combined_header(self, targets):
-		"""Generate header for combined report"""
-		return f"""
+	def generate_combined_header(self, out, targets):
+		"""Write header for combined report"""
+		out.write(f"""
         <div class="header">
             <h1>🕷️ ipcrawler Combined Report</h1>
             <div class="combined-info">
@@ -475,10 +567,10 @@ class RichSummary(Report):
                 </div>
             </div>
         </div>
-        """
+        """)
 
-	def generate_executive_summary(self, target, data):
-		"""Generate executive summary section"""
+	def generate_executive_summary(self, out, target, data):
+		"""Write executive summary section"""
 		
 		total_services = len(data['discovered_services'])
 		total_port_scans = len(data['port_scans'])
@@ -487,7 +579,7 @@ class RichSummary(Report):
 		
 		services_list = ', '.join(data['discovered_services']) if data['discovered_services'] else 'None discovered'
 		
-		return f"""
+		out.write(f"""
         <div class="section">
             <h2 onclick="toggleSection('executive-summary')" class="collapsible">📊 Executive Summary</h2>
             <div id="executive-summary" class="collapsible-content">
@@ -516,10 +608,10 @@ class RichSummary(Report):
                 </div>
             </div>
         </div>
-        """
+        """)
 
-	def generate_combined_overview(self, targets, all_data):
-		"""Generate overview for combined report"""
+	def generate_combined_overview(self, out, targets, all_data):
+		"""Write overview for combined report"""
 		
 		total_services = sum(len(data['discovered_services']) for data in all_data.values())
 		all_services = set()
@@ -528,7 +620,7 @@ class RichSummary(Report):
 		
 		unique_services = len(all_services)
 		
-		html_overview = f"""
+		out.write(f"""
         <div class="section">
             <h2 onclick="toggleSection('combined-overview')" class="collapsible">📊 Combined Overview</h2>
             <div id="combined-overview" class="collapsible-content">
@@ -559,7 +651,7 @@ class RichSummary(Report):
                             </tr>
                         </thead>
                         <tbody>
-"""
+""")
 		
 		for target in targets:
 			data = all_data[target.address]
@@ -568,37 +660,36 @@ class RichSummary(Report):
 			if len(data['discovered_services']) > 5:
 				key_services += f" (+{len(data['discovered_services']) - 5} more)"
 			
-			html_overview += f"""
+			out.write(f"""
                             <tr>
                                 <td><strong>{target.address}</strong></td>
                                 <td>{data['target_info']['ip']}</td>
                                 <td>{services_count}</td>
                                 <td>{key_services or 'None'}</td>
                             </tr>
-"""
+""")
 		
-		html_overview += """
+		out.write("""
                         </tbody>
                     </table>
                 </div>
             </div>
         </div>
-        """
-		
-		return html_overview
+        """)
 
-	def generate_services_section(self, data):
-		"""Generate discovered services section"""
+	def generate_services_section(self, out, data):
+		"""Write discovered services section"""
 		
 		if not data['discovered_services']:
-			return '<div class="section"><h2>🔍 No Services Discovered</h2></div>'
+			out.write('<div class="section"><h2>🔍 No Services Discovered</h2></div>')
+			return
 		
-		html_content = f"""
+		out.write(f"""
         <div class="section">
             <h2 onclick="toggleSection('services')" class="collapsible">🔍 Discovered Services ({len(data['discovered_services'])})</h2>
             <div id="services" class="collapsible-content">
                 <div class="services-grid">
-"""
+""")
 		
 		for service in data['discovered_services']:
 			# Parse service for better display
@@ -608,334 +699,277 @@ class RichSummary(Report):
 				port = parts[1]
 				service_name = parts[2]
 				
-				html_content += f"""
+				out.write(f"""
                     <div class="service-card">
                         <div class="service-port">{protocol.upper()}/{port}</div>
                         <div class="service-name">{service_name}</div>
                     </div>
-"""
+""")
 			else:
-				html_content += f"""
+				out.write(f"""
                     <div class="service-card">
                         <div class="service-name">{service}</div>
                     </div>
-"""
+""")
 		
-		html_content += """
+		out.write("""
                 </div>
             </div>
         </div>
-        """
-		
-		return html_content
+        """)
 
-	def generate_scan_results_section(self, data):
-		"""Generate scan results section - focuses on findings, not commands"""
+	def generate_scan_results_section(self, out, data):
+		"""Write scan results section - focuses on findings, not commands"""
 		
 		if not data['file_results']:
-			return ''
+			return
 		
-		html_content = f"""
+		out.write(f"""
         <div class="section">
             <h2 onclick="toggleSection('scan-results')" class="collapsible">📊 Scan Results & Findings ({len(data['file_results'])} files)</h2>
             <div id="scan-results" class="collapsible-content">
-"""
+""")
 		
 		# Group files by directory
 		file_groups = {}
-		for file_path, content in data['file_results'].items():
+		for file_path, output in data['file_results'].items():
 			dir_name = os.path.dirname(file_path) or 'root'
 			if dir_name not in file_groups:
 				file_groups[dir_name] = []
-			file_groups[dir_name].append((file_path, content))
+			file_groups[dir_name].append((file_path, output))
 		
 		for dir_name, files in file_groups.items():
 			dir_id = dir_name.replace('/', '-').replace(' ', '-')
-			html_content += f"""
+			out.write(f"""
                 <div class="results-group">
                     <h3 onclick="toggleSection('results-{dir_id}')" class="results-header">
                         📁 {dir_name}/ Results ({len(files)} files)
                     </h3>
                     <div id="results-{dir_id}" class="results-content">
-"""
+""")
 			
-			for file_path, content in files:
+			for file_path, output in files:
 				file_name = os.path.basename(file_path)
 				file_id = file_path.replace('/', '-').replace('.', '-')
 				
-				# Extract key findings from this file
-				key_lines = self.extract_interesting_lines(content)
+				# Key findings from this file
+				key_lines = data['key_lines'].get(file_path, [])
 				
-				html_content += f"""
+				out.write(f"""
                         <div class="result-file">
                             <h4 onclick="toggleSection('result-{file_id}')" class="file-header">
                                 📄 {file_name} - Key Findings
                             </h4>
                             <div id="result-{file_id}" class="file-content">
-"""
+""")
 				
 				if key_lines:
-					html_content += '<div class="key-findings-box">'
-					for line in key_lines[:20]:  # Show top 20 interesting lines
+					out.write('<div class="key-findings-box">')
+					for line in key_lines:  # Show top 20 interesting lines
 						escaped_line = html.escape(line.strip())
-						html_content += f'<div class="key-line">{escaped_line}</div>'
-					html_content += '</div>'
+						out.write(f'<div class="key-line">{escaped_line}</div>')
+					out.write('</div>')
 				
-				html_content += f"""
+				out.write(f"""
                                 <div class="full-output-toggle">
                                     <button onclick="toggleFullOutput('full-{file_id}')" class="toggle-btn">
-                                        📄 Show Full Output ({len(content.splitlines())} lines)
+                                        📄 Show Full Output ({output['lines']} lines)
                                     </button>
                                     <div id="full-{file_id}" class="full-output" style="display: none;">
-                                        <pre class="file-text">{html.escape(content)}</pre>
+                                        {self.output_html(output)}
                                     </div>
                                 </div>
                             </div>
                         </div>
-"""
+""")
 			
-			html_content += """
+			out.write("""
                     </div>
                 </div>
-"""
+""")
 		
-		html_content += """
+		out.write("""
             </div>
         </div>
-        """
-		
-		return html_content
-
-	def extract_interesting_lines(self, content):
-		"""Extract the most interesting lines from scan output"""
-		lines = content.splitlines()
-		interesting = []
-		
-		# Patterns for interesting information
-		patterns = [
-			r'http[s]?://[^\s]+',  # URLs
-			r'\d+/tcp\s+open',     # Open ports
-			r'\d+/udp\s+open',     # Open UDP ports
-			r'CVE-\d{4}-\d{4,7}',  # CVEs
-			r'VULNERABLE',         # Vulnerabilities
-			r'Server:\s*[^\r\n]+', # Server headers
-			r'Location:\s*[^\r\n]+', # Redirects
-			r'Title:\s*[^\r\n]+',  # Page titles
-			r'/[a-zA-Z0-9_\-/]+\.(php|asp|aspx|jsp|cgi|pl)', # Interesting files
-			r'admin|login|password|config|backup', # Interesting keywords
-			r'Directory listing|Index of', # Directory listings
-			r'Error|Exception|Warning.*:', # Errors that might reveal info
-			r'SQL|MySQL|PostgreSQL|Oracle', # Database info
-			r'WordPress|Drupal|Joomla', # CMS detection
-		]
-		
-		for line in lines:
-			line = line.strip()
-			if len(line) < 5:  # Skip very short lines
-				continue
-				
-			for pattern in patterns:
-				if re.search(pattern, line, re.IGNORECASE):
-					interesting.append(line)
-					break
-		
-		# Also include lines with specific keywords
-		keyword_lines = []
-		keywords = ['discovered', 'found', 'detected', 'identified', 'vulnerable', 'exploit', 'shell', 'flag']
-		for line in lines:
-			if any(keyword in line.lower() for keyword in keywords):
-				keyword_lines.append(line.strip())
-		
-		interesting.extend(keyword_lines)
-		
-		# Remove duplicates and return
-		return list(dict.fromkeys(interesting))
+        """)
 
-	def generate_commands_reference_section(self, data):
-		"""Generate commands reference section - moved to bottom"""
+	def generate_commands_reference_section(self, out, data):
+		"""Write commands reference section - moved to bottom"""
 		
 		if not data['port_scans'] and not data['service_scans']:
-			return ''
+			return
 		
 		total_commands = len(data['port_scans']) + sum(len(scans) for scans in data['service_scans'].values())
 		
-		html_content = f"""
+		out.write(f"""
         <div class="section commands-section">
             <h2 onclick="toggleSection('commands-ref')" class="collapsible">⚡ Commands Reference ({total_commands} scans)</h2>
             <div id="commands-ref" class="collapsible-content" style="display: none;">
                 <p class="section-note">📝 This section shows the exact commands that were executed during the scan.</p>
-"""
+""")
 		
 		# Port scans
 		if data['port_scans']:
-			html_content += f"""
+			out.write(f"""
                 <div class="commands-group">
                     <h3 onclick="toggleSection('port-commands')" class="commands-header">
                         🔍 Port Scan Commands ({len(data['port_scans'])})
                     </h3>
                     <div id="port-commands" class="commands-content" style="display: none;">
-"""
+""")
 			
 			for scan_slug, scan_info in data['port_scans'].items():
-				html_content += f"""
+				out.write(f"""
                         <div class="command-item">
                             <h4>{scan_info['plugin_name']} ({scan_slug})</h4>
-"""
+""")
 				
 				for command in scan_info['commands']:
 					cmd_text = html.escape(command[0]) if command[0] else 'No command recorded'
-					html_content += f'<div class="command"><code>{cmd_text}</code></div>'
+					out.write(f'<div class="command"><code>{cmd_text}</code></div>')
 				
-				html_content += '</div>'
+				out.write('</div>')
 			
-			html_content += '</div></div>'
+			out.write('</div></div>')
 		
 		# Service scans
 		if data['service_scans']:
 			total_service_scans = sum(len(scans) for scans in data['service_scans'].values())
-			html_content += f"""
+			out.write(f"""
                 <div class="commands-group">
                     <h3 onclick="toggleSection('service-commands')" class="commands-header">
                         🔧 Service Scan Commands ({total_service_scans})
                     </h3>
                     <div id="service-commands" class="commands-content" style="display: none;">
-"""
+""")
 			
 			for service_tag, service_scans in data['service_scans'].items():
-				html_content += f"""
+				out.write(f"""
                         <div class="service-commands">
                             <h4>{service_tag} Commands</h4>
-"""
+""")
 				
 				for plugin_slug, plugin_info in service_scans.items():
-					html_content += f"""
+					out.write(f"""
                             <div class="command-item">
                                 <h5>{plugin_info['plugin_name']} ({plugin_slug})</h5>
-"""
+""")
 					
 					for command in plugin_info['commands']:
 						cmd_text = html.escape(command[0]) if command[0] else 'No command recorded'
-						html_content += f'<div class="command"><code>{cmd_text}</code></div>'
+						out.write(f'<div class="command"><code>{cmd_text}</code></div>')
 					
-					html_content += '</div>'
+					out.write('</div>')
 				
-				html_content += '</div>'
+				out.write('</div>')
 			
-			html_content += '</div></div>'
+			out.write('</div></div>')
 		
-		html_content += """
+		out.write("""
             </div>
         </div>
-        """
-		
-		return html_content
+        """)
 
-	def generate_special_files_section(self, data):
-		"""Generate special files section"""
+	def generate_special_files_section(self, out, data):
+		"""Write special files section"""
 		
 		if not data['special_files']:
-			return ''
+			return
 		
-		html_content = f"""
+		out.write(f"""
         <div class="section">
             <h2 onclick="toggleSection('special-files')" class="collapsible">📋 Key Files & Logs ({len(data['special_files'])})</h2>
             <div id="special-files" class="collapsible-content">
-"""
+""")
 		
-		for display_name, content in data['special_files'].items():
-			content_escaped = html.escape(content)
-			
-			html_content += f"""
+		for display_name, output in data['special_files'].items():
+
+			out.write(f"""
                 <div class="special-file">
                     <h3 onclick="toggleSection('file-{display_name.replace(' ', '-').lower()}')" class="file-header">
-                        📄 {display_name} ({len(content.splitlines())} lines)
+                        📄 {display_name} ({output['lines']} lines)
                     </h3>
                     <div id="file-{display_name.replace(' ', '-').lower()}" class="file-content">
-                        <pre class="file-text">{content_escaped}</pre>
+                        {self.output_html(output)}
                     </div>
                 </div>
-"""
+""")
 		
-		html_content += """
+		out.write("""
             </div>
         </div>
-        """
-		
-		return html_content
+        """)
 
-	def generate_detailed_results_section(self, data):
-		"""Generate detailed scan results section"""
+	def generate_detailed_results_section(self, out, data):
+		"""Write detailed scan results section"""
 		
 		if not data['file_results']:
-			return ''
+			return
 		
-		html_content = f"""
+		out.write(f"""
         <div class="section">
             <h2 onclick="toggleSection('detailed-results')" class="collapsible">📁 Detailed Scan Results ({len(data['file_results'])} files)</h2>
             <div id="detailed-results" class="collapsible-content">
                 <div class="files-grid">
-"""
+""")
 		
 		# Group files by directory
 		file_groups = {}
-		for file_path, content in data['file_results'].items():
+		for file_path, output in data['file_results'].items():
 			dir_name = os.path.dirname(file_path) or 'root'
 			if dir_name not in file_groups:
 				file_groups[dir_name] = []
-			file_groups[dir_name].append((file_path, content))
+			file_groups[dir_name].append((file_path, output))
 		
 		for dir_name, files in file_groups.items():
 			dir_id = dir_name.replace('/', '-').replace(' ', '-')
-			html_content += f"""
+			out.write(f"""
                 <div class="file-group">
                     <h3 onclick="toggleSection('dir-{dir_id}')" class="dir-header">
                         📁 {dir_name}/ ({len(files)} files)
                     </h3>
                     <div id="dir-{dir_id}" class="dir-content">
-"""
+""")
 			
-			for file_path, content in files:
+			for file_path, output in files:
 				file_name = os.path.basename(file_path)
 				file_id = file_path.replace('/', '-').replace('.', '-')
-				content_escaped = html.escape(content)
 				
-				html_content += f"""
+				out.write(f"""
                         <div class="result-file">
                             <h4 onclick="toggleSection('file-{file_id}')" class="file-header">
-                                📄 {file_name} ({len(content)} chars)
+                                📄 {file_name} ({output['chars']} chars)
                             </h4>
                             <div id="file-{file_id}" class="file-content">
                                 <div class="file-info">
                                     <strong>Path:</strong> {file_path}<br>
-                                    <strong>Size:</strong> {len(content)} characters, {len(content.splitlines())} lines
+                                    <strong>Size:</strong> {output['chars']} characters, {output['lines']} lines
                                 </div>
-                                <pre class="file-text">{content_escaped}</pre>
+                                {self.output_html(output)}
                             </div>
                         </div>
-"""
+""")
 			
-			html_content += """
+			out.write("""
                     </div>
                 </div>
-"""
+""")
 		
-		html_content += """
+		out.write("""
                 </div>
             </div>
         </div>
-        """
-		
-		return html_content
+        """)
 
-	def generate_footer(self):
-		"""Generate report footer"""
-		return f"""
+	def generate_footer(self, out):
+		"""Write report footer"""
+		out.write(f"""
         <div class="footer">
             <hr>
             <p>📋 Generated by <strong>ipcrawler Rich Summary</strong> plugin on {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}</p>
             <p>🔍 Based on AutoRecon by Tib3rius | Enhanced for OSCP & CTF environments</p>
         </div>
-        """
+        """)
 
 	def get_css_styles(self):
 		"""Return CSS styles for the HTML report"""
@@ -1475,11 +1509,64 @@ class RichSummary(Report):
 	def get_javascript(self):
 		"""Return JavaScript for interactive features"""
 		return """
+        // Raw outputs are kept in script files next to the report, and only loaded once they are shown.
+        const outputChunks = {};
+        const pendingChunks = {};
+        
+        function ipcrawlerOutputs(index, outputs) {
+            outputChunks[index] = outputs;
+            (pendingChunks[index] || []).forEach(callback => callback());
+            delete pendingChunks[index];
+        }
+        
+        function loadChunk(index, callback) {
+            if (outputChunks[index]) {
+                callback();
+                return;
+            }
+            if (!pendingChunks[index]) {
+                pendingChunks[index] = [];
+                const script = document.createElement('script');
+                script.src = document.body.dataset.outputs + '/chunk-' + index + '.js';
+                document.head.appendChild(script);
+            }
+            pendingChunks[index].push(callback);
+        }
+        
+        function loadOutput(element) {
+            if (element.dataset.loaded) {
+                return;
+            }
+            element.dataset.loaded = 'true';
+            element.textContent = 'Loading...';
+            
+            const chunks = element.dataset.chunks.split(' ').filter(index => index);
+            let remaining = chunks.length;
+            if (remaining === 0) {
+                element.textContent = '';
+            }
+            chunks.forEach(index => loadChunk(index, () => {
+                remaining -= 1;
+                if (remaining === 0) {
+                    element.textContent = chunks.map(index => outputChunks[index][element.dataset.key]).join('');
+                }
+            }));
+        }
+        
+        function loadVisibleOutputs(root) {
+            root.querySelectorAll('pre[data-chunks]').forEach(element => {
+                if (element.offsetParent !== null) {
+                    loadOutput(element);
+                }
+            });
+        }
+        
         function toggleSection(sectionId) {
             const content = document.getElementById(sectionId);
             if (content) {
                 if (content.style.display === 'none') {
                     content.style.display = 'block';
+                    loadVisibleOutputs(content);
                 } else {
                     content.style.display = 'none';
                 }
@@ -1493,6 +1580,7 @@ class RichSummary(Report):
             if (output.style.display === 'none') {
                 output.style.display = 'block';
                 button.textContent = button.textContent.replace('Show', 'Hide');
+                loadVisibleOutputs(output);
             } else {
                 output.style.display = 'none';
                 button.textContent = button.textContent.replace('Hide', 'Show');
@@ -1527,5 +1615,7 @@ class RichSummary(Report):
             if (specialFiles) {
                 specialFiles.style.display = 'block';
             }
+            
+            loadVisibleOutputs(document);
         });
         """ 
\ No newline at end of file
@@ -11,7 +11,7 @@ class SMBVuln(ServiceScan):
 		self.match_service_name(['^smb', '^microsoft\-ds', '^netbios'])
 
 	async def run(self, service):
-		await service.execute('nmap {nmap_extra} -sV -p {port} --script="smb-vuln-*" --script-args="unsafe=1" -oN "{scandir}/{protocol}_{port}_smb_vulnerabilities.txt" -oX "{scandir}/xml/{protocol}_{port}_smb_vulnerabilities.xml" {address}')
+		await service.nmap_scripts('smb-vuln-*', '{protocol}_{port}_smb_vulnerabilities.txt', 'xml/{protocol}_{port}_smb_vulnerabilities.xml', script_args='unsafe=1')
 
 	def manual(self, service, plugin_was_run):
 		if not plugin_was_run: # Only suggest these if they weren't run.
@@ -6,6 +6,7 @@ class SMTPUserEnum(ServiceScan):
 		super().__init__()
 		self.name = 'SMTP-User-Enum'
 		self.tags = ['default', 'safe', 'smtp', 'email']
+		self.capture_output = False
 
 	def configure(self):
 		self.match_service_name('^smtp')
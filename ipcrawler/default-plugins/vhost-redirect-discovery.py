@@ -2,13 +2,10 @@ from ipcrawler.config import config
 from ipcrawler.plugins import ServiceScan
 from ipcrawler.io import vhost_manager
 import requests
-import urllib3
 import ipaddress
 from urllib.parse import urlparse
 import os
 
-urllib3.disable_warnings()
-
 class VHostRedirectHunter(ServiceScan):
 
     def __init__(self):
@@ -46,11 +43,8 @@ class VHostRedirectHunter(ServiceScan):
             timeout = vhost_config.get('request_timeout', 10)
             user_agent = vhost_config.get('user_agent', 'ipcrawler-vhost-hunter/1.0')
             
-            # Use requests for better control and parsing
-            resp = requests.get(
-                url, 
-                verify=False, 
-                allow_redirects=False, 
+            resp = await service.http_fetch(
+                '/',
                 timeout=timeout,
                 headers={'User-Agent': user_agent}
             )
@@ -86,6 +80,7 @@ class VHostRedirectHunter(ServiceScan):
                     }
                     
                     service.target.discovered_vhosts.append(vhost_info)
+                    service.add_vhost(redirect_host)
                     service.info(f"✅ VHost discovered: {redirect_host}")
                     service.info(f"   Redirect: {url} → {location}")
                     
@@ -1,8 +1,6 @@
 from ipcrawler.plugins import ServiceScan
 from shutil import which
-import os, requests, random, string, urllib3
-
-urllib3.disable_warnings()
+import os, requests, random, string
 
 class VirtualHost(ServiceScan):
 
@@ -12,6 +10,7 @@ class VirtualHost(ServiceScan):
 		self.slug = 'vhost-enum'
 		self.tags = ['default', 'safe', 'http', 'long']
 		self.priority = 5  # Lower priority than VHost Redirect Hunter
+		self.capture_output = False
 
 	def configure(self):
 		self.add_option('hostname', help='The hostname to use as the base host (e.g. example.com) for virtual host enumeration. Default: %(default)s')
@@ -34,10 +33,9 @@ class VirtualHost(ServiceScan):
 				name = os.path.splitext(os.path.basename(wordlist))[0]
 				for hostname in hostnames:
 					try:
-						wildcard = requests.get(
-							('https' if service.secure else 'http') + '://' + service.target.address + ':' + str(service.port) + '/',
+						wildcard = await service.http_request(
+							'GET',
 							headers={'Host': ''.join(random.choice(string.ascii_letters) for _ in range(20)) + '.' + hostname},
-							verify=False,
 							allow_redirects=False
 						)
 						size = str(len(wildcard.content))
@@ -0,0 +1,79 @@
+import os, sqlite3, time
+from ipcrawler.io import error
+
+# Estimates are only made from at least this many durations, and only the most recent durations are kept.
+MIN_SAMPLES = 3
+MAX_SAMPLES = 100
+
+# How long plugins (and whole targets) have taken in earlier scans, kept in the user data directory so that
+# progress bars, ETAs and the order scans are started in can be based on real durations instead of guesses.
+# Durations are loaded when the scan starts and the new ones are saved when it ends. Port scans and whole
+# targets are recorded with an empty service name.
+class DurationStore(object):
+
+	def __init__(self, path):
+		self.path = path
+		self.durations = {}
+		self.new = []
+		self.estimates = {}
+
+	def load(self):
+		try:
+			os.makedirs(os.path.dirname(self.path), exist_ok=True)
+			connection = sqlite3.connect(self.path)
+			with connection:
+				connection.execute('CREATE TABLE IF NOT EXISTS durations (plugin TEXT, service TEXT, duration REAL, recorded REAL)')
+				connection.execute('CREATE INDEX IF NOT EXISTS durations_plugin ON durations (plugin, service)')
+			rows = connection.execute('SELECT plugin, service, duration FROM durations ORDER BY recorded').fetchall()
+			connection.close()
+		except sqlite3.Error as ex:
+			error('Could not read plugin durations from ' + self.path + ': ' + str(ex))
+			return
+
+		for plugin, service, duration in rows:
+			self.durations.setdefault((plugin, service), []).append(duration)
+
+	def add(self, plugin, service, duration):
+		self.durations.setdefault((plugin, service), []).append(duration)
+		self.new.append((plugin, service, duration, time.time()))
+		self.estimates.pop((plugin, service), None)
+		self.estimates.pop((plugin, None), None)
+
+	# Returns the median and 90th percentile of how long the plugin took against the service, or against
+	# any service if it hasn't run against this one often enough, or None if there are too few durations.
+	def estimate(self, plugin, service=''):
+		for key in [(plugin, service), (plugin, None)]:
+			if key not in self.estimates:
+				if key[1] is None:
+					durations = [d for (p, _), values in self.durations.items() if p == plugin for d in values[-MAX_SAMPLES:]]
+				else:
+					durations = self.durations.get(key, [])[-MAX_SAMPLES:]
+
+				if len(durations) >= MIN_SAMPLES:
+					durations = sorted(durations)
+					self.estimates[key] = (durations[len(durations) // 2], durations[min(len(durations) - 1, int(len(durations) * 0.9))])
+				else:
+					self.estimates[key] = None
+
+			if self.estimates[key] is not None:
+				return self.estimates[key]
+
+		return None
+
+	# Save the durations recorded during this scan, keeping only the most recent for each plugin and service.
+	def save(self):
+		if not self.new:
+			return
+
+		try:
+			connection = sqlite3.connect(self.path)
+			with connection:
+				connection.executemany('INSERT INTO durations (plugin, service, duration, recorded) VALUES (?, ?, ?, ?)', self.new)
+				for plugin, service in set((plugin, service) for plugin, service, _, _ in self.new):
+					connection.execute('DELETE FROM durations WHERE rowid IN (SELECT rowid FROM durations WHERE plugin = ? AND service = ? ORDER BY recorded DESC LIMIT -1 OFFSET ?)', (plugin, service, MAX_SAMPLES))
+			connection.close()
+		except sqlite3.Error as ex:
+			error('Could not save plugin durations to ' + self.path + ': ' + str(ex))
+			return
+
+		self.new = []
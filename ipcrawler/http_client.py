@@ -0,0 +1,74 @@
+import asyncio, functools, http.cookiejar, threading, requests, urllib3
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+urllib3.disable_warnings()
+
+# Shared HTTP client for plugins. Requests are made on a thread pool so that a slow web server never
+# blocks the event loop, connections are pooled per scheme://host:port, and each target only has a
+# few requests in flight at once. TLS certificates are not verified and every request has a timeout.
+class HTTPClient(object):
+
+	def __init__(self, max_workers=20, target_limit=4, timeout=10):
+		self.max_workers = max_workers
+		self.target_limit = target_limit
+		self.timeout = timeout
+		self.executor = None
+		self.sessions = {}
+		self.lock = threading.Lock()
+		self.target_semaphores = {}
+
+	def _session(self, url):
+		url = urlsplit(url)
+		key = (url.scheme, url.hostname, url.port)
+		with self.lock:
+			if key not in self.sessions:
+				session = requests.Session()
+				session.verify = False
+				# Like requests.get(), don't carry cookies over from one request to the next.
+				session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+				self.sessions[key] = session
+			return self.sessions[key]
+
+	def _request(self, method, url, kwargs):
+		return self._session(url).request(method, url, **kwargs)
+
+	async def request(self, method, url, target=None, **kwargs):
+		kwargs.setdefault('timeout', self.timeout)
+		kwargs.setdefault('verify', False)
+
+		if self.executor is None:
+			self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='HTTPClient')
+
+		call = functools.partial(self._request, method, url, kwargs)
+		loop = asyncio.get_running_loop()
+
+		if target is None:
+			return await loop.run_in_executor(self.executor, call)
+
+		if target.address not in self.target_semaphores:
+			self.target_semaphores[target.address] = asyncio.Semaphore(self.target_limit)
+
+		async with self.target_semaphores[target.address]:
+			return await loop.run_in_executor(self.executor, call)
+
+	def release(self, target):
+		self.target_semaphores.pop(target.address, None)
+
+	def close(self):
+		if self.executor is not None:
+			self.executor.shutdown(wait=False)
+			self.executor = None
+		with self.lock:
+			for session in self.sessions.values():
+				session.close()
+			self.sessions.clear()
+
+# Formats a response like curl -i does, with the status line and headers before the body.
+def raw_response(response):
+	version = {10:'HTTP/1.0', 11:'HTTP/1.1'}.get(getattr(response.raw, 'version', 11), 'HTTP/1.1')
+	lines = [version + ' ' + str(response.status_code) + ' ' + (response.reason or '')]
+	headers = getattr(response.raw, 'headers', None) or response.headers
+	for name, value in headers.items():
+		lines.append(name + ': ' + value)
+	return '\n'.join(lines) + '\n\n' + response.content.decode('utf8', errors='replace')
@@ -1,4 +1,10 @@
-import asyncio, colorama, os, re, string, sys, unidecode, time, math
+import asyncio, atexit, colorama, glob, os, queue, re, string, sys, threading, unidecode, time, math
+from collections import deque
+
+try:
+	from re import _parser as sre_parse
+except ImportError:
+	import sre_parse
 from colorama import Fore, Style
 from ipcrawler.config import config
 
@@ -920,32 +926,392 @@ class VHostManager:
 # Global VHost manager instance
 vhost_manager = VHostManager()
 
+# Writes scan output from a background thread so the event loop never blocks on disk I/O. Files are
+# kept open until they are closed or the writer stops, and are flushed at least once per interval.
+class OutputWriter(object):
+
+	def __init__(self, interval=1):
+		self.interval = interval
+		self.queue = queue.Queue()
+		self.thread = None
+		self.lock = threading.Lock()
+
+	def _start(self):
+		with self.lock:
+			if self.thread is None:
+				self.thread = threading.Thread(target=self._run, name='OutputWriter', daemon=True)
+				self.thread.start()
+				atexit.register(self.stop)
+
+	def write(self, path, data):
+		self._start()
+		self.queue.put(('write', path, data, None))
+
+	# Empty the file, creating it if it doesn't exist.
+	def truncate(self, path):
+		self._start()
+		self.queue.put(('truncate', path, None, None))
+
+	# Wait until everything written to the file is on disk, and close it.
+	async def close(self, path):
+		await self._wait('close', path)
+
+	# Wait until everything written to files in the directory (e.g. a finished target's) is on disk, and close them.
+	async def close_directory(self, path):
+		await self._wait('close_directory', os.path.join(os.path.abspath(path), ''))
+
+	# Wait until everything written so far is on disk.
+	async def flush(self):
+		await self._wait('flush', None)
+
+	async def _wait(self, op, path):
+		self._start()
+		loop = asyncio.get_running_loop()
+		future = loop.create_future()
+		self.queue.put((op, path, None, (loop, future)))
+		await future
+
+	def stop(self):
+		if self.thread is not None and self.thread.is_alive():
+			self.queue.put(('stop', None, None, None))
+			self.thread.join()
+
+	def _run(self):
+		handles = {}
+		dirty = set()
+		last_flush = time.monotonic()
+
+		def flush():
+			for path in dirty:
+				handles[path].flush()
+			dirty.clear()
+
+		while True:
+			try:
+				op, path, data, waiter = self.queue.get(timeout=self.interval)
+			except queue.Empty:
+				flush()
+				last_flush = time.monotonic()
+				continue
+
+			try:
+				if op == 'write':
+					if path not in handles:
+						handles[path] = open(path, 'a')
+					handles[path].write(data)
+					dirty.add(path)
+				elif op in ['truncate', 'close']:
+					if path in handles:
+						handles.pop(path).close()
+						dirty.discard(path)
+					if op == 'truncate':
+						open(path, 'w').close()
+				elif op == 'close_directory':
+					for filename in [filename for filename in handles if os.path.abspath(filename).startswith(path)]:
+						handles.pop(filename).close()
+						dirty.discard(filename)
+				else:
+					flush()
+					if op == 'stop':
+						for handle in handles.values():
+							handle.close()
+						handles.clear()
+			except OSError as ex:
+				error('Could not write to ' + str(path) + ': ' + str(ex))
+			finally:
+				if waiter is not None:
+					loop, future = waiter
+					try:
+						loop.call_soon_threadsafe(lambda future=future: future.done() or future.set_result(None))
+					except RuntimeError:
+						# The event loop has already been closed.
+						pass
+
+			if op == 'stop':
+				break
+
+			if time.monotonic() - last_flush >= self.interval:
+				flush()
+				last_flush = time.monotonic()
+
+output_writer = OutputWriter()
+
+# Returns the longest run of literal characters that every match of a regex must contain, or None.
+def required_literal(regex):
+	try:
+		parsed = sre_parse.parse(regex.pattern, regex.flags)
+	except Exception:
+		return None
+
+	best = ''
+	def walk(items):
+		nonlocal best
+		run = ''
+		for op, av in items:
+			if op == sre_parse.LITERAL:
+				run += chr(av)
+				continue
+
+			best = max(best, run, key=len)
+			run = ''
+			# Groups are always matched, as long as they don't change the flags.
+			if op == sre_parse.SUBPATTERN and not av[1] and not av[2]:
+				walk(av[-1])
+		best = max(best, run, key=len)
+
+	walk(parsed)
+	return best or None
+
+# Matches a line against a list of Patterns. Patterns are skipped with a substring test when the line doesn't
+# contain a literal the pattern requires (e.g. "CVE-"), and patterns without one are combined into a single
+# regex which rejects most lines in one scan. An alternation can't say which of its patterns all match a
+# line though, so the individual patterns still run on the lines that get through.
+class PatternSet(object):
+
+	def __init__(self, patterns):
+		self.entries = []
+		self.combined = None
+
+		unfiltered = []
+		for p in patterns:
+			ignorecase = bool(p.pattern.flags & re.IGNORECASE)
+			literal = required_literal(p.pattern)
+			if literal and ignorecase:
+				literal = literal.lower()
+			elif not literal:
+				unfiltered.append(p.pattern)
+
+			placeholders = []
+			if p.description:
+				placeholders = sorted(set(int(n) for n in re.findall(r'\{match(\d+)\}', p.description)))
+
+			self.entries.append((p, literal, ignorecase, placeholders))
+
+		if len(unfiltered) > 1:
+			sources = []
+			for regex in unfiltered:
+				flags = ''.join(f for f, flag in [('i', re.IGNORECASE), ('m', re.MULTILINE), ('s', re.DOTALL), ('x', re.VERBOSE)] if regex.flags & flag)
+				source = re.sub(r'^\(\?[imsxu]+\)', '', regex.pattern)
+				# Patterns with other inline flags or backreferences can't be combined, so don't filter at all then.
+				if re.search(r'\(\?[aiLmsux]+\)|\\\d|\(\?P=', source):
+					sources = None
+					break
+				sources.append('(?' + flags + ':' + source + ')' if flags else '(?:' + source + ')')
+
+			if sources:
+				try:
+					self.combined = re.compile('|'.join(sources))
+				except re.error:
+					# e.g. the same group name is used by more than one pattern.
+					self.combined = None
+
+	# Returns the patterns that could match somewhere in a block of text, for use with match().
+	def candidates(self, text):
+		candidates = []
+		lower = None
+
+		for entry in self.entries:
+			if entry[1] and entry[2] and lower is None and text.isascii():
+				lower = text.lower()
+			if self._contains(entry, text, lower):
+				candidates.append(entry)
+
+		return candidates
+
+	def _contains(self, entry, text, lower=None):
+		_, literal, ignorecase, _ = entry
+		if not literal:
+			return True
+		if ignorecase:
+			# Case-insensitive regexes also match some non-ASCII characters against ASCII ones.
+			if not text.isascii():
+				return True
+			return literal in (lower if lower is not None else text.lower())
+		return literal in text
+
+	# Yields (pattern, matched text, description) for every pattern matching the line, in order. The
+	# description has its placeholders filled in, or is None if the pattern doesn't have one.
+	def match(self, line, entries=None):
+		lower = None
+		rejected = None
+
+		for entry in (self.entries if entries is None else entries):
+			p, literal, ignorecase, placeholders = entry
+			if literal:
+				if ignorecase and lower is None and line.isascii():
+					lower = line.lower()
+				if not self._contains(entry, line, lower):
+					continue
+			elif self.combined is not None:
+				if rejected is None:
+					rejected = self.combined.search(line) is None
+				if rejected:
+					continue
+
+			match = p.pattern.search(line)
+			if not match:
+				continue
+
+			if not p.description:
+				yield p, match.group(0), None
+				continue
+
+			description = p.description.replace('{match}', match.group(0))
+			if placeholders:
+				groups = p.pattern.groups
+				if groups > 1:
+					values = match.groups('')
+				elif placeholders[-1] == 1:
+					values = [match.group(groups) or '']
+				else:
+					# With one group or none, {match2} and up refer to later matches on the same line.
+					values = p.pattern.findall(line)
+
+				for n in placeholders:
+					if n <= len(values):
+						description = description.replace('{match' + str(n) + '}', values[n - 1])
+
+			yield p, match.group(0), description
+
+# Index of the files in a directory (recursively), used by reports to find the files that a command
+# wrote or refers to without checking every file against every command.
+class FileIndex(object):
+
+	def __init__(self, directory, extensions):
+		self.directory = os.path.abspath(directory)
+		self.positions = {}
+		for filename in glob.iglob(os.path.join(self.directory, '**/*'), recursive=True):
+			if os.path.isfile(filename) and filename.endswith(extensions):
+				self.positions[os.path.abspath(filename)] = len(self.positions)
+		self.lengths = sorted(set(len(filename) for filename in self.positions))
+
+	# Returns the files whose path appears in a recorded [cmd, outfile, errfile] command, or that are its
+	# outfile or errfile, in the order they were found in the directory.
+	def match(self, command):
+		found = set()
+
+		cmd = command[0]
+		position = cmd.find(self.directory)
+		while position != -1:
+			for length in self.lengths:
+				if cmd[position:position + length] in self.positions:
+					found.add(cmd[position:position + length])
+			position = cmd.find(self.directory, position + 1)
+
+		for filename in command[1:3]:
+			if filename is not None and filename in self.positions:
+				found.add(filename)
+
+		return sorted(found, key=self.positions.get)
+
+# Log any pattern matches in a line of output to _patterns.log. candidates can be passed from PatternSet.candidates().
+def log_pattern_matches(target, tag, patterns, line, candidates=None):
+	for p, pattern_match, description in patterns.match(line, candidates):
+		target.ipcrawler.store.add_pattern(target, tag, description, pattern_match)
+		if description is not None:
+			if RICH_AVAILABLE and not config['accessible']:
+				# Feroxbuster-style pattern match
+				pattern_text = Text.assemble(
+					("GET", "bold blue"),
+					"    ",
+					("200", "bold green"),
+					"    ",
+					("🔍 PATTERN", "bold magenta"),
+					" ",
+					(description, "cyan")
+				)
+				rich_console.print(pattern_text)
+			else:
+				info('{bright}[{yellow}' + target.address + '{crst}/{bgreen}' + tag + '{crst}]{rst} {bmagenta}' + description + '{rst}', verbosity=2)
+			output_writer.write(os.path.join(target.scandir, '_patterns.log'), description + '\n\n')
+		else:
+			if RICH_AVAILABLE and not config['accessible']:
+				# Feroxbuster-style pattern match
+				pattern_text = Text.assemble(
+					("GET", "bold blue"),
+					"    ",
+					("200", "bold green"),
+					"    ",
+					("🔍 PATTERN", "bold magenta"),
+					" ",
+					(f"Matched: {pattern_match}", "cyan")
+				)
+				rich_console.print(pattern_text)
+			else:
+				info('{bright}[{yellow}' + target.address + '{crst}/{bgreen}' + tag + '{crst}]{rst} {bmagenta}Matched Pattern: ' + pattern_match + '{rst}', verbosity=2)
+			output_writer.write(os.path.join(target.scandir, '_patterns.log'), 'Matched Pattern: ' + pattern_match + '\n\n')
+
 class CommandStreamReader(object):
 
-	def __init__(self, stream, target, tag, patterns=None, outfile=None):
+	def __init__(self, stream, target, tag, patterns=None, outfile=None, capture=True, tail=None):
 		self.stream = stream
 		self.target = target
 		self.tag = tag
-		self.lines = []
-		self.patterns = patterns or []
+		# capture is True to keep every line, False to keep none (or only the last tail lines), or
+		# the maximum number of unread lines to keep before reading from the stream is paused. A maximum of no
+		# lines would never let reading resume, so it is the same as False.
+		if not isinstance(capture, bool) and capture < 1:
+			capture = False
+		self.capture = capture
+		self.lines = deque(maxlen=tail if capture is False and tail else None)
+		if not isinstance(patterns, PatternSet):
+			patterns = PatternSet(patterns or [])
+		self.patterns = patterns
 		self.outfile = outfile
 		self.ended = False
+		# Set whenever a line is added or the stream ends, so readers never have to poll.
+		self.updated = asyncio.Event()
+		self.finished = asyncio.Event()
+		self.drained = asyncio.Event()
 
 		# Empty files that already exist.
 		if self.outfile != None:
-			with open(self.outfile, 'w'): pass
+			output_writer.truncate(self.outfile)
 
 	# Read lines from the stream until it ends.
 	async def _read(self):
+		try:
+			await self._read_lines()
+		finally:
+			# Make sure the output file is complete before anyone is told the stream has ended.
+			if self.outfile is not None:
+				await output_writer.close(self.outfile)
+			self.ended = True
+			self.updated.set()
+			self.finished.set()
+
+	async def _read_lines(self):
+		buffer = bytearray()
 		while True:
-			if self.stream.at_eof():
+			chunk = await self.stream.read(65536)
+			if chunk:
+				end = chunk.rfind(b'\n')
+				if end == -1:
+					# No complete line yet, however long it gets.
+					buffer.extend(chunk)
+					continue
+				data = bytes(buffer) + chunk[:end]
+				buffer = bytearray(chunk[end + 1:])
+			elif buffer:
+				# The output didn't end with a newline.
+				data = bytes(buffer)
+				buffer = bytearray()
+			else:
 				break
-			try:
-				line = (await self.stream.readline()).decode('utf8').rstrip()
-			except ValueError:
-				error('{bright}[{yellow}' + self.target.address + '{crst}/{bgreen}' + self.tag + '{crst}]{rst} A line was longer than 64 KiB and cannot be processed. Ignoring.')
-				continue
 
+			# Newlines never occur inside multibyte UTF-8 sequences, so the whole block can be decoded at once.
+			await self._read_block(data.decode('utf8', errors='replace'))
+
+	async def _read_block(self, text):
+		lines = [line.rstrip() for line in text.split('\n')]
+
+		if self.outfile is not None:
+			output_writer.write(self.outfile, '\n'.join(lines) + '\n')
+
+		# Only check each line against the patterns that can match somewhere in the block.
+		patterns = self.patterns.candidates(text)
+
+		for line in lines:
 			if line != '':
 				# For verbosity 3, enhance with feroxbuster-style output
 				if RICH_AVAILABLE and config['verbose'] >= 3 and not config['accessible']:
@@ -962,79 +1328,35 @@ class CommandStreamReader(object):
 					info('{bright}[{yellow}' + self.target.address + '{crst}/{bgreen}' + self.tag + '{crst}]{rst} ' + line.strip().replace('{', '{{').replace('}', '}}'), verbosity=3)
 
 			# Check lines for pattern matches.
-			for p in self.patterns:
-				description = ''
-
-				# Match and replace entire pattern.
-				match = p.pattern.search(line)
-				if match:
-					if p.description:
-						description = p.description.replace('{match}', line[match.start():match.end()])
-
-						# Match and replace substrings.
-						matches = p.pattern.findall(line)
-						if len(matches) > 0 and isinstance(matches[0], tuple):
-							matches = list(matches[0])
-
-						match_count = 1
-						for match in matches:
-							if p.description:
-								description = description.replace('{match' + str(match_count) + '}', match)
-							match_count += 1
-
-						async with self.target.lock:
-							with open(os.path.join(self.target.scandir, '_patterns.log'), 'a') as file:
-								if RICH_AVAILABLE and not config['accessible']:
-									# Feroxbuster-style pattern match
-									pattern_text = Text.assemble(
-										("GET", "bold blue"),
-										"    ",
-										("200", "bold green"),
-										"    ",
-										("🔍 PATTERN", "bold magenta"),
-										" ",
-										(description, "cyan")
-									)
-									rich_console.print(pattern_text)
-								else:
-									info('{bright}[{yellow}' + self.target.address + '{crst}/{bgreen}' + self.tag + '{crst}]{rst} {bmagenta}' + description + '{rst}', verbosity=2)
-								file.writelines(description + '\n\n')
-					else:
-						pattern_match = line[match.start():match.end()]
-						if RICH_AVAILABLE and not config['accessible']:
-							# Feroxbuster-style pattern match
-							pattern_text = Text.assemble(
-								("GET", "bold blue"),
-								"    ",
-								("200", "bold green"),
-								"    ",
-								("🔍 PATTERN", "bold magenta"),
-								" ",
-								(f"Matched: {pattern_match}", "cyan")
-							)
-							rich_console.print(pattern_text)
-						else:
-							info('{bright}[{yellow}' + self.target.address + '{crst}/{bgreen}' + self.tag + '{crst}]{rst} {bmagenta}Matched Pattern: ' + pattern_match + '{rst}', verbosity=2)
-						async with self.target.lock:
-							with open(os.path.join(self.target.scandir, '_patterns.log'), 'a') as file:
-								file.writelines('Matched Pattern: ' + pattern_match + '\n\n')
+			log_pattern_matches(self.target, self.tag, self.patterns, line, patterns)
+
+			if self.capture is False:
+				if self.lines.maxlen:
+					self.lines.append(line)
+				continue
+
+			if self.capture is not True:
+				while len(self.lines) >= self.capture:
+					self.drained.clear()
+					await self.drained.wait()
 
-			if self.outfile is not None:
-				with open(self.outfile, 'a') as writer:
-					writer.write(line + '\n')
 			self.lines.append(line)
-		self.ended = True
+			self.updated.set()
 
 	# Read a line from the stream cache.
 	async def readline(self):
 		while True:
-			try:
-				return self.lines.pop(0)
-			except IndexError:
-				if self.ended:
-					return None
-				else:
-					await asyncio.sleep(0.1)
+			if self.lines:
+				self.drained.set()
+				return self.lines.popleft()
+			if self.ended:
+				return None
+			self.updated.clear()
+			await self.updated.wait()
+
+	# Wait until the stream has ended.
+	async def wait(self):
+		await self.finished.wait()
 
 	# Read all lines from the stream cache.
 	async def readlines(self):
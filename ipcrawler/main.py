@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 
-import argparse, asyncio, importlib.util, inspect, ipaddress, math, os, re, select, shutil, signal, socket, sys, termios, time, traceback, tty
+import argparse, asyncio, contextlib, importlib.util, inspect, ipaddress, math, os, re, select, shutil, signal, socket, sys, termios, time, traceback, tty
 from datetime import datetime
 
 try:
@@ -24,8 +24,11 @@ except ImportError:
 colorama.init()
 
 from ipcrawler.config import config, configurable_keys, configurable_boolean_keys
-from ipcrawler.io import slugify, e, fformat, cprint, debug, info, warn, error, fail, CommandStreamReader, show_startup_banner, show_scan_summary, progress_manager
-from ipcrawler.plugins import Pattern, PortScan, ServiceScan, Report, ipcrawler
+from ipcrawler.io import slugify, e, fformat, cprint, debug, info, warn, error, fail, CommandStreamReader, show_startup_banner, show_scan_summary, progress_manager, output_writer
+from ipcrawler.plugins import Pattern, PortScan, ServiceScan, ServiceIndex, Report, ipcrawler
+from ipcrawler.scheduler import Deadline, Job, Scheduler, SlotAllocator
+from ipcrawler.durations import DurationStore
+from ipcrawler.store import ResultStore
 from ipcrawler.targets import Target, Service
 
 VERSION = "2.1.0"
@@ -205,6 +208,7 @@ def show_complete_help():
 	expert_table.add_row("[dim][[/dim][bold cyan]--service-scans[/bold cyan][dim]][/dim]", "Override service scan plugins [dim](comma separated)[/dim]")
 	expert_table.add_row("[dim][[/dim][bold cyan]--reports[/bold cyan][dim]][/dim]", "Override report plugins [dim](comma separated)[/dim]")
 	expert_table.add_row("[dim][[/dim][bold cyan]--target-timeout[/bold cyan][dim]][/dim]", "Per-target timeout in minutes")
+	expert_table.add_row("[dim][[/dim][bold cyan]--plugin-timeout[/bold cyan][dim]][/dim]", "Per-plugin timeout in seconds")
 	expert_table.add_row("[dim][[/dim][bold cyan]--max-port-scans[/bold cyan][dim]][/dim]", "Concurrent port scan limit [dim](default: 10)[/dim]")
 	
 	console.print(expert_table)
@@ -528,28 +532,31 @@ def cancel_all_tasks(sig, frame):
 	for target in ipcrawler.scanning_targets:
 		for process_list in target.running_tasks.values():
 			for process_dict in process_list['processes']:
-				try:
-					parent = psutil.Process(process_dict['process'].pid)
-					processes.extend(parent.children(recursive=True))
-					processes.append(parent)
-				except psutil.NoSuchProcess:
-					pass
-	
-	for process in processes:
-		try:
-			process.send_signal(signal.SIGKILL)
-		except psutil.NoSuchProcess: # Will get raised if the process finishes before we get to killing it.
-			pass
-					
-	_, alive = psutil.wait_procs(processes, timeout=10)
-	if len(alive) > 0:
-		error('The following process IDs could not be killed: ' + ', '.join([str(x.pid) for x in sorted(alive, key=lambda x: x.pid)]))
-	
+				processes.append(process_dict['process'])
+
+	# This can be called from a signal handler, so don't wait for the processes here. Whatever is left of them
+	# is killed once the event loop has stopped.
+	ipcrawler.terminate_processes(processes)
+
 	if not config['disable_keyboard_control']:
 		# Restore original terminal settings.
 		if terminal_settings is not None:
 			termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, terminal_settings)
 
+# Estimate how many seconds are left until the target's scans finish, from how long its running scans and
+# earlier targets usually take. Returns None if there is nothing to go on.
+def target_eta(target):
+	now = time.time()
+	remaining = [task['estimate'] - (now - task['start']) for task in target.running_tasks.values() if task.get('estimate')]
+
+	estimate = ipcrawler.durations.estimate('_target')
+	if estimate is not None and target.start_time is not None:
+		remaining.append(estimate[0] - (now - target.start_time))
+
+	if not remaining:
+		return None
+	return max(0, max(remaining))
+
 async def start_heartbeat(target, period=60):
 	while True:
 		await asyncio.sleep(period)
@@ -623,11 +630,35 @@ async def start_heartbeat(target, period=60):
 
 			current_time = datetime.now().strftime('%H:%M:%S')
 
+			eta = target_eta(target)
+			if eta is not None and eta >= 1:
+				tasks_list += ' (about ' + calculate_elapsed_time(time.time() - eta) + ' left)'
+
 			if count > 1:
 				info('{bgreen}' + current_time + '{rst} - There are {byellow}' + str(count) + '{rst} scans still running against {byellow}' + target.address + '{rst}' + tasks_list)
 			elif count == 1:
 				info('{bgreen}' + current_time + '{rst} - There is {byellow}1{rst} scan still running against {byellow}' + target.address + '{rst}' + tasks_list)
 
+# Estimate how many seconds are left until the scans of the whole run finish, from how long targets have
+# taken in earlier scans. Targets are assumed to keep being scanned as many at a time as they are now.
+def run_eta():
+	estimate = ipcrawler.durations.estimate('_target')
+	if estimate is None:
+		return None
+
+	remaining = [target_eta(target) or 0 for target in ipcrawler.scanning_targets]
+	concurrency = max(1, len(ipcrawler.scanning_targets))
+	return max(remaining, default=0) + math.ceil(len(ipcrawler.pending_targets) / concurrency) * estimate[0]
+
+async def start_run_heartbeat(period=60):
+	while True:
+		await asyncio.sleep(period)
+		eta = run_eta()
+		total = len(ipcrawler.completed_targets) + len(ipcrawler.scanning_targets) + len(ipcrawler.pending_targets)
+		if eta is not None and eta >= 1 and total > 1:
+			current_time = datetime.now().strftime('%H:%M:%S')
+			info('{bgreen}' + current_time + '{rst} - {byellow}' + str(len(ipcrawler.completed_targets)) + '{rst} of {byellow}' + str(total) + '{rst} targets finished (about ' + calculate_elapsed_time(time.time() - eta) + ' left)')
+
 async def keyboard():
 	input = ''
 	while True:
@@ -696,40 +727,6 @@ async def keyboard():
 					input = input[1:]
 		await asyncio.sleep(0.1)
 
-async def get_semaphore(ipcrawler):
-	semaphore = ipcrawler.service_scan_semaphore
-	while True:
-		# If service scan semaphore is locked, see if we can use port scan semaphore.
-		if semaphore.locked():
-			if semaphore != ipcrawler.port_scan_semaphore: # This will be true unless user sets max_scans == max_port_scans
-
-				port_scan_task_count = 0
-				for target in ipcrawler.scanning_targets:
-					for process_list in target.running_tasks.values():
-						if issubclass(process_list['plugin'].__class__, PortScan):
-							port_scan_task_count += 1
-
-				if not ipcrawler.pending_targets and (config['max_port_scans'] - port_scan_task_count) >= 1: # If no more targets, and we have room, use port scan semaphore.
-					if ipcrawler.port_scan_semaphore.locked():
-						await asyncio.sleep(1)
-						continue
-					semaphore = ipcrawler.port_scan_semaphore
-					break
-				else: # Do some math to see if we can use the port scan semaphore.
-					if (config['max_port_scans'] - (port_scan_task_count + (len(ipcrawler.pending_targets) * config['port_scan_plugin_count']))) >= 1:
-						if ipcrawler.port_scan_semaphore.locked():
-							await asyncio.sleep(1)
-							continue
-						semaphore = ipcrawler.port_scan_semaphore
-						break
-					else:
-						await asyncio.sleep(1)
-			else:
-				break
-		else:
-			break
-	return semaphore
-
 async def port_scan(plugin, target):
 	if config['ports']:
 		if config['ports']['tcp'] or config['ports']['udp']:
@@ -749,24 +746,35 @@ async def port_scan(plugin, target):
 					warn('Port scan {bblue}' + plugin.name + ' {green}(' + plugin.slug + '){rst} is a UDP port scan but no UDP ports were set using --ports. Skipping', verbosity=2)
 					return {'type':'port', 'plugin':plugin, 'result':[]}
 
-	async with target.ipcrawler.port_scan_semaphore:
+	# How long the port scan usually takes, or a guess if it hasn't been run often enough.
+	estimate = ipcrawler.durations.estimate(plugin.slug)
+	estimated_duration = estimate[0] if estimate is not None else 60
+
+	async with target.ipcrawler.slots.slot('port', weight=plugin.weight, priority=plugin.priority, duration=estimated_duration):
 		info('Port scan {bblue}' + plugin.name + ' {green}(' + plugin.slug + '){rst} running against {byellow}' + target.address + '{rst}', verbosity=1)
 
 		# Add progress bar for port scans (with deduplication key)
 		task_key = f"port_scan_{plugin.slug}_{target.address}"
 		task_id = progress_manager.add_task(f"🔍 Scanning {plugin.name} on {target.address}", total=100, task_key=task_key)
 		
-		# Start progress simulation (more realistic estimate: 60 seconds for port scan)
-		progress_manager.simulate_progress(task_id, 60)
+		progress_manager.simulate_progress(task_id, estimated_duration)
 		
 		start_time = time.time()
 
 		async with target.lock:
-			target.running_tasks[plugin.slug] = {'plugin': plugin, 'processes': [], 'start': start_time, 'progress_task': task_id}
+			target.running_tasks[plugin.slug] = {'plugin': plugin, 'processes': [], 'start': start_time, 'estimate': estimate[0] if estimate is not None else None, 'progress_task': task_id}
 
+		timeout = ipcrawler.plugin_timeout(plugin)
+		deadline = Deadline(timeout)
 		try:
 			result = await plugin.run(target)
+		except asyncio.CancelledError:
+			deadline.cancel()
+			if not deadline.expired:
+				raise
+			result = None
 		except Exception as ex:
+			deadline.cancel()
 			# Clean up task on exception
 			if task_id:
 				progress_manager.complete_task(task_id)
@@ -777,6 +785,13 @@ async def port_scan(plugin, target):
 			exc_type, exc_value, exc_tb = sys.exc_info()
 			error_text = ''.join(traceback.format_exception(exc_type, exc_value, exc_tb)[-2:])
 			raise Exception(cprint('Error: Port scan {bblue}' + plugin.name + ' {green}(' + plugin.slug + '){rst} running against {byellow}' + target.address + '{rst} produced an exception:\n\n' + error_text, color=Fore.RED, char='!', printmsg=False))
+		deadline.cancel()
+
+		if deadline.expired:
+			warn('Port scan {bblue}' + plugin.name + ' {green}(' + plugin.slug + '){rst} against {byellow}' + target.address + '{rst} took longer than ' + str(round(timeout)) + ' seconds and was stopped.')
+			await ipcrawler.kill_processes([process_dict['process'] for process_dict in target.running_tasks[plugin.slug]['processes']])
+		else:
+			ipcrawler.durations.add(plugin.slug, '', time.time() - start_time)
 
 		for process_dict in target.running_tasks[plugin.slug]['processes']:
 			if process_dict['process'].returncode is None:
@@ -792,14 +807,13 @@ async def port_scan(plugin, target):
 					else:
 						break
 				error('Port scan {bblue}' + plugin.name + ' {green}(' + plugin.slug + '){rst} ran a command against {byellow}' + target.address + '{rst} which returned a non-zero exit code (' + str(process_dict['process'].returncode) + '). Check ' + target.scandir + '/_errors.log for more details.', verbosity=2)
-				async with target.lock:
-					with open(os.path.join(target.scandir, '_errors.log'), 'a') as file:
-						file.writelines('[*] Port scan ' + plugin.name + ' (' + plugin.slug + ') ran a command which returned a non-zero exit code (' + str(process_dict['process'].returncode) + ').\n')
-						file.writelines('[-] Command: ' + process_dict['cmd'] + '\n')
-						if errors:
-							file.writelines(['[-] Error Output:\n'] + errors + ['\n'])
-						else:
-							file.writelines('\n')
+				lines = ['[*] Port scan ' + plugin.name + ' (' + plugin.slug + ') ran a command which returned a non-zero exit code (' + str(process_dict['process'].returncode) + ').\n']
+				lines.append('[-] Command: ' + process_dict['cmd'] + '\n')
+				if errors:
+					lines.extend(['[-] Error Output:\n'] + errors + ['\n'])
+				else:
+					lines.append('\n')
+				output_writer.write(os.path.join(target.scandir, '_errors.log'), ''.join(lines))
 
 		elapsed_time = calculate_elapsed_time(start_time)
 
@@ -816,48 +830,24 @@ async def port_scan(plugin, target):
 		return {'type':'port', 'plugin':plugin, 'result':result}
 
 async def service_scan(plugin, service):
-	semaphore = service.target.ipcrawler.service_scan_semaphore
-
-	if not config['force_services']:
-		semaphore = await get_semaphore(service.target.ipcrawler)
-
-	plugin_pending = True
-
-	while plugin_pending:
-		global_plugin_count = 0
-		target_plugin_count = 0
-
-		if plugin.max_global_instances and plugin.max_global_instances > 0:
-			async with service.target.ipcrawler.lock:
-				# Count currently running plugin instances.
-				for target in service.target.ipcrawler.scanning_targets:
-					for task in target.running_tasks.values():
-						if plugin == task['plugin']:
-							global_plugin_count += 1
-							if global_plugin_count >= plugin.max_global_instances:
-								break
-					if global_plugin_count >= plugin.max_global_instances:
-						break
-			if global_plugin_count >= plugin.max_global_instances:
-				await asyncio.sleep(1)
-				continue
-
-		if plugin.max_target_instances and plugin.max_target_instances > 0:
-			async with service.target.lock:
-				# Count currently running plugin instances.
-				for task in service.target.running_tasks.values():
-					if plugin == task['plugin']:
-						target_plugin_count += 1
-						if target_plugin_count >= plugin.max_target_instances:
-							break
-			if target_plugin_count >= plugin.max_target_instances:
-				await asyncio.sleep(1)
-				continue
-
-		# If we get here, we can run the plugin.
-		plugin_pending = False
+	async with contextlib.AsyncExitStack() as limits:
+		# Wait for a free instance of the plugin against this target first, then globally, so that
+		# a scan waiting on its own target never holds up the same plugin on other targets.
+		for semaphore in service.target.ipcrawler.instance_semaphores(plugin, service.target):
+			await limits.enter_async_context(semaphore)
+
+		# How long the plugin usually takes against this kind of service, or a guess if it hasn't been run often enough.
+		estimate = ipcrawler.durations.estimate(plugin.slug, service.name)
+		if estimate is not None:
+			estimated_duration = estimate[0]
+		elif 'nikto' in plugin.slug.lower() or 'gobuster' in plugin.slug.lower() or 'dirb' in plugin.slug.lower():
+			estimated_duration = 300
+		elif 'nmap' in plugin.slug.lower():
+			estimated_duration = 120
+		else:
+			estimated_duration = 60
 
-		async with semaphore:
+		async with service.target.ipcrawler.slots.slot('service', weight=plugin.weight, priority=plugin.priority, duration=estimated_duration):
 			# Create variables for fformat references.
 			address = service.target.address
 			addressv6 = service.target.address
@@ -900,24 +890,24 @@ async def service_scan(plugin, service):
 			task_key = f"service_scan_{plugin.slug}_{service.target.address}_{service.port}"
 			task_id = progress_manager.add_task(f"🔧 {plugin.name} on {service.target.address}:{service.port}", total=100, task_key=task_key)
 
-			# Start progress simulation (estimate varies by service type)
-			# Nikto and directory busters take longer
-			if 'nikto' in plugin.slug.lower() or 'gobuster' in plugin.slug.lower() or 'dirb' in plugin.slug.lower():
-				estimated_duration = 300  # 5 minutes for directory/web scans  
-			elif 'nmap' in plugin.slug.lower():
-				estimated_duration = 120  # 2 minutes for nmap scans
-			else:
-				estimated_duration = 60   # 1 minute for other scans
 			progress_manager.simulate_progress(task_id, estimated_duration)
 
 			start_time = time.time()
 
 			async with service.target.lock:
-				service.target.running_tasks[tag] = {'plugin': plugin, 'processes': [], 'start': start_time, 'progress_task': task_id}
+				service.target.running_tasks[tag] = {'plugin': plugin, 'processes': [], 'start': start_time, 'estimate': estimate[0] if estimate is not None else None, 'progress_task': task_id}
 
+			timeout = ipcrawler.plugin_timeout(plugin, service.name)
+			deadline = Deadline(timeout)
 			try:
 				result = await plugin.run(service)
+			except asyncio.CancelledError:
+				deadline.cancel()
+				if not deadline.expired:
+					raise
+				result = None
 			except Exception as ex:
+				deadline.cancel()
 				# Clean up task on exception
 				if task_id:
 					progress_manager.complete_task(task_id)
@@ -928,6 +918,13 @@ async def service_scan(plugin, service):
 				exc_type, exc_value, exc_tb = sys.exc_info()
 				error_text = ''.join(traceback.format_exception(exc_type, exc_value, exc_tb)[-2:])
 				raise Exception(cprint('Error: Service scan {bblue}' + plugin.name + ' {green}(' + tag + '){rst} running against {byellow}' + service.target.address + '{rst} produced an exception:\n\n' + error_text, color=Fore.RED, char='!', printmsg=False))
+			deadline.cancel()
+
+			if deadline.expired:
+				warn('Service scan {bblue}' + plugin.name + ' {green}(' + tag + '){rst} against {byellow}' + service.target.address + '{rst} took longer than ' + str(round(timeout)) + ' seconds and was stopped.')
+				await ipcrawler.kill_processes([process_dict['process'] for process_dict in service.target.running_tasks[tag]['processes']])
+			else:
+				ipcrawler.durations.add(plugin.slug, service.name, time.time() - start_time)
 
 			for process_dict in service.target.running_tasks[tag]['processes']:
 				if process_dict['process'].returncode is None:
@@ -943,14 +940,13 @@ async def service_scan(plugin, service):
 						else:
 							break
 					error('Service scan {bblue}' + plugin.name + ' {green}(' + tag + '){rst} ran a command against {byellow}' + service.target.address + '{rst} which returned a non-zero exit code (' + str(process_dict['process'].returncode) + '). Check ' + service.target.scandir + '/_errors.log for more details.', verbosity=2)
-					async with service.target.lock:
-						with open(os.path.join(service.target.scandir, '_errors.log'), 'a') as file:
-							file.writelines('[*] Service scan ' + plugin.name + ' (' + tag + ') ran a command which returned a non-zero exit code (' + str(process_dict['process'].returncode) + ').\n')
-							file.writelines('[-] Command: ' + process_dict['cmd'] + '\n')
-							if errors:
-								file.writelines(['[-] Error Output:\n'] + errors + ['\n'])
-							else:
-								file.writelines('\n')
+					lines = ['[*] Service scan ' + plugin.name + ' (' + tag + ') ran a command which returned a non-zero exit code (' + str(process_dict['process'].returncode) + ').\n']
+					lines.append('[-] Command: ' + process_dict['cmd'] + '\n')
+					if errors:
+						lines.extend(['[-] Error Output:\n'] + errors + ['\n'])
+					else:
+						lines.append('\n')
+					output_writer.write(os.path.join(service.target.scandir, '_errors.log'), ''.join(lines))
 
 			elapsed_time = calculate_elapsed_time(start_time)
 
@@ -967,17 +963,18 @@ async def service_scan(plugin, service):
 			return {'type':'service', 'plugin':plugin, 'result':result}
 
 async def generate_report(plugin, targets):
-	semaphore = ipcrawler.service_scan_semaphore
-
-	if not config['force_services']:
-		semaphore = await get_semaphore(ipcrawler)
-
-	async with semaphore:
+	async with ipcrawler.slots.slot('service', weight=plugin.weight, priority=plugin.priority):
 		try:
-			result = await plugin.run(targets)
+			if plugin.executor in ['thread', 'process']:
+				error_text = await ipcrawler.run_report(plugin, targets)
+			else:
+				error_text = None
+				result = await plugin.run(targets)
 		except Exception as ex:
 			exc_type, exc_value, exc_tb = sys.exc_info()
 			error_text = ''.join(traceback.format_exception(exc_type, exc_value, exc_tb)[-2:])
+
+		if error_text:
 			raise Exception(cprint('Error: Report plugin {bblue}' + plugin.name + ' {green}(' + plugin.slug + '){rst} produced an exception:\n\n' + error_text, color=Fore.RED, char='!', printmsg=False))
 
 async def scan_target(target):
@@ -995,6 +992,8 @@ async def scan_target(target):
 	target.scandir = scandir
 	os.makedirs(scandir, exist_ok=True)
 
+	ipcrawler.store.add_target(target)
+
 	os.makedirs(os.path.join(scandir, 'xml'), exist_ok=True)
 
 	if not config['only_scans_dir']:
@@ -1017,7 +1016,7 @@ async def scan_target(target):
 
 	target.reportdir = reportdir
 
-	pending = []
+	target.scheduler = Scheduler(parent=ipcrawler.scheduler)
 
 	heartbeat = asyncio.create_task(start_heartbeat(target, period=config['heartbeat']))
 
@@ -1039,9 +1038,7 @@ async def scan_target(target):
 				service.target = target
 				services.append(service)
 
-		if services:
-			pending.append(asyncio.create_task(asyncio.sleep(0)))
-		else:
+		if not services:
 			error('No services were defined. Please check your service syntax: [tcp|udp]/<port>/<service-name>/[secure|insecure]')
 			heartbeat.cancel()
 			ipcrawler.errors = True
@@ -1071,60 +1068,47 @@ async def scan_target(target):
 
 			if matching_tags and not excluded_tags:
 				target.scans['ports'][plugin.slug] = {'plugin':plugin, 'commands':[]}
-				pending.append(asyncio.create_task(port_scan(plugin, target)))
+				target.scheduler.submit(Job(target, plugin), port_scan(plugin, target))
 
 	async with ipcrawler.lock:
 		ipcrawler.scanning_targets.append(target)
 
 	start_time = time.time()
+	target.start_time = start_time
 	info('Scanning target {byellow}' + target.address + '{rst}')
 
-	timed_out = False
-	while pending:
-		done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED, timeout=1)
-
-		# Check if global timeout has occurred.
-		if config['target_timeout'] is not None:
-			elapsed_seconds = round(time.time() - start_time)
-			m, s = divmod(elapsed_seconds, 60)
-			if m >= config['target_timeout']:
-				timed_out = True
-				break
-
-		if not config['force_services']:
-			# Extract Services - only from newly completed tasks
-			services = []
-
-			async with target.lock:
-				while target.pending_services:
-					services.append(target.pending_services.pop(0))
-
-			# Only process services from tasks that just completed in this iteration
-			for task in done:
-				try:
-					if task.exception():
-						print(task.exception())
-						continue
-				except asyncio.InvalidStateError:
-					pass
-
-				if task.result() and task.result()['type'] == 'port':
-					for service in (task.result()['result'] or []):
-						# Only add service if not already processed
-						if service.full_tag() not in target.services:
-							services.append(service)
+	deadline = None
+	if config['target_timeout'] is not None:
+		deadline = start_time + (config['target_timeout'] * 60)
 
+	timed_out = False
+	while True:
 		for service in services:
+			known = target.open_ports.get((service.protocol, service.port))
+			if service.provisional:
+				# The port is already being scanned.
+				if known is not None:
+					continue
+			elif known is not None and known.provisional:
+				# The port's service has been identified, so it replaces the provisional one.
+				target.services.remove(known.full_tag())
+				ipcrawler.store.remove_service(target, known)
+
 			# Double-check service hasn't been processed (race condition protection)
 			if service.full_tag() not in target.services:
 				target.services.append(service.full_tag())
+				target.open_ports[(service.protocol, service.port)] = service
+				ipcrawler.store.add_service(target, service)
 			else:
 				# Service already processed, skip entirely
 				continue
 
-			info('Identified service {bmagenta}' + service.name + '{rst} on {bmagenta}' + service.protocol + '/' + str(service.port) + '{rst} on {byellow}' + target.address + '{rst}', verbosity=1)
+			if service.provisional:
+				info('Discovered open port {bmagenta}' + service.protocol + '/' + str(service.port) + '{rst} on {byellow}' + target.address + '{rst}', verbosity=1)
+			else:
+				info('Identified service {bmagenta}' + service.name + '{rst} on {bmagenta}' + service.protocol + '/' + str(service.port) + '{rst} on {byellow}' + target.address + '{rst}', verbosity=1)
 
-			if not config['only_scans_dir']:
+			if not config['only_scans_dir'] and not service.provisional:
 				with open(os.path.join(target.reportdir, 'notes.txt'), 'a') as file:
 					file.writelines('[*] ' + service.name + ' found on ' + service.protocol + '/' + str(service.port) + '.\n\n\n\n')
 
@@ -1167,129 +1151,67 @@ async def scan_target(target):
 			matching_plugins = []
 			heading = False
 
-			for plugin in target.ipcrawler.plugin_types['service']:
+			for plugin, runnable, manual, skip in target.ipcrawler.service_index.match(service):
 				plugin_was_run = False
-				plugin_service_match = False
 				plugin_tag = service.tag() + '/' + plugin.slug
 
-				for service_dict in plugin.services:
-					if service_dict['protocol'] == protocol and port in service_dict['port']:
-						for name in service_dict['name']:
-							if service_dict['negative_match']:
-								if name not in plugin.ignore_service_names:
-									plugin.ignore_service_names.append(name)
-							else:
-								if name not in plugin.service_names:
-									plugin.service_names.append(name)
-					else:
-						continue
-
-				for s in plugin.service_names:
-					if re.search(s, service.name):
-						plugin_service_match = True
-
-					if plugin_service_match:
-						if config['service_scans'] and plugin.slug in config['service_scans']:
-							matching_tags = True
-							excluded_tags = False
-						else:
-							plugin_tag_set = set(plugin.tags)
-
-							matching_tags = False
-							for tag_group in target.ipcrawler.tags:
-								if set(tag_group).issubset(plugin_tag_set):
-									matching_tags = True
-									break
-
-							excluded_tags = False
-							for tag_group in target.ipcrawler.excluded_tags:
-								if set(tag_group).issubset(plugin_tag_set):
-									excluded_tags = True
-									break
-
-						# TODO: Maybe make this less messy, keep manual-only plugins separate?
-						plugin_is_runnable = False
-						for member_name, _ in inspect.getmembers(plugin, predicate=inspect.ismethod):
-							if member_name == 'run':
-								plugin_is_runnable = True
-								break
-
-						if plugin_is_runnable and matching_tags and not excluded_tags:
-							# Skip plugin if run_once_boolean and plugin already in target scans
-							if plugin.run_once_boolean:
-								plugin_queued = False
-								for s in target.scans['services']:
-									if plugin.slug in target.scans['services'][s]:
-										plugin_queued = True
-										warn('{byellow}[' + plugin_tag + ' against ' + target.address + ']{srst} Plugin should only be run once and it appears to have already been queued. Skipping.{rst}', verbosity=2)
-										break
-								if plugin_queued:
-									break
-
-							# Skip plugin if require_ssl_boolean and port is not secure
-							if plugin.require_ssl_boolean and not service.secure:
-								plugin_service_match = False
-								break
-
-							# Skip plugin if service port is in ignore_ports:
-							if port in plugin.ignore_ports[protocol]:
-								plugin_service_match = False
-								warn('{byellow}[' + plugin_tag + ' against ' + target.address + ']{srst} Plugin cannot be run against ' + protocol + ' port ' + str(port) + '. Skipping.{rst}', verbosity=2)
+				if runnable:
+					# Skip plugin if run_once_boolean and plugin already in target scans
+					if plugin.run_once_boolean:
+						plugin_queued = False
+						for s in target.scans['services']:
+							if plugin.slug in target.scans['services'][s]:
+								plugin_queued = True
+								warn('{byellow}[' + plugin_tag + ' against ' + target.address + ']{srst} Plugin should only be run once and it appears to have already been queued. Skipping.{rst}', verbosity=2)
 								break
+						if plugin_queued:
+							service_match = True
+							continue
 
-							# Skip plugin if plugin has required ports and service port is not in them:
-							if plugin.ports[protocol] and port not in plugin.ports[protocol]:
-								plugin_service_match = False
-								warn('{byellow}[' + plugin_tag + ' against ' + target.address + ']{srst} Plugin can only run on specific ports. Skipping.{rst}', verbosity=2)
-								break
+					# Skip plugin if it requires SSL, has port restrictions, or ignores this service name.
+					if skip is not None:
+						if skip:
+							warn('{byellow}[' + plugin_tag + ' against ' + target.address + ']{srst} ' + skip + '{rst}', verbosity=2)
+						continue
 
-							for i in plugin.ignore_service_names:
-								if re.search(i, service.name):
-									warn('{byellow}[' + plugin_tag + ' against ' + target.address + ']{srst} Plugin cannot be run against this service. Skipping.{rst}', verbosity=2)
-									break
+					# TODO: check if plugin matches tags, BUT run manual commands anyway!
+					plugin_was_run = True
+					matching_plugins.append(plugin)
 
-							# TODO: check if plugin matches tags, BUT run manual commands anyway!
-							plugin_was_run = True
-							matching_plugins.append(plugin)
+				service_match = True
 
-						for member_name, _ in inspect.getmembers(plugin, predicate=inspect.ismethod):
-							if member_name == 'manual':
-								try:
-									plugin.manual(service, plugin_was_run)
-								except Exception as ex:
-									exc_type, exc_value, exc_tb = sys.exc_info()
-									error_text = ''.join(traceback.format_exception(exc_type, exc_value, exc_tb)[-2:])
-									cprint('Error: Service scan {bblue}' + plugin.name + ' {green}(' + plugin_tag + '){rst} running against {byellow}' + target.address + '{rst} produced an exception when generating manual commands:\n\n' + error_text, color=Fore.RED, char='!', printmsg=True)
-
-								if service.manual_commands:
-									plugin_run = False
-									for s in target.scans['services']:
-										if plugin.slug in target.scans['services'][s]:
-											plugin_run = True
-											break
-									if not plugin.run_once_boolean or (plugin.run_once_boolean and not plugin_run):
-										with open(os.path.join(target.scandir, '_manual_commands.txt'), 'a') as file:
-											if not heading:
-												file.write(e('[*] {service.name} on {service.protocol}/{service.port}\n\n'))
-												heading = True
-											for description, commands in service.manual_commands.items():
-												try:
-													file.write('\t[-] ' + e(description) + '\n\n')
-													for command in commands:
-														file.write('\t\t' + e(command) + '\n\n')
-												except Exception as ex:
-													exc_type, exc_value, exc_tb = sys.exc_info()
-													error_text = ''.join(traceback.format_exception(exc_type, exc_value, exc_tb)[-2:])
-													cprint('Error: Service scan {bblue}' + plugin.name + ' {green}(' + plugin_tag + '){rst} running against {byellow}' + target.address + '{rst} produced an exception when evaluating manual commands:\n\n' + error_text, color=Fore.RED, char='!', printmsg=True)
-											file.flush()
-
-								service.manual_commands = {}
+				# Manual commands are written once the service has been identified.
+				if manual and not service.provisional:
+					try:
+						plugin.manual(service, plugin_was_run)
+					except Exception as ex:
+						exc_type, exc_value, exc_tb = sys.exc_info()
+						error_text = ''.join(traceback.format_exception(exc_type, exc_value, exc_tb)[-2:])
+						cprint('Error: Service scan {bblue}' + plugin.name + ' {green}(' + plugin_tag + '){rst} running against {byellow}' + target.address + '{rst} produced an exception when generating manual commands:\n\n' + error_text, color=Fore.RED, char='!', printmsg=True)
+
+					if service.manual_commands:
+						plugin_run = False
+						for s in target.scans['services']:
+							if plugin.slug in target.scans['services'][s]:
+								plugin_run = True
 								break
-
-						break
-
-				if plugin_service_match:
-					service_match = True
+						if not plugin.run_once_boolean or (plugin.run_once_boolean and not plugin_run):
+							with open(os.path.join(target.scandir, '_manual_commands.txt'), 'a') as file:
+								if not heading:
+									file.write(e('[*] {service.name} on {service.protocol}/{service.port}\n\n'))
+									heading = True
+								for description, commands in service.manual_commands.items():
+									try:
+										file.write('\t[-] ' + e(description) + '\n\n')
+										for command in commands:
+											file.write('\t\t' + e(command) + '\n\n')
+									except Exception as ex:
+										exc_type, exc_value, exc_tb = sys.exc_info()
+										error_text = ''.join(traceback.format_exception(exc_type, exc_value, exc_tb)[-2:])
+										cprint('Error: Service scan {bblue}' + plugin.name + ' {green}(' + plugin_tag + '){rst} running against {byellow}' + target.address + '{rst} produced an exception when evaluating manual commands:\n\n' + error_text, color=Fore.RED, char='!', printmsg=True)
+								file.flush()
+
+					service.manual_commands = {}
 
 			for plugin in matching_plugins:
 				plugin_tag = service.tag() + '/' + plugin.slug
@@ -1324,6 +1246,10 @@ async def scan_target(target):
 							if plugin_tag in target.running_tasks:
 								plugin_queued = True
 								warn('{byellow}[' + plugin_tag + ' against ' + target.address + ']{srst} Plugin is already running for this service. Skipping.{rst}', verbosity=2)
+					# Also check if already queued against this port under another service name
+					if not plugin_queued and (service.protocol, service.port, service.secure, plugin.slug) in target.port_plugins:
+						plugin_queued = True
+						warn('{byellow}[' + plugin_tag + ' against ' + target.address + ']{srst} Plugin has already been queued for this port. Skipping.{rst}', verbosity=2)
 
 				if plugin_queued:
 					continue
@@ -1331,14 +1257,69 @@ async def scan_target(target):
 					if service not in target.scans['services']:
 						target.scans['services'][service] = {}
 					target.scans['services'][service][plugin_tag] = {'plugin':plugin, 'commands':[]}
+					target.port_plugins.add((service.protocol, service.port, service.secure, plugin.slug))
 
-				pending.add(asyncio.create_task(service_scan(plugin, service)))
+				target.scheduler.submit(Job(target, plugin, service), service_scan(plugin, service))
 
-			if not service_match:
+			if not service_match and not service.provisional:
 				warn('{byellow}[' + target.address + ']{srst} Service ' + service.full_tag() + ' did not match any plugins based on the service name.{rst}', verbosity=2)
 				if service.name not in config['service_exceptions'] and service.full_tag() not in target.ipcrawler.missing_services:
 					target.ipcrawler.missing_services.append(service.full_tag())
 
+		services = []
+
+		if not target.scheduler.pending():
+			break
+
+		# Sleep until a job finishes or a plugin discovers a service, rather than polling.
+		timeout = None
+		if deadline is not None:
+			timeout = max(0, deadline - time.time())
+
+		if not await target.scheduler.wait(timeout=timeout):
+			timed_out = True
+			break
+
+		if not config['force_services']:
+			async with target.lock:
+				while target.pending_services:
+					services.append(target.pending_services.pop(0))
+
+			for job in target.scheduler.pop_completed():
+				if job.task.cancelled():
+					continue
+
+				if job.exception():
+					print(job.exception())
+					continue
+
+				if job.result() and job.result()['type'] == 'port':
+					for service in (job.result()['result'] or []):
+						# Only add service if not already processed (a provisional service with the same tag is replaced)
+						known = target.open_ports.get((service.protocol, service.port))
+						if service.full_tag() not in target.services or (known is not None and known.provisional):
+							services.append(service)
+		else:
+			for job in target.scheduler.pop_completed():
+				pass
+
+	heartbeat.cancel()
+
+	if timed_out:
+		target.scheduler.cancel()
+
+		processes = []
+		for process_list in target.running_tasks.values():
+			for process_dict in process_list['processes']:
+				processes.append(process_dict['process'])
+		await ipcrawler.kill_processes(processes)
+
+	ipcrawler.store.finish_target(target)
+
+	# Reports read the logs and results recorded during the scan, so make sure they are on disk first.
+	await output_writer.flush()
+	await ipcrawler.store.flush()
+
 	for plugin in target.ipcrawler.plugin_types['report']:
 		if config['reports'] and plugin.slug in config['reports']:
 			matching_tags = True
@@ -1359,33 +1340,32 @@ async def scan_target(target):
 					break
 
 		if matching_tags and not excluded_tags:
-			pending.add(asyncio.create_task(generate_report(plugin, [target])))
+			target.scheduler.submit(Job(target, plugin), generate_report(plugin, [target]))
 
-	while pending:
-		done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED, timeout=1)
+	while target.scheduler.pending():
+		await target.scheduler.wait()
+		for job in target.scheduler.pop_completed():
+			pass
 
-	heartbeat.cancel()
 	elapsed_time = calculate_elapsed_time(start_time)
 
 	if timed_out:
-
-		for task in pending:
-			task.cancel()
-
-		for process_list in target.running_tasks.values():
-			for process_dict in process_list['processes']:
-				try:
-					process_dict['process'].kill()
-				except ProcessLookupError:
-					pass
-
 		warn('{byellow}Scanning target ' + target.address + ' took longer than the specified target period (' + str(config['target_timeout']) + ' min). Cancelling scans and moving to next target.{rst}')
 	else:
 		info('Finished scanning target {byellow}' + target.address + '{rst} in ' + elapsed_time)
+		ipcrawler.durations.add('_target', '', time.time() - start_time)
+
+	# Save the durations recorded so far, so they aren't lost if ipcrawler is killed before the other targets finish.
+	ipcrawler.durations.save()
+
+	# Don't keep the target's logs open for the rest of the scan.
+	await output_writer.close_directory(target.basedir)
 
 	async with ipcrawler.lock:
 		ipcrawler.completed_targets.append(target)
 		ipcrawler.scanning_targets.remove(target)
+		ipcrawler.release_instances(target)
+		ipcrawler.http.release(target)
 
 async def run():
 	# Find config file.
@@ -1429,6 +1409,8 @@ async def run():
 	parser.add_argument('--heartbeat', action='store', type=int, help='Specifies the heartbeat interval (in seconds) for scan status messages. Default: %(default)s')
 	parser.add_argument('--timeout', action='store', type=int, help='Specifies the maximum amount of time in minutes that ipcrawler should run for. Default: %(default)s')
 	parser.add_argument('--target-timeout', action='store', type=int, help='Specifies the maximum amount of time in minutes that a target should be scanned for before abandoning it and moving on. Default: %(default)s')
+	parser.add_argument('--plugin-timeout', action='store', type=int, help='Specifies the maximum amount of time in seconds that a plugin should run against a service before it is stopped, unless config.toml or the plugin sets its own. Default: %(default)s')
+	parser.add_argument('--adaptive-timeouts', action='store_true', help='Stop plugins and commands that run for much longer than they usually take. Default: %(default)s')
 	nmap_group = parser.add_mutually_exclusive_group()
 	nmap_group.add_argument('--nmap', action='store', help='Override the {nmap_extra} variable in scans. Default: %(default)s')
 	nmap_group.add_argument('--nmap-append', action='store', help='Append to the default {nmap_extra} variable in scans. Default: %(default)s')
@@ -1536,7 +1518,9 @@ async def run():
 
 						# Only add classes that are a sub class of either PortScan, ServiceScan, or Report
 						if issubclass(c, PortScan) or issubclass(c, ServiceScan) or issubclass(c, Report):
-							ipcrawler.register(c(), filename)
+							instance = c()
+							instance.path = os.path.join(dirname, filename)
+							ipcrawler.register(instance, filename)
 						else:
 							print('Plugin "' + c.__name__ + '" in ' + filename + ' is not a subclass of either PortScan, ServiceScan, or Report.')
 				except (ImportError, SyntaxError) as ex:
@@ -1641,7 +1625,14 @@ async def run():
 
 	other_options = []
 	for key, val in config_toml.items():
-		if key == 'global' and isinstance(val, dict): # Process global plugin options.
+		if key == 'timeouts' and isinstance(val, dict): # Process plugin timeouts, keyed by plugin slug or tag.
+			for tkey, tval in val.items():
+				if isinstance(tval, bool) or not isinstance(tval, (int, float)) or tval <= 0:
+					error('Config option [timeouts] ' + tkey + ': invalid value: \'' + str(tval) + '\' (should be a number of seconds)')
+					errors = True
+				else:
+					config['timeouts'][slugify(tkey)] = tval
+		elif key == 'global' and isinstance(val, dict): # Process global plugin options.
 			for gkey, gval in config_toml['global'].items():
 				if isinstance(gval, bool):
 					for action in ipcrawler.argparse._actions:
@@ -2026,16 +2017,19 @@ async def run():
 		error('Argument --timeout cannot be less than --target-timeout.')
 		errors = True
 
+	if config['plugin_timeout'] is not None and config['plugin_timeout'] <= 0:
+		error('Argument --plugin-timeout must be at least 1.')
+		errors = True
+
 	if not errors:
 		if config['force_services']:
-			ipcrawler.service_scan_semaphore = asyncio.Semaphore(config['max_scans'])
+			ipcrawler.slots = SlotAllocator(0, config['max_scans'], borrow=False)
 		else:
-			ipcrawler.port_scan_semaphore = asyncio.Semaphore(config['max_port_scans'])
-			# If max scans and max port scans is the same, the service scan semaphore and port scan semaphore should be the same object
+			# If max scans and max port scans is the same, port scans and service scans share a single pool.
 			if config['max_scans'] == config['max_port_scans']:
-				ipcrawler.service_scan_semaphore = ipcrawler.port_scan_semaphore
+				ipcrawler.slots = SlotAllocator(config['max_port_scans'], 0, shared=True)
 			else:
-				ipcrawler.service_scan_semaphore = asyncio.Semaphore(config['max_scans'] - config['max_port_scans'])
+				ipcrawler.slots = SlotAllocator(config['max_port_scans'], config['max_scans'] - config['max_port_scans'])
 
 	if config['port_scans']:
 		config['port_scans'] = [x.strip().lower() for x in config['port_scans'].split(',')]
@@ -2046,6 +2040,17 @@ async def run():
 	if config['reports']:
 		config['reports'] = [x.strip().lower() for x in config['reports'].split(',')]
 
+	# Work out which service plugins can match which services once, rather than for every service found.
+	ipcrawler.service_index = ServiceIndex(ipcrawler)
+
+	# Record results in a database in the output directory as the scan goes.
+	ipcrawler.store = ResultStore(os.path.join(os.path.abspath(config['output']), 'ipcrawler.db'))
+	ipcrawler.store.open()
+
+	# How long plugins took in earlier scans, for progress bars, ETAs and the order scans are started in.
+	ipcrawler.durations = DurationStore(os.path.join(config['data_dir'], 'durations.db'))
+	ipcrawler.durations.load()
+
 	raw_targets = args.targets
 
 	if len(args.target_file) > 0:
@@ -2199,6 +2204,8 @@ async def run():
 
 	config['port_scan_plugin_count'] = port_scan_plugin_count
 
+	ipcrawler.scheduler = Scheduler()
+
 	num_initial_targets = max(1, math.ceil(config['max_port_scans'] / port_scan_plugin_count))
 
 	# Show startup banner with feroxbuster-style interface
@@ -2216,64 +2223,73 @@ async def run():
 	if not config['disable_keyboard_control']:
 		terminal_settings = termios.tcgetattr(sys.stdin.fileno())
 
-	pending = []
+	scheduler = ipcrawler.scheduler
+
 	i = 0
 	while ipcrawler.pending_targets:
-		pending.append(asyncio.create_task(scan_target(ipcrawler.pending_targets.pop(0))))
+		target = ipcrawler.pending_targets.pop(0)
+		scheduler.submit(Job(target), scan_target(target))
 		i+=1
 		if i >= num_initial_targets:
 			break
 
+	if not config['force_services']:
+		ipcrawler.slots.reserve(len(ipcrawler.pending_targets) * port_scan_plugin_count)
+
 	if not config['disable_keyboard_control']:
 		tty.setcbreak(sys.stdin.fileno())
 		keyboard_monitor = asyncio.create_task(keyboard())
 
+	run_heartbeat = asyncio.create_task(start_run_heartbeat(period=config['heartbeat']))
+
+	deadline = None
+	if config['timeout'] is not None:
+		deadline = start_time + (config['timeout'] * 60)
+
 	timed_out = False
-	while pending:
-		done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED, timeout=1)
+	while scheduler.pending():
+		# Woken whenever a target finishes or one of its scans frees up a slot.
+		timeout = None
+		if deadline is not None:
+			timeout = max(0, deadline - time.time())
+
+		if not await scheduler.wait(timeout=timeout):
+			timed_out = True
+			break
 
 		# If something failed in scan_target, ipcrawler.errors will be true.
 		if ipcrawler.errors:
 			cancel_all_tasks(None, None)
 			sys.exit(1)
 
-		# Check if global timeout has occurred.
-		if config['timeout'] is not None:
-			elapsed_seconds = round(time.time() - start_time)
-			m, s = divmod(elapsed_seconds, 60)
-			if m >= config['timeout']:
-				timed_out = True
-				break
-
-		for task in done:
+		for job in scheduler.pop_completed():
 			if ipcrawler.pending_targets:
-				pending.add(asyncio.create_task(scan_target(ipcrawler.pending_targets.pop(0))))
-			if task in pending:
-				pending.remove(task)
-
-		port_scan_task_count = 0
-		for targ in ipcrawler.scanning_targets:
-			for process_list in targ.running_tasks.values():
-				# If we're not scanning ports, count ServiceScans instead.
-				if config['force_services']:
-					if issubclass(process_list['plugin'].__class__, ServiceScan): # TODO should we really count ServiceScans? Test...
-						port_scan_task_count += 1
-				else:
-					if issubclass(process_list['plugin'].__class__, PortScan):
-						port_scan_task_count += 1
+				target = ipcrawler.pending_targets.pop(0)
+				scheduler.submit(Job(target), scan_target(target))
+
+		# If we're not scanning ports, count ServiceScans instead.
+		if config['force_services']:
+			port_scan_task_count = ipcrawler.slots.active['service']
+		else:
+			port_scan_task_count = ipcrawler.slots.active['port']
 
 		num_new_targets = math.ceil((config['max_port_scans'] - port_scan_task_count) / port_scan_plugin_count)
 		if num_new_targets > 0:
 			i = 0
 			while ipcrawler.pending_targets:
-				pending.add(asyncio.create_task(scan_target(ipcrawler.pending_targets.pop(0))))
+				target = ipcrawler.pending_targets.pop(0)
+				scheduler.submit(Job(target), scan_target(target))
 				i+=1
 				if i >= num_new_targets:
 					break
 
+		ipcrawler.slots.reserve(len(ipcrawler.pending_targets) * port_scan_plugin_count)
+
 	if not config['disable_keyboard_control']:
 		keyboard_monitor.cancel()
 
+	run_heartbeat.cancel()
+
 	# Stop progress manager
 	progress_manager.stop()
 
@@ -2299,19 +2315,32 @@ async def run():
 						break
 
 			if matching_tags and not excluded_tags:
-				pending.add(asyncio.create_task(generate_report(plugin, ipcrawler.completed_targets)))
+				scheduler.submit(Job(None, plugin), generate_report(plugin, ipcrawler.completed_targets))
+
+		while scheduler.pending():
+			await scheduler.wait()
+			for job in scheduler.pop_completed():
+				pass
 
-		while pending:
-			done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED, timeout=1)
+	ipcrawler.http.close()
+	ipcrawler.close_report_executors()
 
 	if timed_out:
 		cancel_all_tasks(None, None)
+		ipcrawler.store.close()
 
 		elapsed_time = calculate_elapsed_time(start_time)
 		warn('{byellow}ipcrawler took longer than the specified timeout period (' + str(config['timeout']) + ' min). Cancelling all scans and exiting.{rst}')
 	else:
-		while len(asyncio.all_tasks()) > 1: # this code runs in the main() task so it will be the only task left running
-			await asyncio.sleep(1)
+		# This code runs in the main() task so wait for everything else to wind down.
+		while True:
+			remaining = asyncio.all_tasks() - {asyncio.current_task()}
+			if not remaining:
+				break
+			await asyncio.wait(remaining)
+
+		# Every command has finished, so the results database can be completed.
+		ipcrawler.store.close()
 
 		elapsed_time = calculate_elapsed_time(start_time)
 		
@@ -2330,15 +2359,12 @@ async def run():
 				from ipcrawler.vhost_post_processor import VHostPostProcessor
 				from ipcrawler.io import vhost_manager
 				
-				# Check if any VHost files were created and collect all scan directories
+				# Check if any VHosts were recorded and collect all scan directories
+				scan_directories = [target.scandir for target in ipcrawler.completed_targets]
+				target_addresses = [target.address for target in ipcrawler.completed_targets]
 				vhost_files_found = False
-				scan_directories = []
-				
-				for target in ipcrawler.completed_targets:
-					scan_directories.append(target.scandir)
-					for root, dirs, files in os.walk(target.scandir):
-						if any(f.startswith('vhost_redirects_') and f.endswith('.txt') for f in files):
-							vhost_files_found = True
+				if target_addresses:
+					vhost_files_found = len(ipcrawler.store.query('SELECT 1 FROM vhosts WHERE target IN (' + ', '.join('?' * len(target_addresses)) + ') LIMIT 1', target_addresses)) > 0
 				
 				# Run post-processing if:
 				# 1. VHost files were found AND
@@ -2353,7 +2379,7 @@ async def run():
 						info('{bright}🌐 Running VHost Discovery Post-Processing (no privileges for auto-add)...{rst}')
 					
 					# Pass all scan directories to the processor
-					processor = VHostPostProcessor(scan_directories)
+					processor = VHostPostProcessor(scan_directories, store=ipcrawler.store, targets=target_addresses)
 					processor.run_interactive_session()
 				elif vhost_files_found and auto_add_setting and vhost_manager.auto_add_enabled:
 					info('{bright}🌐 VHosts discovered and auto-added during scanning. Check /etc/hosts for entries.{rst}')
@@ -2371,11 +2397,21 @@ async def run():
 		if terminal_settings is not None:
 			termios.tcsetattr(sys.stdin, termios.TCSADRAIN, terminal_settings)
 
+# Make sure processes left running when the scan was cancelled are killed before the event loop stops, and
+# save how long plugins took however the scan ended.
+async def scan():
+	try:
+		await run()
+	finally:
+		await ipcrawler.kill_terminated_processes()
+		if ipcrawler.durations is not None:
+			ipcrawler.durations.save()
+
 def main():
 	# Capture Ctrl+C and cancel everything.
 	signal.signal(signal.SIGINT, cancel_all_tasks)
 	try:
-		asyncio.run(run())
+		asyncio.run(scan())
 	except asyncio.exceptions.CancelledError:
 		pass
 	except RuntimeError:
@@ -0,0 +1,350 @@
+import asyncio, copy, fnmatch, os, re, shlex
+import xml.etree.ElementTree as ElementTree
+from ipcrawler.config import config
+from ipcrawler.io import info, warn, output_writer, log_pattern_matches, PatternSet
+
+# Runs the nmap script scans that service plugins ask for in batches. Requests made within a short window of
+# each other with the same key are run as one nmap against the union of their hosts, ports and scripts, instead
+# of one nmap (with its own host discovery and version probing) per plugin, port and target. The results are
+# then split back into the output files each plugin asked for.
+#
+# Each target has a batcher for its own requests, keyed by protocol and script arguments. Plugins marked as
+# multi-host use a global batcher instead, keyed by plugin, port and scripts, so that the same scan of many
+# targets (e.g. across a CIDR range) is run once against all of them.
+class NmapScriptBatcher(object):
+
+	def __init__(self, window=1):
+		self.window = window
+		self.pending = {}
+		self.count = 0
+
+	# Returns the nmap process once the batch the request ended up in has finished and its output files are written.
+	async def run(self, key, service, plugin, tag, plugin_tag, nmap_extra, scripts, script_args, outfile, xmlfile, timeout=None):
+		request = {'target':service.target, 'service':service, 'plugin':plugin, 'tag':tag, 'plugin_tag':plugin_tag, 'nmap_extra':nmap_extra, 'scripts':scripts, 'script_args':script_args, 'outfile':outfile, 'xmlfile':xmlfile, 'timeout':timeout, 'future':asyncio.get_running_loop().create_future(), 'batch':None, 'cancelled':False}
+
+		if key not in self.pending:
+			self.pending[key] = []
+			asyncio.ensure_future(self._flush(key))
+		self.pending[key].append(request)
+
+		try:
+			return await asyncio.shield(request['future'])
+		except asyncio.CancelledError:
+			# The batch carries on for the other plugins in it (whose results are still written), and is only
+			# stopped once every plugin in it has been cancelled.
+			request['cancelled'] = True
+			if request['batch'] is not None:
+				self._stop(request['batch'])
+			raise
+
+	async def _flush(self, key):
+		await asyncio.sleep(self.window)
+		# Requests cancelled before the batch started are left out of it.
+		requests = [request for request in self.pending.pop(key) if not request['cancelled']]
+		await asyncio.gather(*[self._finish(requests) for requests in batches(requests)])
+
+	# Stop the batch's nmap once every plugin in it has been cancelled. Whatever is left of it is killed when the
+	# scan ends.
+	def _stop(self, batch):
+		if batch['process'] is not None and all(request['cancelled'] for request in batch['requests']):
+			batch['requests'][0]['target'].ipcrawler.terminate_processes([batch['process']])
+
+	async def _finish(self, requests):
+		batch = {'requests':requests, 'process':None}
+		for request in requests:
+			request['batch'] = batch
+
+		try:
+			process = await self._run(batch)
+		except Exception as ex:
+			for request in requests:
+				if not request['future'].done():
+					request['future'].set_exception(ex)
+		else:
+			for request in requests:
+				if not request['future'].done():
+					request['future'].set_result(process)
+
+	async def _run(self, batch):
+		requests = batch['requests']
+		targets = list(dict.fromkeys(request['target'] for request in requests))
+		target = targets[0]
+		protocol, nmap_extra, script_args = requests[0]['service'].protocol, requests[0]['nmap_extra'], requests[0]['script_args']
+
+		# A request on its own is run exactly as asked, so only batches need their output split.
+		if len(requests) == 1:
+			outfile, xmlfile = requests[0]['outfile'], requests[0]['xmlfile']
+		else:
+			self.count += 1
+			name = '_nmap_scripts_' + protocol + '_' + str(self.count)
+			if len(targets) == 1:
+				outfile = os.path.join(target.scandir, name + '.txt')
+				xmlfile = os.path.join(target.scandir, 'xml', name + '.xml')
+			else:
+				# Results for several targets don't belong in any one target's directory.
+				directory = os.path.join(os.path.abspath(config['output']), '_nmap_batches')
+				outfile = os.path.join(directory, name + '.txt')
+				xmlfile = os.path.join(directory, 'xml', name + '.xml')
+			os.makedirs(os.path.dirname(xmlfile), exist_ok=True)
+
+		ports = sorted(set(request['service'].port for request in requests))
+		scripts = ','.join(dict.fromkeys(script for request in requests for script in split_scripts(request['scripts'])))
+
+		cmd = nmap_command(nmap_extra, ports, scripts, script_args, outfile, xmlfile, [t.address for t in targets])
+
+		for t in targets:
+			output_writer.write(os.path.join(t.scandir, '_commands.log'), cmd + '\n\n')
+
+		# A batch's output can't be matched against patterns as it is read, since matches would be logged against
+		# the first plugin and target in it. It is matched once it has been split up instead.
+		if len(requests) == 1:
+			patterns = requests[0]['plugin'].patterns
+		else:
+			patterns = PatternSet([])
+
+		process, stdout, stderr = await target.ipcrawler.execute(cmd, target, requests[0]['tag'], patterns=patterns, capture=False)
+		batch['process'] = process
+		self._stop(batch)
+
+		# A batch is only stopped once the longest of its plugins' timeouts has passed, so none of them is cut short.
+		if None not in [request['timeout'] for request in requests]:
+			request = max(requests, key=lambda request: request['timeout'])
+			asyncio.ensure_future(target.ipcrawler.limit_process(process, request['timeout'], request['target'], request['plugin'], cmd))
+
+		for request in requests:
+			t = request['target']
+			info('Service scan {bblue}' + request['plugin'].name + ' {green}(' + request['tag'] + '){rst} is running the following command against {byellow}' + t.address + '{rst}: ' + cmd, verbosity=2)
+			t.scans['services'][request['service']][request['plugin_tag']]['commands'].append([cmd, request['outfile'], None])
+			t.ipcrawler.store.add_run(t, request['service'], request['plugin'], request['plugin_tag'], cmd, request['outfile'], None, process)
+			# A process shared with other plugins is left out of the plugin's running tasks, so that it isn't
+			# killed when just this plugin times out or is cancelled.
+			if len(requests) == 1 and request['tag'] in t.running_tasks:
+				t.running_tasks[request['tag']]['processes'].append({'process': process, 'stderr': stderr, 'cmd': cmd})
+
+		await asyncio.gather(stdout.wait(), stderr.wait())
+		await process.wait()
+
+		if len(requests) > 1:
+			await self._split(xmlfile, requests, len(targets) > 1)
+
+		return process
+
+	# Write the results for each request's target, port and scripts to its own files, as if nmap had been run for
+	# that plugin alone. The XML is nmap's, less the results for other plugins, with the command the plugin would
+	# have run as its args. The text output is rendered from that XML rather than written by nmap.
+	async def _split(self, xmlfile, requests, multiple_targets=False):
+		try:
+			root = ElementTree.parse(xmlfile).getroot()
+		except (OSError, ElementTree.ParseError) as ex:
+			warn('Could not split the nmap script scan results in ' + xmlfile + ': ' + str(ex))
+			return
+
+		for request in requests:
+			if request['cancelled']:
+				continue
+
+			target = request['target']
+			result = filter_ports(root, request['service'].protocol, request['service'].port, target.ip if multiple_targets else None)
+			filter_scripts(result, request['scripts'])
+			result.set('args', nmap_command(request['nmap_extra'], [request['service'].port], request['scripts'], request['script_args'], request['outfile'], request['xmlfile'], [target.address]))
+			text = normal_output(result)
+
+			output_writer.truncate(request['xmlfile'])
+			output_writer.write(request['xmlfile'], '<?xml version="1.0" encoding="UTF-8"?>\n' + ElementTree.tostring(result, encoding='unicode'))
+			output_writer.truncate(request['outfile'])
+			output_writer.write(request['outfile'], text)
+			await output_writer.close(request['xmlfile'])
+			await output_writer.close(request['outfile'])
+
+			patterns = target.ipcrawler.pattern_set(request['plugin'].patterns)
+			candidates = patterns.candidates(text)
+			if candidates:
+				for line in text.split('\n'):
+					log_pattern_matches(target, request['tag'], patterns, line, candidates)
+
+# Splits requests into batches that can each be run as one nmap. Requests for the same port on the same target
+# but with different scripts go in separate batches, as the script results for a port can't be told apart.
+def batches(requests):
+	groups = []
+	for request in requests:
+		service = request['service']
+		scripts = set(split_scripts(request['scripts']))
+		for group in groups:
+			if not any(r['target'] is request['target'] and r['service'].protocol == service.protocol and r['service'].port == service.port and set(split_scripts(r['scripts'])) != scripts for r in group):
+				group.append(request)
+				break
+		else:
+			groups.append([request])
+	return groups
+
+# Splits an nmap --script argument into its comma separated scripts and expressions.
+def split_scripts(scripts):
+	items = []
+	depth = 0
+	start = 0
+	for i, c in enumerate(scripts):
+		if c == '(':
+			depth += 1
+		elif c == ')':
+			depth -= 1
+		elif c == ',' and depth == 0:
+			items.append(scripts[start:i].strip())
+			start = i + 1
+	items.append(scripts[start:].strip())
+	return [item for item in items if item]
+
+def nmap_command(nmap_extra, ports, scripts, script_args, outfile, xmlfile, addresses):
+	cmd = 'nmap ' + nmap_extra + ' -sV -p ' + ','.join(str(port) for port in ports) + ' --script=' + shlex.quote(scripts)
+	if script_args:
+		cmd += ' --script-args=' + shlex.quote(script_args)
+	return cmd + ' -oN ' + shlex.quote(outfile) + ' -oX ' + shlex.quote(xmlfile) + ' ' + ' '.join(addresses)
+
+# Returns a copy of an nmap XML document with only the given port in each host, and if an address is given,
+# only the host with that address.
+def filter_ports(root, protocol, port, address=None):
+	root = copy.deepcopy(root)
+	if address is not None:
+		for host in list(root.findall('host')):
+			if address not in [element.get('addr') for element in host.findall('address')]:
+				root.remove(host)
+		hosts = root.find('runstats/hosts')
+		if hosts is not None:
+			up = len([host for host in root.findall('host') if host.find('status') is not None and host.find('status').get('state') == 'up'])
+			hosts.set('up', str(up))
+			hosts.set('down', str(len(root.findall('host')) - up))
+			hosts.set('total', str(len(root.findall('host'))))
+	for ports in root.iter('ports'):
+		for element in list(ports.findall('port')):
+			if element.get('protocol') != protocol or element.get('portid') != str(port):
+				ports.remove(element)
+	return root
+
+# Removes the results of scripts that an nmap --script argument wouldn't have run from an nmap XML document,
+# including host and pre/post scan scripts.
+def filter_scripts(root, scripts):
+	selections = [parse_selection(selection) for selection in split_scripts(scripts)]
+	for parent in list(root.iter('port')) + list(root.iter('hostscript')) + list(root.iter('prescript')) + list(root.iter('postscript')):
+		for script in list(parent.findall('script')):
+			# A script is only removed if no selection could have run it. Which categories a script is in isn't
+			# known here, so selections that depend on them keep the script.
+			if all(select_script(selection, script.get('id', '')) is False for selection in selections):
+				parent.remove(script)
+	return root
+
+NMAP_CATEGORIES = ['all', 'auth', 'broadcast', 'brute', 'default', 'discovery', 'dos', 'exploit', 'external', 'fuzzer', 'intrusive', 'malware', 'safe', 'version', 'vuln']
+
+# Parses a script selection (one of the comma separated parts of --script) into nested lists of 'and', 'or'
+# and 'not' operations on script names, patterns and categories.
+def parse_selection(selection):
+	tokens = re.findall('[()]|[^\\s()]+', selection)
+
+	def parse_or(i):
+		left, i = parse_and(i)
+		while i < len(tokens) and tokens[i] == 'or':
+			right, i = parse_and(i + 1)
+			left = ['or', left, right]
+		return left, i
+
+	def parse_and(i):
+		left, i = parse_not(i)
+		while i < len(tokens) and tokens[i] == 'and':
+			right, i = parse_not(i + 1)
+			left = ['and', left, right]
+		return left, i
+
+	def parse_not(i):
+		if i < len(tokens) and tokens[i] == 'not':
+			operand, i = parse_not(i + 1)
+			return ['not', operand], i
+		if i < len(tokens) and tokens[i] == '(':
+			operand, i = parse_or(i + 1)
+			return operand, i + 1
+		if i < len(tokens):
+			return tokens[i], i + 1
+		return 'all', i
+
+	return parse_or(0)[0]
+
+# Returns True if a parsed script selection runs the script, False if it doesn't, or None if that depends on
+# the script's categories.
+def select_script(selection, script):
+	if isinstance(selection, str):
+		name = os.path.basename(selection)
+		if name.endswith('.nse'):
+			name = name[:-4]
+		if name in NMAP_CATEGORIES:
+			return True if name == 'all' else None
+		return fnmatch.fnmatchcase(script, name)
+
+	values = [select_script(operand, script) for operand in selection[1:]]
+	if selection[0] == 'not':
+		return None if values[0] is None else not values[0]
+	if selection[0] == 'and':
+		return False if False in values else (None if None in values else True)
+	return True if True in values else (None if None in values else False)
+
+# Formats the results in an nmap XML document like nmap's normal (-oN) output.
+def normal_output(root):
+	lines = ['# Nmap ' + root.get('version', '') + ' scan initiated ' + root.get('startstr', '') + ' as: ' + root.get('args', '')]
+
+	for host in root.iter('host'):
+		address = host.find('address')
+		hostnames = [hostname.get('name') for hostname in host.iterfind('hostnames/hostname')]
+		if address is not None:
+			if hostnames:
+				lines.append('Nmap scan report for ' + hostnames[0] + ' (' + address.get('addr') + ')')
+			else:
+				lines.append('Nmap scan report for ' + address.get('addr'))
+
+		status = host.find('status')
+		if status is not None and status.get('state') == 'up':
+			lines.append('Host is up, received ' + status.get('reason', 'unknown') + '.')
+		lines.append('')
+
+		rows = []
+		scripts = []
+		for port in host.iterfind('ports/port'):
+			state = port.find('state')
+			service = port.find('service')
+			name = ''
+			version = ''
+			if service is not None:
+				name = ('ssl/' if service.get('tunnel') == 'ssl' else '') + service.get('name', '')
+				version = ' '.join(value for value in [service.get('product'), service.get('version')] if value)
+				if service.get('extrainfo'):
+					version += ' (' + service.get('extrainfo') + ')'
+			reason = ''
+			if state is not None:
+				reason = state.get('reason', '') + (' ttl ' + state.get('reason_ttl') if state.get('reason_ttl') else '')
+			rows.append([port.get('portid') + '/' + port.get('protocol'), state.get('state', '') if state is not None else '', name, reason, version.strip()])
+			scripts.append(port.findall('script'))
+
+		if rows:
+			rows.insert(0, ['PORT', 'STATE', 'SERVICE', 'REASON', 'VERSION'])
+			widths = [max(len(row[i]) for row in rows) for i in range(4)]
+			for i, row in enumerate(rows):
+				lines.append(' '.join(row[j].ljust(widths[j]) for j in range(4)) + ' ' + row[4])
+				if i > 0:
+					lines.extend(script_lines(scripts[i - 1]))
+
+		host_scripts = host.findall('hostscript/script')
+		if host_scripts:
+			lines.append('')
+			lines.append('Host script results:')
+			lines.extend(script_lines(host_scripts))
+		lines.append('')
+
+	finished = root.find('runstats/finished')
+	hosts = root.find('runstats/hosts')
+	if finished is not None and hosts is not None:
+		lines.append('# Nmap done at ' + finished.get('timestr', '') + ' -- ' + hosts.get('total', '0') + ' IP address (' + hosts.get('up', '0') + ' host up) scanned in ' + finished.get('elapsed', '0') + ' seconds')
+
+	return '\n'.join(lines) + '\n'
+
+def script_lines(scripts):
+	lines = []
+	for script in scripts:
+		output = (script.get('id') + ': ' + script.get('output', '')).rstrip('\n').split('\n')
+		for i, line in enumerate(output):
+			lines.append(('|_' if i == len(output) - 1 else '| ') + line)
+	return lines
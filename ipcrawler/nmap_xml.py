@@ -0,0 +1,143 @@
+import asyncio, os, psutil, requests
+import xml.etree.ElementTree as ElementTree
+from ipcrawler.io import warn
+from ipcrawler.targets import Service
+
+# Reads the hosts in an nmap XML output file (-oX) while nmap is still writing it. nmap writes each host
+# once it has finished scanning it, so the file is fed to a pull parser as it grows and each host is
+# returned as soon as it is complete, without parsing the rest of the file again.
+class NmapXMLReader(object):
+
+	def __init__(self, path, interval=0.5):
+		self.path = path
+		self.interval = interval
+		self.parser = ElementTree.XMLPullParser(events=('end',))
+		self.file = None
+		self.started = None
+		self.failed = False
+
+	# Yield (addresses, services) for each host in the file, until the process writing it has exited.
+	async def hosts(self, process=None):
+		waiter = None
+		if process is not None:
+			waiter = asyncio.ensure_future(process.wait())
+			# Output files are overwritten, so don't read one left over from an earlier scan before nmap opens it.
+			try:
+				self.started = psutil.Process(process.pid).create_time()
+			except psutil.NoSuchProcess:
+				pass
+		try:
+			while True:
+				finished = waiter is None or waiter.done()
+				for host in self._read():
+					yield host
+				if finished:
+					break
+				await asyncio.wait([waiter], timeout=self.interval)
+		finally:
+			if waiter is not None and not waiter.done():
+				waiter.cancel()
+			self.close()
+
+	# Return the services found on every host in the file.
+	async def services(self, process=None):
+		services = []
+		async for _, host_services in self.hosts(process):
+			services.extend(host_services)
+		return services
+
+	def close(self):
+		if self.file is not None:
+			self.file.close()
+			self.file = None
+
+	def _read(self):
+		if self.failed:
+			return []
+
+		if self.file is None:
+			if not os.path.isfile(self.path):
+				return []
+			if self.started is not None and os.path.getmtime(self.path) < self.started - 1:
+				return []
+			self.file = open(self.path, 'rb')
+
+		data = self.file.read()
+		if not data:
+			return []
+
+		hosts = []
+		try:
+			self.parser.feed(data)
+			for _, element in self.parser.read_events():
+				if element.tag == 'host':
+					hosts.append(parse_host(element))
+					# Hosts are only read once, so don't keep them in the tree.
+					element.clear()
+		except ElementTree.ParseError as ex:
+			warn('Could not parse nmap XML output in ' + self.path + ': ' + str(ex))
+			self.failed = True
+		return hosts
+
+# Returns the addresses of a <host> element and a Service for each of its open ports.
+def parse_host(host):
+	addresses = [address.get('addr') for address in host.findall('address')]
+	services = []
+
+	for port in host.iterfind('ports/port'):
+		state = port.find('state')
+		if state is None or state.get('state') != 'open':
+			continue
+
+		element = port.find('service')
+		name = 'unknown'
+		tunnel = None
+		if element is not None:
+			name = element.get('name', 'unknown')
+			tunnel = element.get('tunnel')
+
+		secure = tunnel in ['ssl', 'tls'] or 'ssl' in name or 'tls' in name
+		service = Service(port.get('protocol'), port.get('portid'), name, secure)
+
+		if element is not None:
+			service.product = element.get('product')
+			service.version = element.get('version')
+			service.extrainfo = element.get('extrainfo')
+			service.cpe = [cpe.text for cpe in element.findall('cpe') if cpe.text]
+
+		for script in port.findall('script'):
+			service.scripts[script.get('id')] = {'output': script.get('output', ''), 'data': script_data(script)}
+
+		services.append(service)
+
+	return addresses, services
+
+# Converts the <elem> and <table> children of a script or table element to a dict if they are keyed,
+# otherwise to a list.
+def script_data(element):
+	children = [child for child in element if child.tag in ['elem', 'table']]
+	if not children:
+		return None
+
+	if all(child.get('key') is not None for child in children):
+		return {child.get('key'): (child.text if child.tag == 'elem' else script_data(child)) for child in children}
+
+	return [(child.text if child.tag == 'elem' else script_data(child)) for child in children]
+
+# nmap reports WinRM as http, so check HTTP services on the WinRM ports for a /wsman endpoint and rename
+# them to wsman if there is one.
+async def identify_wsman(target, services):
+	for service in services:
+		if service.name == 'http' and service.port in [5985, 5986]:
+			url = ('https' if service.secure else 'http') + '://' + target.address + ':' + str(service.port) + '/wsman'
+			try:
+				wsman = await target.http_request('GET', url)
+				if wsman.status_code == 405:
+					service.name = 'wsman'
+					wsman = await target.http_request('POST', url)
+				else:
+					if wsman.status_code == 401:
+						service.name = 'wsman'
+			except requests.exceptions.RequestException:
+				# Leave the service as http if the check fails.
+				pass
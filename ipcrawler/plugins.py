@@ -1,8 +1,13 @@
-import asyncio, inspect, os, re, sys
+import asyncio, importlib.util, inspect, multiprocessing, os, re, shlex, signal, sys, time, traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import final
 from ipcrawler.config import config
-from ipcrawler.io import slugify, info, warn, error, fail, CommandStreamReader
-from ipcrawler.targets import Service
+from ipcrawler.http_client import HTTPClient
+from ipcrawler.io import slugify, info, warn, error, fail, CommandStreamReader, PatternSet
+from ipcrawler.nmap_batch import NmapScriptBatcher
+from ipcrawler.nmap_xml import NmapXMLReader
+from ipcrawler.store import ResultStore
+from ipcrawler.targets import Service, TargetSnapshot
 
 class Pattern:
 
@@ -18,6 +23,14 @@ class Plugin(object):
 		self.description = None
 		self.tags = ['default']
 		self.priority = 1
+		# Number of scan slots the plugin occupies while it is running.
+		self.weight = 1
+		# Whether the plugin reads the output of its commands. True keeps every line, False keeps none, and
+		# a number keeps at most that many unread lines, pausing the command until the plugin catches up.
+		self.capture_output = True
+		# Maximum number of seconds the plugin may run for against a target or service, or None for no limit.
+		# [timeouts] in config.toml takes precedence.
+		self.timeout = None
 		self.patterns = []
 		self.ipcrawler = None
 		self.disabled = False
@@ -131,6 +144,7 @@ class ServiceScan(Plugin):
 		self.ignore_service_names = []
 		self.run_once_boolean = False
 		self.require_ssl_boolean = False
+		self.multi_host_boolean = False
 		self.max_target_instances = 0
 		self.max_global_instances = 0
 
@@ -209,16 +223,210 @@ class ServiceScan(Plugin):
 	def run_once(self, boolean):
 		self.run_once_boolean = boolean
 
+	# The nmap script scans of multi-host plugins don't depend on anything but the port, so they can be batched
+	# across targets: one nmap is run against every target found with the same port open.
+	@final
+	def multi_host(self, boolean):
+		self.multi_host_boolean = boolean
+
 	@final
 	def match_all_service_names(self, boolean):
 		if boolean:
 			# Add a "match all" service name.
 			self.match_service_name('.*')
 
+# Precomputes everything needed to match service scan plugins against a discovered service,
+# so that scan_target() does not have to walk every plugin's regexes, tags and methods for each
+# service. Each distinct regex is compiled and evaluated once per service name, and results are
+# memoized per (protocol, port, name, secure) since most targets expose the same few services.
+class ServiceIndex(object):
+
+	def __init__(self, ipcrawler):
+		self.regexes = {}
+		self.entries = []
+		self.cache = {}
+
+		for plugin in ipcrawler.plugin_types['service']:
+			# Plugins that failed their checks are removed from the registry with --ignore-plugin-checks.
+			if plugin.slug not in ipcrawler.plugins:
+				continue
+
+			if config['service_scans'] and plugin.slug in config['service_scans']:
+				tagged = True
+			else:
+				tag_set = set(plugin.tags)
+				tagged = any(set(group).issubset(tag_set) for group in ipcrawler.tags) and not any(set(group).issubset(tag_set) for group in ipcrawler.excluded_tags)
+
+			runnable = inspect.ismethod(getattr(plugin, 'run', None))
+			manual = inspect.ismethod(getattr(plugin, 'manual', None))
+
+			# Names added with match_service() only apply to the ports they were given for.
+			port_names = {}
+			for service in plugin.services:
+				for port in service['port']:
+					names = port_names.setdefault((service['protocol'], port), ([], []))
+					names[1 if service['negative_match'] else 0].extend(service['name'])
+
+			self.entries.append((plugin, self._compile(plugin.service_names), self._compile(plugin.ignore_service_names), {key:(self._compile(names), self._compile(ignore)) for key, (names, ignore) in port_names.items()}, runnable and tagged, manual))
+
+	def _compile(self, patterns):
+		for pattern in patterns:
+			if pattern not in self.regexes:
+				self.regexes[pattern] = re.compile(pattern)
+		return tuple(dict.fromkeys(patterns))
+
+	# Returns (plugin, runnable, manual, skip) for every plugin whose service names match the service, in
+	# priority order. skip is None if the plugin can run against the service, otherwise the reason it can't.
+	def match(self, service):
+		key = (service.protocol, service.port, service.name, service.secure)
+		if key in self.cache:
+			return self.cache[key]
+
+		results = {}
+		def search(patterns):
+			for pattern in patterns:
+				if pattern not in results:
+					results[pattern] = self.regexes[pattern].search(service.name) is not None
+				if results[pattern]:
+					return True
+			return False
+
+		matches = []
+		for plugin, names, ignore, port_names, runnable, manual in self.entries:
+			port_names, port_ignore = port_names.get((service.protocol, service.port), ((), ()))
+			if not search(names) and not search(port_names):
+				continue
+
+			skip = None
+			if runnable:
+				if plugin.require_ssl_boolean and not service.secure:
+					skip = ''
+				elif service.port in plugin.ignore_ports[service.protocol]:
+					skip = 'Plugin cannot be run against ' + service.protocol + ' port ' + str(service.port) + '. Skipping.'
+				elif plugin.ports[service.protocol] and service.port not in plugin.ports[service.protocol]:
+					skip = 'Plugin can only run on specific ports. Skipping.'
+				elif search(ignore) or search(port_ignore):
+					skip = 'Plugin cannot be run against this service. Skipping.'
+
+			matches.append((plugin, runnable, manual, skip))
+
+		self.cache[key] = matches
+		return matches
+
 class Report(Plugin):
 
 	def __init__(self):
 		super().__init__()
+		# Where the report is generated: None runs it on the event loop, 'thread' in a thread pool (for reports
+		# that mostly read and write files), and 'process' in a process pool (for reports that do heavy parsing).
+		# Both are given a snapshot of each target rather than the target itself.
+		self.executor = None
+
+# Runs a report plugin in a worker thread, which has its own event loop.
+def run_report(plugin, targets):
+	try:
+		asyncio.run(plugin.run(targets))
+	except Exception:
+		return ''.join(traceback.format_exception(*sys.exc_info())[-2:])
+	return None
+
+# Runs a report plugin in a worker process. Plugin modules are not importable by name, so the plugin is
+# loaded again from its file and given the state of the original instance.
+def run_report_process(path, class_name, state, settings, args, store_path, targets):
+	config.update(settings)
+	spec = importlib.util.spec_from_file_location('ipcrawler.' + os.path.basename(path)[:-3], path)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+
+	plugin = getattr(module, class_name).__new__(getattr(module, class_name))
+	plugin.__dict__.update(state)
+	plugin.ipcrawler = ReportContext(args, store_path)
+	try:
+		return run_report(plugin, targets)
+	finally:
+		if plugin.ipcrawler.store is not None:
+			plugin.ipcrawler.store.close()
+
+# Adaptive timeouts for commands are only used once this many of a plugin's commands have finished. They
+# (and adaptive plugin timeouts) are this many times the 90th percentile of how long the commands (or earlier
+# runs of the plugin) took, but never less than the minimum (in seconds).
+ADAPTIVE_TIMEOUT_SAMPLES = 5
+ADAPTIVE_TIMEOUT_FACTOR = 3
+ADAPTIVE_TIMEOUT_MINIMUM = 60
+
+TEE_REGEX = re.compile('\\s*\\|\\s*tee\\s+("[^"]*"|\'[^\']*\'|[^\\s"\'();<>|&-][^\\s"\'();<>|&]*)\\s*$')
+MERGE_REGEX = re.compile('\\s+2>&1\\s*$')
+SHELL_KEYWORDS = ['.', '!', 'case', 'cd', 'eval', 'exec', 'export', 'for', 'if', 'set', 'source', 'time', 'ulimit', 'umask', 'until', 'while']
+
+# Splits a command into the arguments to run it with directly, without a shell, if it doesn't need one. A
+# trailing "2>&1" and "| tee <file>" are the only shell syntax allowed, since the output can be merged and
+# written to the file natively. Returns (argv, teefile, merge_stderr), or None if the command needs a shell.
+def split_command(cmd):
+	if any(c in cmd for c in '$`\\*?[]{}~#\n'):
+		return None
+
+	teefile = None
+	match = TEE_REGEX.search(cmd)
+	if match:
+		teefile = shlex.split(match.group(1))[0]
+		cmd = cmd[:match.start()]
+
+	merge_stderr = False
+	match = MERGE_REGEX.search(cmd)
+	if match:
+		merge_stderr = True
+		cmd = cmd[:match.start()]
+
+	try:
+		lexer = shlex.shlex(cmd, posix=True, punctuation_chars=True)
+		lexer.whitespace_split = True
+		argv = list(lexer)
+	except ValueError:
+		return None
+
+	if not argv or argv[0] in SHELL_KEYWORDS or re.match('^[A-Za-z_][A-Za-z0-9_]*=', argv[0]):
+		return None
+
+	# Quoted arguments made up of operator characters can't be told apart from operators, so leave them to the shell.
+	if any(all(c in '();<>|&' for c in arg) for arg in argv if arg):
+		return None
+
+	return argv, teefile, merge_stderr
+
+# Through a shell, a command piped to tee exits with tee's exit code, which is 0 unless the file couldn't be
+# written. Commands whose output is written to the tee file natively keep that, so that e.g. a tool exiting
+# with 1 when it finds nothing isn't reported as an error.
+class TeeProcess(object):
+
+	def __init__(self, process):
+		self.process = process
+
+	def __getattr__(self, name):
+		return getattr(self.process, name)
+
+	@property
+	def returncode(self):
+		return None if self.process.returncode is None else 0
+
+	async def wait(self):
+		await self.process.wait()
+		return 0
+
+def process_group_exists(pgid):
+	try:
+		os.killpg(pgid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		pass
+	return True
+
+# Stands in for the plugin registry in worker processes, so get_option() and store queries keep working.
+class ReportContext(object):
+
+	def __init__(self, args, store_path):
+		self.args = args
+		self.store = ResultStore(store_path) if store_path else None
 
 class ipcrawler(object):
 
@@ -229,8 +437,11 @@ class ipcrawler(object):
 		self.plugins = {}
 		self.__slug_regex = re.compile('^[a-z0-9\-]+$')
 		self.plugin_types = {'port':[], 'service':[], 'report':[]}
-		self.port_scan_semaphore = None
-		self.service_scan_semaphore = None
+		self.slots = None
+		# Instance limits for service plugins, keyed by plugin slug (and target address).
+		self.global_instances = {}
+		self.target_instances = {}
+		self.service_index = None
 		self.argparse = None
 		self.argparse_group = None
 		self.args = None
@@ -239,11 +450,138 @@ class ipcrawler(object):
 		self.tags = []
 		self.excluded_tags = []
 		self.patterns = []
+		self.pattern_sets = {}
 		self.errors = False
+		self.scheduler = None
+		self.http = HTTPClient()
+		self.store = None
+		self.durations = None
+		# Batches the nmap script scans of multi-host plugins across targets.
+		self.nmap_batcher = NmapScriptBatcher(window=5)
+		# Process groups sent SIGTERM when the scan was cancelled.
+		self.terminated = []
+		self.adaptive_timeouts = {}
+		self.report_executors = {}
 		self.lock = asyncio.Lock()
 		self.load_slug = None
 		self.load_module = None
 
+	async def run_report(self, plugin, targets):
+		targets = [TargetSnapshot(target) for target in targets]
+		loop = asyncio.get_running_loop()
+
+		if plugin.executor not in self.report_executors:
+			if plugin.executor == 'process':
+				# Worker processes are spawned rather than forked, since this process has other threads running.
+				self.report_executors['process'] = ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'))
+			else:
+				self.report_executors[plugin.executor] = ThreadPoolExecutor(thread_name_prefix='Report')
+
+		if plugin.executor == 'process':
+			state = {key:value for key, value in vars(plugin).items() if key != 'ipcrawler'}
+			return await loop.run_in_executor(self.report_executors['process'], run_report_process, plugin.path, plugin.__class__.__name__, state, dict(config), self.args, self.store.path if self.store else None, targets)
+		else:
+			return await loop.run_in_executor(self.report_executors[plugin.executor], run_report, plugin, targets)
+
+	def close_report_executors(self):
+		for executor in self.report_executors.values():
+			executor.shutdown(wait=False)
+		self.report_executors.clear()
+
+	# The time limit for a run of the plugin against a service (or target, for port scans). A timeout set for
+	# the plugin's slug in config.toml comes first, then the plugin's own, then the shortest one set for any of
+	# its tags, then --plugin-timeout. With --adaptive-timeouts, plugins without one are limited by how long
+	# they have taken in earlier scans.
+	def plugin_timeout(self, plugin, service=''):
+		if plugin.slug in config['timeouts']:
+			return config['timeouts'][plugin.slug]
+		if plugin.timeout is not None:
+			return plugin.timeout
+		timeouts = [config['timeouts'][tag] for tag in plugin.tags if tag in config['timeouts']]
+		if timeouts:
+			return min(timeouts)
+		if config['plugin_timeout'] is None and config['adaptive_timeouts'] and self.durations is not None:
+			estimate = self.durations.estimate(plugin.slug, service)
+			if estimate is not None:
+				return max(ADAPTIVE_TIMEOUT_MINIMUM, estimate[1] * ADAPTIVE_TIMEOUT_FACTOR)
+		return config['plugin_timeout']
+
+	# A time limit for the plugin's commands from how long its earlier commands took, or None until enough of
+	# them have finished. Recalculated at most once a minute.
+	def adaptive_timeout(self, plugin):
+		cached = self.adaptive_timeouts.get(plugin.slug)
+		if cached is not None and time.time() - cached[0] < 60:
+			return cached[1]
+
+		durations = sorted(row[0] for row in self.store.query('SELECT end_time - start_time FROM runs WHERE plugin = ? AND returncode = 0 AND end_time IS NOT NULL', (plugin.slug,)))
+		timeout = None
+		if len(durations) >= ADAPTIVE_TIMEOUT_SAMPLES:
+			p90 = durations[min(len(durations) - 1, int(len(durations) * 0.9))]
+			timeout = max(ADAPTIVE_TIMEOUT_MINIMUM, p90 * ADAPTIVE_TIMEOUT_FACTOR)
+
+		self.adaptive_timeouts[plugin.slug] = (time.time(), timeout)
+		return timeout
+
+	# Stop a command if it is still running after the timeout.
+	async def limit_process(self, process, timeout, target, plugin, cmd):
+		await asyncio.wait([asyncio.ensure_future(process.wait())], timeout=timeout)
+		if process.returncode is None:
+			warn('A command run by {bblue}' + plugin.name + ' {green}(' + plugin.slug + '){rst} against {byellow}' + target.address + '{rst} took longer than ' + str(round(timeout)) + ' seconds and was stopped: ' + cmd)
+			await self.kill_processes([process])
+
+	# Every command is started in its own process group, so signalling the group also reaches any processes
+	# the command started. Only processes that haven't exited are signalled, since the group ID of one that has
+	# may have been reused. Returns the process group IDs that were signalled.
+	def signal_processes(self, processes, sig):
+		pgids = []
+		for process in processes:
+			if process.returncode is None and process.pid not in pgids:
+				try:
+					os.killpg(process.pid, sig)
+					pgids.append(process.pid)
+				except (ProcessLookupError, PermissionError):
+					pass
+		return pgids
+
+	# Ask the processes to exit, and kill whatever is left of their process groups after the grace period.
+	async def kill_processes(self, processes, grace=5):
+		processes = [process for process in processes if process.returncode is None]
+		pgids = self.signal_processes(processes, signal.SIGTERM)
+		if processes:
+			await asyncio.wait([asyncio.ensure_future(process.wait()) for process in processes], timeout=grace)
+		for pgid in pgids:
+			try:
+				os.killpg(pgid, signal.SIGKILL)
+			except (ProcessLookupError, PermissionError):
+				pass
+
+	# Ask the processes to exit without waiting for them, which is all a signal handler can do.
+	# kill_terminated_processes() kills whatever is left of them.
+	def terminate_processes(self, processes):
+		for pgid in self.signal_processes(processes, signal.SIGTERM):
+			if pgid not in self.terminated:
+				self.terminated.append(pgid)
+
+	async def kill_terminated_processes(self, grace=5):
+		deadline = time.time() + grace
+		try:
+			while self.terminated:
+				self.terminated = [pgid for pgid in self.terminated if process_group_exists(pgid)]
+				if not self.terminated or time.time() >= deadline:
+					break
+				await asyncio.sleep(0.1)
+		except asyncio.CancelledError:
+			# Cancelled again (e.g. Ctrl-C was pressed twice), so don't wait any longer.
+			pass
+
+		for pgid in self.terminated:
+			try:
+				os.killpg(pgid, signal.SIGKILL)
+			except (ProcessLookupError, PermissionError):
+				pass
+
+		self.terminated = []
+
 	def add_argument(self, plugin, name, **kwargs):
 		# TODO: make sure name is simple.
 		name = '--' + plugin.slug + '.' + slugify(name)
@@ -252,6 +590,25 @@ class ipcrawler(object):
 			self.argparse_group = self.argparse.add_argument_group('plugin arguments', description='These are optional arguments for certain plugins.')
 		self.argparse_group.add_argument(name, **kwargs)
 
+	def instance_semaphores(self, plugin, target):
+		semaphores = []
+
+		if plugin.max_target_instances and plugin.max_target_instances > 0:
+			instances = self.target_instances.setdefault(target.address, {})
+			if plugin.slug not in instances:
+				instances[plugin.slug] = asyncio.Semaphore(plugin.max_target_instances)
+			semaphores.append(instances[plugin.slug])
+
+		if plugin.max_global_instances and plugin.max_global_instances > 0:
+			if plugin.slug not in self.global_instances:
+				self.global_instances[plugin.slug] = asyncio.Semaphore(plugin.max_global_instances)
+			semaphores.append(self.global_instances[plugin.slug])
+
+		return semaphores
+
+	def release_instances(self, target):
+		self.target_instances.pop(target.address, None)
+
 	def extract_service(self, line, regex):
 		if regex is None:
 			regex = '^(?P<port>\d+)\/(?P<protocol>(tcp|udp))(.*)open(\s*)(?P<service>[\w\-\/]+)(\s*)(.*)$'
@@ -285,6 +642,10 @@ class ipcrawler(object):
 				break
 		return services
 
+	# Read the services from an nmap XML output file as nmap writes it, until the process has exited.
+	async def extract_nmap_services(self, xmlfile, process=None):
+		return await NmapXMLReader(xmlfile).services(process)
+
 	def register(self, plugin, filename):
 		if plugin.disabled:
 			return
@@ -344,6 +705,9 @@ class ipcrawler(object):
 			else:
 				fail('Plugin "' + plugin.name + '" in ' + filename + ' is neither a PortScan, ServiceScan, nor a Report.', file=sys.stderr)
 
+			if not isinstance(plugin.capture_output, bool) and (not isinstance(plugin.capture_output, int) or plugin.capture_output < 1):
+				fail('Error: the plugin "' + plugin.name + '" in ' + filename + ' has an invalid capture_output (should be True, False, or a number of lines greater than 0).', file=sys.stderr)
+
 			plugin.tags = [tag.lower() for tag in plugin.tags]
 
 			# Add plugin tags to tag list.
@@ -356,20 +720,62 @@ class ipcrawler(object):
 		else:
 			fail('Error: plugin slug "' + plugin.slug + '" in ' + filename + ' is already assigned.', file=sys.stderr)
 
-	async def execute(self, cmd, target, tag, patterns=None, outfile=None, errfile=None):
-		if patterns:
-			combined_patterns = self.patterns + patterns
+	# Compile the global (unless global_patterns is False) and plugin patterns into a PatternSet once per plugin.
+	def pattern_set(self, patterns=None, global_patterns=True):
+		key = (tuple(patterns or []), global_patterns)
+		if key not in self.pattern_sets:
+			self.pattern_sets[key] = PatternSet((self.patterns if global_patterns else []) + list(key[0]))
+		return self.pattern_sets[key]
+
+	async def execute(self, cmd, target, tag, patterns=None, outfile=None, errfile=None, capture=True):
+		# A PatternSet is used as is, without the global patterns.
+		combined_patterns = patterns if isinstance(patterns, PatternSet) else self.pattern_set(patterns)
+
+		# Commands given as a list of arguments are always run directly. Others are only run through a shell if
+		# they need one, which saves a process per command and means the process is the tool itself.
+		if isinstance(cmd, list):
+			command = (cmd, None, False)
 		else:
-			combined_patterns = self.patterns
+			command = split_command(cmd)
+			if command is not None and command[1] is not None and outfile is not None:
+				command = None
 
-		process = await asyncio.create_subprocess_shell(
-			cmd,
-			stdin=open('/dev/null'),
-			stdout=asyncio.subprocess.PIPE,
-			stderr=asyncio.subprocess.PIPE)
-
-		cout = CommandStreamReader(process.stdout, target, tag, patterns=combined_patterns, outfile=outfile)
-		cerr = CommandStreamReader(process.stderr, target, tag, patterns=combined_patterns, outfile=errfile)
+		process = None
+		if command is not None:
+			argv, teefile, merge_stderr = command
+			try:
+				process = await asyncio.create_subprocess_exec(
+					*argv,
+					stdin=asyncio.subprocess.DEVNULL,
+					stdout=asyncio.subprocess.PIPE,
+					stderr=asyncio.subprocess.STDOUT if merge_stderr else asyncio.subprocess.PIPE,
+					start_new_session=True)
+			except OSError:
+				# Leave it to the shell to report that the program can't be run, as it always has.
+				if isinstance(cmd, list):
+					cmd = shlex.join(cmd)
+			else:
+				if teefile is not None:
+					outfile = teefile
+					process = TeeProcess(process)
+
+		if process is None:
+			process = await asyncio.create_subprocess_shell(
+				cmd,
+				stdin=asyncio.subprocess.DEVNULL,
+				stdout=asyncio.subprocess.PIPE,
+				stderr=asyncio.subprocess.PIPE,
+				start_new_session=True)
+
+		stderr = process.stderr
+		if stderr is None:
+			# stderr was merged into stdout.
+			stderr = asyncio.StreamReader()
+			stderr.feed_eof()
+
+		cout = CommandStreamReader(process.stdout, target, tag, patterns=combined_patterns, outfile=outfile, capture=capture)
+		# Unless all output is kept, only keep the end of stderr so that errors can still be logged.
+		cerr = CommandStreamReader(stderr, target, tag, patterns=combined_patterns, outfile=errfile, capture=True if capture is True else False, tail=config['stderr_tail'])
 
 		asyncio.create_task(cout._read())
 		asyncio.create_task(cerr._read())
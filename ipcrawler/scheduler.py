@@ -0,0 +1,220 @@
+import asyncio
+from collections import deque
+
+# Gives whatever the current task is awaiting a time limit by cancelling the task once the timeout has passed.
+# Unlike asyncio.wait_for(), the coroutine is still awaited directly, so it runs in the caller's frame (which
+# fformat() relies on). A timeout of None never expires.
+class Deadline(object):
+
+	def __init__(self, timeout):
+		self.task = asyncio.current_task()
+		self.expired = False
+		self.handle = None
+		if timeout is not None:
+			self.handle = asyncio.get_running_loop().call_later(timeout, self._expire)
+
+	def _expire(self):
+		self.expired = True
+		self.handle = None
+		self.task.cancel()
+
+	# Stop the timer. Must be called once the cancellation (if the deadline expired) has been caught.
+	def cancel(self):
+		if self.handle is not None:
+			self.handle.cancel()
+			self.handle = None
+		if self.expired and hasattr(self.task, 'uncancel'):
+			# Python 3.11+ counts cancellation requests, so withdraw the one that has been dealt with.
+			self.task.uncancel()
+			self.task = None
+
+class Job(object):
+
+	def __init__(self, target, plugin=None, service=None):
+		self.target = target
+		self.plugin = plugin
+		self.service = service
+		self.task = None
+
+	def result(self):
+		return self.task.result()
+
+	def exception(self):
+		return self.task.exception()
+
+class Scheduler(object):
+
+	def __init__(self, parent=None):
+		self.parent = parent
+		self.ready = deque()
+		self.running = {}
+		self.completed = deque()
+		self.wakeup = asyncio.Event()
+
+	# Queue a (target, plugin, service) job. It is started the next time the owner waits.
+	def submit(self, job, coro):
+		self.ready.append((job, coro))
+		return job
+
+	def dispatch(self):
+		while self.ready:
+			job, coro = self.ready.popleft()
+			job.task = asyncio.create_task(coro)
+			self.running[job.task] = job
+			job.task.add_done_callback(self._complete)
+
+	def _complete(self, task):
+		job = self.running.pop(task, None)
+		if job is not None:
+			self.completed.append(job)
+		self.notify()
+		# Let the owner of the parent scheduler know that a slot may have been freed.
+		if self.parent is not None:
+			self.parent.notify()
+
+	# Wake the owner up, e.g. because new services were discovered.
+	def notify(self):
+		self.wakeup.set()
+
+	def pending(self):
+		return bool(self.ready or self.running or self.completed)
+
+	def pop_completed(self):
+		while self.completed:
+			yield self.completed.popleft()
+
+	# Start any ready jobs, then sleep until a job completes or notify() is called.
+	# Returns False if the timeout expired first.
+	async def wait(self, timeout=None):
+		self.dispatch()
+		if not self.completed:
+			try:
+				await asyncio.wait_for(self.wakeup.wait(), timeout)
+			except asyncio.TimeoutError:
+				return False
+		self.wakeup.clear()
+		return True
+
+	def cancel(self):
+		while self.ready:
+			_, coro = self.ready.popleft()
+			coro.close()
+		for task in list(self.running):
+			task.cancel()
+
+class Slot(object):
+
+	def __init__(self, allocator, kind, weight, priority, duration=0):
+		self.allocator = allocator
+		self.kind = kind
+		self.weight = weight
+		self.priority = priority
+		self.duration = duration
+		self.pool = None
+
+	async def __aenter__(self):
+		self.pool = await self.allocator.acquire(self.kind, self.weight, self.priority, self.duration)
+		return self
+
+	async def __aexit__(self, exc_type, exc, tb):
+		self.allocator.release(self.pool, self.kind, self.weight)
+
+# Models port scan and service scan capacity as two pools. Service scans may borrow
+# free port scan slots as long as enough are left over for the targets still waiting
+# to be port scanned. Waiters are woken directly on release, in priority order.
+class SlotAllocator(object):
+
+	def __init__(self, port_slots, service_slots, shared=False, borrow=True):
+		self.capacity = {'port':port_slots, 'service':service_slots}
+		self.used = {'port':0, 'service':0}
+		# Number of running port scans and service scans, regardless of pool.
+		self.active = {'port':0, 'service':0}
+		self.reserved = 0
+		self.shared = shared
+		self.borrow = borrow
+		self.waiters = []
+		self.counter = 0
+
+	def slot(self, kind, weight=1, priority=1, duration=0):
+		return Slot(self, kind, weight, priority, duration)
+
+	def free(self, pool):
+		return self.capacity[pool] - self.used[pool]
+
+	def _weight(self, kind, weight):
+		# A plugin can never weigh more than the pool it is guaranteed to be served from.
+		pool = 'port' if kind == 'port' or self.shared else 'service'
+		return max(1, min(weight, self.capacity[pool]))
+
+	def _choose_pool(self, kind, weight):
+		if kind == 'port' or self.shared:
+			return 'port' if self.free('port') >= weight else None
+
+		if self.free('service') >= weight:
+			return 'service'
+
+		# Only borrow port scan slots that pending targets won't need.
+		if self.borrow and (self.free('port') - self.reserved) >= weight:
+			return 'port'
+
+		return None
+
+	# duration is how long the scan is expected to take, if known. Of the scans waiting with the same priority,
+	# the longest are started first, so that they don't end up holding up the end of the run on their own.
+	async def acquire(self, kind, weight=1, priority=1, duration=0):
+		weight = self._weight(kind, weight)
+
+		future = asyncio.get_running_loop().create_future()
+		self.counter += 1
+		# Port scans are always served before service scans.
+		waiter = [0 if kind == 'port' else 1, priority, -duration, self.counter, kind, weight, future]
+		self.waiters.append(waiter)
+		self._wake()
+
+		try:
+			return await future
+		except asyncio.CancelledError:
+			if future.done() and not future.cancelled():
+				# A slot was handed over just as we were cancelled, so give it back.
+				self.release(future.result(), kind, weight)
+			elif waiter in self.waiters:
+				self.waiters.remove(waiter)
+			raise
+
+	def release(self, pool, kind, weight=1):
+		weight = self._weight(kind, weight)
+		self.used[pool] -= weight
+		self.active[kind] -= 1
+		self._wake()
+
+	# Reserve port scan slots for targets that haven't started yet.
+	def reserve(self, slots):
+		self.reserved = max(0, slots)
+		self._wake()
+
+	def _take(self, pool, kind, weight):
+		self.used[pool] += weight
+		self.active[kind] += 1
+
+	def _wake(self):
+		if not self.waiters:
+			return
+
+		self.waiters.sort(key=lambda w: w[:4])
+		remaining = []
+		for waiter in self.waiters:
+			future = waiter[6]
+			if future.done():
+				continue
+
+			if self.free('port') <= 0 and self.free('service') <= 0:
+				remaining.append(waiter)
+				continue
+
+			pool = self._choose_pool(waiter[4], waiter[5])
+			if pool is None:
+				remaining.append(waiter)
+			else:
+				self._take(pool, waiter[4], waiter[5])
+				future.set_result(pool)
+		self.waiters = remaining
@@ -0,0 +1,175 @@
+import asyncio, atexit, itertools, os, pathlib, queue, sqlite3, threading, time
+from ipcrawler.io import error
+
+SCHEMA = [
+	'CREATE TABLE IF NOT EXISTS targets (address TEXT PRIMARY KEY, ip TEXT, ipversion TEXT, type TEXT, scandir TEXT, start_time REAL, end_time REAL)',
+	'CREATE TABLE IF NOT EXISTS services (target TEXT, full_tag TEXT, protocol TEXT, port INTEGER, name TEXT, secure INTEGER, found_time REAL, PRIMARY KEY (target, full_tag))',
+	'CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, target TEXT, service TEXT, plugin TEXT, plugin_name TEXT, tag TEXT, command TEXT, outfile TEXT, errfile TEXT, returncode INTEGER, start_time REAL, end_time REAL)',
+	'CREATE TABLE IF NOT EXISTS patterns (id INTEGER PRIMARY KEY, target TEXT, tag TEXT, description TEXT, matched TEXT, found_time REAL)',
+	'CREATE TABLE IF NOT EXISTS vhosts (target TEXT, hostname TEXT, ip TEXT, port INTEGER, source TEXT, found_time REAL, PRIMARY KEY (target, hostname))',
+	'CREATE INDEX IF NOT EXISTS runs_target ON runs (target)',
+	'CREATE INDEX IF NOT EXISTS patterns_target ON patterns (target)'
+]
+
+# Structured record of the scan, kept in an SQLite database in the output directory so that reports and
+# post-processing can query results instead of parsing output files. Writes are queued and committed by a
+# background thread in batches, so recording a result never blocks the event loop.
+class ResultStore(object):
+
+	def __init__(self, path, batch_size=500, interval=1):
+		self.path = path
+		self.batch_size = batch_size
+		self.interval = interval
+		self.queue = queue.Queue()
+		self.thread = None
+		self.lock = threading.Lock()
+		self.local = threading.local()
+		self.connections = []
+		self.run_ids = None
+		self.tasks = set()
+
+	# Create the database if needed. Only the process that runs the scan needs to call this.
+	def open(self):
+		os.makedirs(os.path.dirname(self.path), exist_ok=True)
+		connection = sqlite3.connect(self.path)
+		connection.execute('PRAGMA journal_mode=WAL')
+		with connection:
+			for statement in SCHEMA:
+				connection.execute(statement)
+		self.run_ids = itertools.count(connection.execute('SELECT COALESCE(MAX(id), 0) FROM runs').fetchone()[0] + 1)
+		connection.close()
+
+	def _start(self):
+		with self.lock:
+			if self.thread is None:
+				self.thread = threading.Thread(target=self._run, name='ResultStore', daemon=True)
+				self.thread.start()
+				atexit.register(self.close)
+
+	def _write(self, sql, params=()):
+		self._start()
+		self.queue.put((sql, params, None))
+
+	# Start recording a target, replacing the results of any earlier scan of it.
+	def add_target(self, target):
+		for table in ['services', 'runs', 'patterns', 'vhosts']:
+			self._write('DELETE FROM ' + table + ' WHERE target = ?', (target.address,))
+		self._write('INSERT OR REPLACE INTO targets (address, ip, ipversion, type, scandir, start_time) VALUES (?, ?, ?, ?, ?, ?)', (target.address, target.ip, target.ipversion, target.type, target.scandir, time.time()))
+
+	def finish_target(self, target):
+		self._write('UPDATE targets SET end_time = ? WHERE address = ?', (time.time(), target.address))
+
+	def add_service(self, target, service):
+		self._write('INSERT OR IGNORE INTO services (target, full_tag, protocol, port, name, secure, found_time) VALUES (?, ?, ?, ?, ?, ?, ?)', (target.address, service.full_tag(), service.protocol, service.port, service.name, 1 if service.secure else 0, time.time()))
+
+	def remove_service(self, target, service):
+		self._write('DELETE FROM services WHERE target = ? AND full_tag = ?', (target.address, service.full_tag()))
+
+	# Record a command run by a plugin. If the process is given, its exit code and end time are recorded
+	# once it finishes.
+	def add_run(self, target, service, plugin, tag, cmd, outfile=None, errfile=None, process=None):
+		run_id = next(self.run_ids)
+		self._write('INSERT INTO runs (id, target, service, plugin, plugin_name, tag, command, outfile, errfile, start_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (run_id, target.address, service.full_tag() if service is not None else None, plugin.slug, plugin.name, tag, cmd, outfile, errfile, time.time()))
+
+		if process is not None:
+			task = asyncio.ensure_future(self._finish_run(run_id, process))
+			self.tasks.add(task)
+			task.add_done_callback(self.tasks.discard)
+
+		return run_id
+
+	async def _finish_run(self, run_id, process):
+		returncode = await process.wait()
+		self.finish_run(run_id, returncode)
+
+	def finish_run(self, run_id, returncode=None):
+		self._write('UPDATE runs SET returncode = ?, end_time = ? WHERE id = ?', (returncode, time.time(), run_id))
+
+	def add_pattern(self, target, tag, description, matched):
+		self._write('INSERT INTO patterns (target, tag, description, matched, found_time) VALUES (?, ?, ?, ?, ?)', (target.address, tag, description, matched, time.time()))
+
+	def add_vhost(self, target, hostname, port=None, source=None):
+		self._write('INSERT OR IGNORE INTO vhosts (target, hostname, ip, port, source, found_time) VALUES (?, ?, ?, ?, ?, ?)', (target.address, hostname, target.ip, port, source, time.time()))
+
+	# Wait until everything recorded so far has been committed.
+	async def flush(self):
+		if self.thread is None:
+			return
+		loop = asyncio.get_running_loop()
+		future = loop.create_future()
+		self.queue.put((None, None, (loop, future)))
+		await future
+
+	# Run a read-only query and return the rows, which can be indexed by column name. Each thread (and
+	# process) uses its own connection, which is only closed by close().
+	def query(self, sql, params=()):
+		connection = getattr(self.local, 'connection', None)
+		if connection is None:
+			connection = sqlite3.connect(pathlib.Path(os.path.abspath(self.path)).as_uri() + '?mode=ro', uri=True, check_same_thread=False)
+			connection.row_factory = sqlite3.Row
+			self.local.connection = connection
+			with self.lock:
+				self.connections.append(connection)
+		return connection.execute(sql, params).fetchall()
+
+	# Close the read connections before the writer's, so that the last connection to close can checkpoint
+	# the database and remove its -wal and -shm files.
+	def close(self):
+		with self.lock:
+			connections = self.connections
+			self.connections = []
+		for connection in connections:
+			connection.close()
+
+		if self.thread is not None and self.thread.is_alive():
+			self.queue.put(('stop', None, None))
+			self.thread.join()
+		elif connections and self.run_ids is not None:
+			# The database was read after the writer had stopped, and read-only connections can't remove the files.
+			try:
+				connection = sqlite3.connect(self.path)
+				connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+				connection.close()
+			except sqlite3.Error:
+				pass
+
+	def _run(self):
+		connection = sqlite3.connect(self.path)
+		stop = False
+
+		while not stop:
+			batch = []
+			waiters = []
+			deadline = time.monotonic() + self.interval
+
+			# Collect writes until the batch is full, the interval has passed, or someone is waiting.
+			while len(batch) < self.batch_size:
+				try:
+					sql, params, waiter = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+				except queue.Empty:
+					break
+
+				if sql == 'stop':
+					stop = True
+					break
+				elif sql is None:
+					waiters.append(waiter)
+					break
+				batch.append((sql, params))
+
+			if batch:
+				try:
+					with connection:
+						for sql, params in batch:
+							connection.execute(sql, params)
+				except sqlite3.Error as ex:
+					error('Could not write to the results database ' + self.path + ': ' + str(ex))
+
+			for loop, future in waiters:
+				try:
+					loop.call_soon_threadsafe(lambda future=future: future.done() or future.set_result(None))
+				except RuntimeError:
+					# The event loop has already been closed.
+					pass
+
+		connection.close()
@@ -1,7 +1,9 @@
-import asyncio, inspect, os
+import asyncio, inspect, os, shlex
 from typing import final
 from ipcrawler.config import config
-from ipcrawler.io import e, info, warn, error
+from ipcrawler.io import e, info, warn, error, output_writer, log_pattern_matches
+from ipcrawler.http_client import raw_response
+from ipcrawler.nmap_batch import NmapScriptBatcher
 
 class Target:
 
@@ -18,12 +20,28 @@ class Target:
 		self.ports = None
 		self.pending_services = []
 		self.services = []
+		# The service currently scanned on each (protocol, port), and the plugins queued against each
+		# (protocol, port, secure, plugin slug), so a port identified twice isn't scanned twice.
+		self.open_ports = {}
+		self.port_plugins = set()
 		self.scans = {'ports':{}, 'services':{}}
 		self.running_tasks = {}
+		self.scheduler = None
+		self.start_time = None
+		self.nmap_batcher = NmapScriptBatcher()
 
 	async def add_service(self, service):
 		async with self.lock:
 			self.pending_services.append(service)
+		# Wake scan_target() up so the service is scanned straight away.
+		if self.scheduler is not None:
+			self.scheduler.notify()
+
+	# Report an open port before its service has been identified, so that plugins which don't depend on the
+	# service name (or match the guessed name) can start straight away. The service found for the port later
+	# replaces it, and plugins that have already been run against the port aren't run again.
+	async def add_port(self, protocol, port, name='unknown', secure=False):
+		await self.add_service(Service(protocol, port, name, secure, provisional=True))
 
 	def extract_service(self, line, regex=None):
 		return self.ipcrawler.extract_service(line, regex)
@@ -31,6 +49,9 @@ class Target:
 	async def extract_services(self, stream, regex=None):
 		return await self.ipcrawler.extract_services(stream, regex)
 
+	async def extract_nmap_services(self, xmlfile, process=None):
+		return await self.ipcrawler.extract_nmap_services(xmlfile, process)
+
 	@final
 	def info(self, msg, verbosity=0):
 		plugin = inspect.currentframe().f_back.f_locals['self']
@@ -46,7 +67,11 @@ class Target:
 		plugin = inspect.currentframe().f_back.f_locals['self']
 		error('{bright}[{yellow}' + self.address + '{crst}/{bgreen}' + plugin.slug + '{crst}]{rst} ' + msg)
 
-	async def execute(self, cmd, blocking=True, outfile=None, errfile=None, future_outfile=None):
+	# Make an HTTP request through the shared client without blocking other scans.
+	async def http_request(self, method, url, **kwargs):
+		return await self.ipcrawler.http.request(method, url, target=self, **kwargs)
+
+	async def execute(self, cmd, blocking=True, outfile=None, errfile=None, future_outfile=None, capture=None, timeout=None):
 		target = self
 
 		# Create variables for command references.
@@ -71,7 +96,15 @@ class Target:
 		if config['proxychains']:
 			nmap_extra += ' -sT'
 
-		cmd = e(cmd)
+		# A command can also be given as a list of arguments, which is run without a shell.
+		argv = None
+		if isinstance(cmd, list):
+			argv = []
+			for arg in cmd:
+				argv.append(e(arg))
+			cmd = shlex.join(argv)
+		else:
+			cmd = e(cmd)
 		tag = plugin.slug
 
 		info('Port scan {bblue}' + plugin.name + ' {green}(' + tag + '){rst} is running the following command against {byellow}' + address + '{rst}: ' + cmd, verbosity=2)
@@ -87,31 +120,51 @@ class Target:
 
 		target.scans['ports'][tag]['commands'].append([cmd, outfile if outfile is not None else future_outfile, errfile])
 
-		async with target.lock:
-			with open(os.path.join(target.scandir, '_commands.log'), 'a') as file:
-				file.writelines(cmd + '\n\n')
+		output_writer.write(os.path.join(target.scandir, '_commands.log'), cmd + '\n\n')
+
+		if capture is None:
+			capture = plugin.capture_output
+
+		# Output from a blocking command can only be read once it has finished, so it can't be bounded.
+		if blocking and capture is not False:
+			capture = True
+
+		process, stdout, stderr = await target.ipcrawler.execute(argv if argv is not None else cmd, target, tag, patterns=plugin.patterns, outfile=outfile, errfile=errfile, capture=capture)
+
+		target.ipcrawler.store.add_run(target, None, plugin, tag, cmd, outfile if outfile is not None else future_outfile, errfile, process)
 
-		process, stdout, stderr = await target.ipcrawler.execute(cmd, target, tag, patterns=plugin.patterns, outfile=outfile, errfile=errfile)
+		# Stop the command if it runs for longer than the timeout, or than the plugin's commands usually take.
+		if timeout is None and config['adaptive_timeouts']:
+			timeout = target.ipcrawler.adaptive_timeout(plugin)
+		if timeout is not None:
+			asyncio.ensure_future(target.ipcrawler.limit_process(process, timeout, target, plugin, cmd))
 
 		target.running_tasks[tag]['processes'].append({'process': process, 'stderr': stderr, 'cmd': cmd})
 
-		# If process should block, sleep until stdout and stderr have finished.
+		# If process should block, wait until stdout and stderr have finished.
 		if blocking:
-			while (not (stdout.ended and stderr.ended)):
-				await asyncio.sleep(0.1)
+			await asyncio.gather(stdout.wait(), stderr.wait())
 			await process.wait()
 
 		return process, stdout, stderr
 
 class Service:
 
-	def __init__(self, protocol, port, name, secure=False):
+	def __init__(self, protocol, port, name, secure=False, provisional=False):
 		self.target = None
 		self.protocol = protocol.lower()
 		self.port = int(port)
 		self.name = name
 		self.secure = secure
+		self.provisional = provisional
+		# Version detection and script results, if the port scan provided them.
+		self.product = None
+		self.version = None
+		self.extrainfo = None
+		self.cpe = []
+		self.scripts = {}
 		self.manual_commands = {}
+		self.http_cache = {}
 
 	@final
 	def tag(self):
@@ -150,8 +203,176 @@ class Service:
 		plugin = inspect.currentframe().f_back.f_locals['self']
 		error('{bright}[{yellow}' + self.target.address + '{crst}/{bgreen}' + self.tag() + '/' + plugin.slug + '{crst}]{rst} ' + msg)
 
+	# Record a virtual host name discovered on this service.
 	@final
-	async def execute(self, cmd, blocking=True, outfile=None, errfile=None, future_outfile=None):
+	def add_vhost(self, hostname):
+		plugin = inspect.currentframe().f_back.f_locals['self']
+		self.target.ipcrawler.store.add_vhost(self.target, hostname, self.port, plugin.slug)
+
+	# Make an HTTP request to a path on this service through the shared client without blocking other scans.
+	@final
+	async def http_request(self, method, path='/', **kwargs):
+		address = self.target.address
+		if self.target.ipversion == 'IPv6' and address == self.target.ip:
+			address = '[' + address + ']'
+		http_scheme = 'https' if 'https' in self.name or self.secure is True else 'http'
+		return await self.target.http_request(method, http_scheme + '://' + address + ':' + str(self.port) + path, **kwargs)
+
+	# Fetch a path from this service without following redirects. Responses are cached per method, URL and
+	# Host header, so plugins asking for the same resource share one request. The response is checked for
+	# patterns and, if outfile is given, written to it in the same format as curl -i.
+	@final
+	async def http_fetch(self, path='/', method='GET', headers=None, outfile=None, future_outfile=None, **kwargs):
+		target = self.target
+
+		# Create variables for outfile references.
+		address = target.address
+		addressv6 = target.address
+		scandir = target.scandir
+		protocol = self.protocol
+		port = self.port
+		name = self.name
+
+		if not config['no_port_dirs']:
+			scandir = os.path.join(scandir, protocol + str(port))
+			os.makedirs(scandir, exist_ok=True)
+
+		http_scheme = 'https' if 'https' in self.name or self.secure is True else 'http'
+
+		if target.ipversion == 'IPv6' and addressv6 == target.ip:
+			addressv6 = '[' + addressv6 + ']'
+
+		plugin = inspect.currentframe().f_back.f_locals['self']
+		tag = self.tag() + '/' + plugin.slug
+		plugin_tag = tag
+		if plugin.run_once_boolean:
+			plugin_tag = plugin.slug
+
+		url = http_scheme + '://' + addressv6 + ':' + str(port) + path
+		method = method.upper()
+		host = None
+		for header, value in (headers or {}).items():
+			if header.lower() == 'host':
+				host = value
+
+		# Record the equivalent curl command so the request can be reproduced.
+		cmd = 'curl -sSik ' + ('-X ' + method + ' ' if method != 'GET' else '') + ('-H "Host: ' + host + '" ' if host else '') + url
+
+		info('Service scan {bblue}' + plugin.name + ' {green}(' + tag + '){rst} is fetching the following URL from {byellow}' + address + '{rst}: ' + cmd, verbosity=2)
+
+		if outfile is not None:
+			outfile = os.path.join(scandir, e(outfile))
+
+		if future_outfile is not None:
+			future_outfile = os.path.join(scandir, e(future_outfile))
+
+		target.scans['services'][self][plugin_tag]['commands'].append([cmd, outfile if outfile is not None else future_outfile, None])
+
+		# The request is only made (and logged) once, by the first plugin to ask for it.
+		key = (method, url, host)
+		if key not in self.http_cache:
+			output_writer.write(os.path.join(target.scandir, '_commands.log'), cmd + '\n\n')
+			run_id = target.ipcrawler.store.add_run(target, self, plugin, plugin_tag, cmd, outfile if outfile is not None else future_outfile)
+			self.http_cache[key] = asyncio.ensure_future(self._http_fetch(run_id, tag, method, path, headers=headers, allow_redirects=False, **kwargs))
+
+		# Don't cancel the request for other plugins waiting on it if this one is cancelled.
+		response = await asyncio.shield(self.http_cache[key])
+
+		# The global patterns were matched when the response arrived, so only this plugin's are left.
+		raw = raw_response(response)
+		self._match_patterns(tag, target.ipcrawler.pattern_set(plugin.patterns, global_patterns=False), raw)
+
+		if outfile is not None:
+			output_writer.truncate(outfile)
+			output_writer.write(outfile, raw)
+			await output_writer.close(outfile)
+
+		return response
+
+	async def _http_fetch(self, run_id, tag, method, path, **kwargs):
+		try:
+			response = await self.http_request(method, path, **kwargs)
+		except asyncio.CancelledError:
+			self.target.ipcrawler.store.finish_run(run_id)
+			raise
+		except Exception:
+			self.target.ipcrawler.store.finish_run(run_id, 1)
+			raise
+		self.target.ipcrawler.store.finish_run(run_id, 0)
+		self._match_patterns(tag, self.target.ipcrawler.pattern_set(), raw_response(response))
+		return response
+
+	def _match_patterns(self, tag, patterns, text):
+		candidates = patterns.candidates(text)
+		if candidates:
+			for line in text.split('\n'):
+				log_pattern_matches(self.target, tag, patterns, line.rstrip(), candidates)
+
+	# Run nmap scripts against this service and write the results to outfile (-oN) and xmlfile (-oX). Script scans
+	# of the same target that start at about the same time are run together as one nmap, so this returns the
+	# nmap process once it has finished rather than streams of its output. Like execute(), the scan can be given a
+	# timeout.
+	@final
+	async def nmap_scripts(self, scripts, outfile, xmlfile, script_args=None, timeout=None):
+		target = self.target
+
+		# Create variables for command references.
+		address = target.address
+		addressv6 = target.address
+		ipaddress = target.ip
+		ipaddressv6 = target.ip
+		scandir = target.scandir
+		protocol = self.protocol
+		port = self.port
+		name = self.name
+
+		if not config['no_port_dirs']:
+			scandir = os.path.join(scandir, protocol + str(port))
+			os.makedirs(scandir, exist_ok=True)
+			os.makedirs(os.path.join(scandir, 'xml'), exist_ok=True)
+
+		# Special cases for HTTP.
+		http_scheme = 'https' if 'https' in self.name or self.secure is True else 'http'
+
+		nmap_extra = target.ipcrawler.args.nmap
+		if target.ipcrawler.args.nmap_append:
+			nmap_extra += ' ' + target.ipcrawler.args.nmap_append
+
+		if protocol == 'udp':
+			nmap_extra += ' -sU'
+
+		if target.ipversion == 'IPv6':
+			nmap_extra += ' -6'
+
+		if config['proxychains'] and protocol == 'tcp':
+			nmap_extra += ' -sT'
+
+		plugin = inspect.currentframe().f_back.f_locals['self']
+		tag = self.tag() + '/' + plugin.slug
+		plugin_tag = tag
+		if plugin.run_once_boolean:
+			plugin_tag = plugin.slug
+
+		scripts = e(scripts)
+		if script_args is not None:
+			script_args = e(script_args)
+
+		# Only batch across targets if there are others to batch with.
+		if plugin.multi_host_boolean and len(target.ipcrawler.pending_targets) + len(target.ipcrawler.scanning_targets) > 1:
+			batcher = target.ipcrawler.nmap_batcher
+			key = (plugin.slug, protocol, port, nmap_extra, scripts, script_args)
+		else:
+			batcher = target.nmap_batcher
+			key = (protocol, nmap_extra, script_args)
+
+		# Stop the scan if it runs for longer than the timeout, or than the plugin's commands usually take.
+		if timeout is None and config['adaptive_timeouts']:
+			timeout = target.ipcrawler.adaptive_timeout(plugin)
+
+		return await batcher.run(key, self, plugin, tag, plugin_tag, nmap_extra, scripts, script_args, os.path.join(scandir, e(outfile)), os.path.join(scandir, e(xmlfile)), timeout)
+
+	@final
+	async def execute(self, cmd, blocking=True, outfile=None, errfile=None, future_outfile=None, capture=None, timeout=None):
 		target = self.target
 
 		# Create variables for command references.
@@ -189,7 +410,15 @@ class Service:
 			nmap_extra += ' -sT'
 
 		plugin = inspect.currentframe().f_back.f_locals['self']
-		cmd = e(cmd)
+		# A command can also be given as a list of arguments, which is run without a shell.
+		argv = None
+		if isinstance(cmd, list):
+			argv = []
+			for arg in cmd:
+				argv.append(e(arg))
+			cmd = shlex.join(argv)
+		else:
+			cmd = e(cmd)
 		tag = self.tag() + '/' + plugin.slug
 		plugin_tag = tag
 		if plugin.run_once_boolean:
@@ -208,18 +437,83 @@ class Service:
 
 		target.scans['services'][self][plugin_tag]['commands'].append([cmd, outfile if outfile is not None else future_outfile, errfile])
 
-		async with target.lock:
-			with open(os.path.join(target.scandir, '_commands.log'), 'a') as file:
-				file.writelines(cmd + '\n\n')
+		output_writer.write(os.path.join(target.scandir, '_commands.log'), cmd + '\n\n')
+
+		if capture is None:
+			capture = plugin.capture_output
+
+		# Output from a blocking command can only be read once it has finished, so it can't be bounded.
+		if blocking and capture is not False:
+			capture = True
 
-		process, stdout, stderr = await target.ipcrawler.execute(cmd, target, tag, patterns=plugin.patterns, outfile=outfile, errfile=errfile)
+		process, stdout, stderr = await target.ipcrawler.execute(argv if argv is not None else cmd, target, tag, patterns=plugin.patterns, outfile=outfile, errfile=errfile, capture=capture)
+
+		target.ipcrawler.store.add_run(target, self, plugin, plugin_tag, cmd, outfile if outfile is not None else future_outfile, errfile, process)
+
+		# Stop the command if it runs for longer than the timeout, or than the plugin's commands usually take.
+		if timeout is None and config['adaptive_timeouts']:
+			timeout = target.ipcrawler.adaptive_timeout(plugin)
+		if timeout is not None:
+			asyncio.ensure_future(target.ipcrawler.limit_process(process, timeout, target, plugin, cmd))
 
 		target.running_tasks[tag]['processes'].append({'process': process, 'stderr': stderr, 'cmd': cmd})
 
-		# If process should block, sleep until stdout and stderr have finished.
+		# If process should block, wait until stdout and stderr have finished.
 		if blocking:
-			while (not (stdout.ended and stderr.ended)):
-				await asyncio.sleep(0.1)
+			await asyncio.gather(stdout.wait(), stderr.wait())
 			await process.wait()
 
 		return process, stdout, stderr
+
+# Picklable copy of a target as it is seen by report plugins, so that reports can be generated in another
+# thread or process while the target itself keeps being used by the event loop.
+class TargetSnapshot(object):
+
+	def __init__(self, target):
+		self.address = target.address
+		self.ip = target.ip
+		self.ipversion = target.ipversion
+		self.type = target.type
+		self.basedir = target.basedir
+		self.reportdir = target.reportdir
+		self.scandir = target.scandir
+		self.ports = target.ports
+		self.services = list(target.services)
+		self.scans = {'ports':{}, 'services':{}}
+
+		for tag, scan in target.scans['ports'].items():
+			self.scans['ports'][tag] = {'plugin':PluginSnapshot(scan['plugin']), 'commands':[list(command) for command in scan['commands']]}
+
+		for service, scans in target.scans['services'].items():
+			snapshot = ServiceSnapshot(service, self)
+			self.scans['services'][snapshot] = {}
+			for tag, scan in scans.items():
+				self.scans['services'][snapshot][tag] = {'plugin':PluginSnapshot(scan['plugin']), 'commands':[list(command) for command in scan['commands']]}
+
+class ServiceSnapshot(object):
+
+	def __init__(self, service, target):
+		self.target = target
+		self.protocol = service.protocol
+		self.port = service.port
+		self.name = service.name
+		self.secure = service.secure
+		self.product = service.product
+		self.version = service.version
+		self.extrainfo = service.extrainfo
+		self.cpe = list(service.cpe)
+		self.scripts = dict(service.scripts)
+		self.manual_commands = {description:list(commands) for description, commands in service.manual_commands.items()}
+
+	def tag(self):
+		return self.protocol + '/' + str(self.port) + '/' + self.name
+
+	def full_tag(self):
+		return self.protocol + '/' + str(self.port) + '/' + self.name + '/' + ('secure' if self.secure else 'insecure')
+
+class PluginSnapshot(object):
+
+	def __init__(self, plugin):
+		self.name = plugin.name
+		self.slug = plugin.slug
+		self.tags = list(plugin.tags)
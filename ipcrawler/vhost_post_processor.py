@@ -19,17 +19,37 @@ except ImportError:
 
 class VHostPostProcessor:
     
-    def __init__(self, scan_directories):
+    def __init__(self, scan_directories, store=None, targets=None):
         # Handle both single directory (string) and multiple directories (list)
         if isinstance(scan_directories, str):
             self.scan_directories = [scan_directories]
         else:
             self.scan_directories = scan_directories
+        # When a results store is given, VHosts are read from it instead of the scan files
+        self.store = store
+        self.targets = targets or []
         self.discovered_vhosts = []
         self.existing_hosts = set()
         
+    def discover_vhosts_from_store(self):
+        """Read the VHosts recorded in the results store for the scanned targets"""
+        if not self.targets:
+            return
+        rows = self.store.query('SELECT target, hostname, ip, port, source FROM vhosts WHERE target IN (' + ', '.join('?' * len(self.targets)) + ') ORDER BY target, found_time', self.targets)
+        for row in rows:
+            ip = row['ip'] or row['target']
+            if row['hostname'] != ip:
+                self.discovered_vhosts.append({
+                    'hostname': row['hostname'],
+                    'ip': ip,
+                    'source': (row['source'] or 'unknown') + (' on port ' + str(row['port']) if row['port'] else '')
+                })
+
     def discover_vhosts_from_files(self):
         """Parse VHost discovery files and extract hostnames"""
+        if self.store is not None:
+            return self.discover_vhosts_from_store()
+
         for scan_dir in self.scan_directories:
             # Extract IP from the parent directory of scan_dir (scan_dir is usually .../IP/scans/)
             # So we need the parent directory name which contains the IP
@@ -306,7 +326,10 @@ class VHostPostProcessor:
                 elif choice in ['s', 'show']:
                     print("\n📋 Detailed VHost Information:")
                     for vhost in new_vhosts:
-                        print(f"  📁 File: {vhost['file']}")
+                        if 'file' in vhost:
+                            print(f"  📁 File: {vhost['file']}")
+                        else:
+                            print(f"  🔎 Source: {vhost['source']}")
                         print(f"  🌐 Hostname: {vhost['hostname']}")
                         print(f"  📍 IP: {vhost['ip']}")
                         print()
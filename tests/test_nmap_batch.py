@@ -0,0 +1,18 @@
+import xml.etree.ElementTree as ElementTree
+from ipcrawler.nmap_batch import filter_ports, filter_scripts, normal_output
+
+XML = '''<nmaprun args="nmap"><host><address addr="10.0.0.1"/><ports>
+<port protocol="tcp" portid="22"><state state="open"/><service name="ssh"/><script id="ssh-hostkey" output="key"/><script id="ssl-cert" output="cert"/></port>
+<port protocol="tcp" portid="445"><state state="open"/><service name="microsoft-ds"/><script id="smb-protocols" output="SMBv2"/></port>
+</ports><hostscript><script id="smb-vuln-ms17-010" output="State: VULNERABLE"/></hostscript></host></nmaprun>'''
+
+# Splitting a batch must not give one plugin the host or port script results of another.
+def test_filter_scripts():
+	root = ElementTree.fromstring(XML)
+
+	ssh = normal_output(filter_scripts(filter_ports(root, 'tcp', 22), 'banner,ssh2-enum-algos,ssh-hostkey,ssh-auth-methods'))
+	assert 'ssh-hostkey: key' in ssh
+	assert 'ssl-cert' not in ssh and 'smb' not in ssh and 'Host script results' not in ssh
+
+	smb = normal_output(filter_scripts(filter_ports(root, 'tcp', 445), 'banner,(nbstat or smb* or ssl*) and not (brute or broadcast or dos or external or fuzzer)'))
+	assert 'smb-protocols: SMBv2' in smb and 'smb-vuln-ms17-010: State: VULNERABLE' in smb
@@ -0,0 +1,61 @@
+import asyncio, functools, http.server, os, shutil, subprocess, sys, threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Reports a single HTTP service on the given port, so service scans can be run without nmap.
+PORT_SCAN = '''from ipcrawler.plugins import PortScan
+from ipcrawler.targets import Service
+
+class FakePorts(PortScan):
+
+	def __init__(self):
+		super().__init__()
+		self.name = 'Fake Ports'
+		self.type = 'tcp'
+		self.tags = ['default']
+
+	async def run(self, target):
+		return [Service('tcp', {port}, 'http')]
+'''
+
+# Plugins which use fformat() have to be run in the scan's frame, including when they have a timeout.
+def test_curl_robots(tmp_path):
+	webroot = tmp_path / 'www'
+	webroot.mkdir()
+	(webroot / 'robots.txt').write_text('User-agent: *\nDisallow: /secret\n')
+
+	server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(webroot)))
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+
+	try:
+		plugins = tmp_path / 'plugins'
+		plugins.mkdir()
+		(plugins / 'fake-ports.py').write_text(PORT_SCAN.replace('{port}', str(server.server_address[1])))
+		shutil.copy(os.path.join(ROOT, 'ipcrawler', 'default-plugins', 'curl-robots.py'), str(plugins))
+		(tmp_path / 'config.toml').write_text('[timeouts]\ncurl-robots = 60\n')
+
+		output = subprocess.run([sys.executable, os.path.join(ROOT, 'ipcrawler.py'), '--config', str(tmp_path / 'config.toml'), '--plugins-dir', str(plugins), '-o', str(tmp_path / 'results'), '--disable-keyboard-control', '--accessible', '127.0.0.1'], cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, timeout=120).stdout
+	finally:
+		server.shutdown()
+		server.server_close()
+
+	assert 'Traceback' not in output and 'exception' not in output, output
+	robots = tmp_path / 'results' / '127.0.0.1' / 'scans' / ('tcp' + str(server.server_address[1])) / 'tcp_{}_http_curl-robots.txt'.format(server.server_address[1])
+	assert 'Disallow: /secret' in robots.read_text()
+
+# Commands piped to tee exit with tee's exit code through a shell, so they have to when run natively too.
+def test_tee_exit_code(tmp_path):
+	from ipcrawler.io import PatternSet
+	from ipcrawler.plugins import ipcrawler
+
+	async def run():
+		teefile = str(tmp_path / 'out.txt')
+		processes = []
+		for cmd in ['sh -c "echo found; exit 3" | tee ' + teefile, 'sh -c "echo found; exit 3"']:
+			process, stdout, stderr = await ipcrawler().execute(cmd, None, 'tag', patterns=PatternSet([]), capture=False)
+			await asyncio.gather(stdout.wait(), stderr.wait())
+			processes.append((await process.wait(), process.returncode))
+		return processes
+
+	assert asyncio.run(run()) == [(0, 0), (3, 3)]
+	assert open(str(tmp_path / 'out.txt')).read() == 'found\n'